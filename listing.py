@@ -24,7 +24,25 @@ SOFTWARE.
 
 ATP LIS FILE FORMAT UTILITIES
 """
+import array
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import functools
+import gzip
+import hashlib
+import heapq
+import io
+import locale
+import lzma
+import mmap
+import os
 import re
+import threading
+import time
+
+import numpy as np
 
 
 # Statistical output variables regular expressions
@@ -37,8 +55,10 @@ having names  \"([A-Z][A-Z0-9_\- ]{5})\"  and  \
 \"(([A-Z][A-Z0-9_\- ]{5})| {6})\"."
 
 # LIS simulation data
-__RE_SIMULATION_DATETIME = " Date (dd-mth-yy) and time of day (hh.mm.ss) = ([0-9 ]{1,2})-([a-zA-Z]+)-([0-9]{2}18)  ([0-9]{2}):([0-9]{2}):([0-9]{2})   "
+__RE_SIMULATION_DATETIME = " Date \\(dd-mth-yy\\) and time of day \\(hh\\.mm\\.ss\\) = ([0-9 ]{1,2})-([a-zA-Z]+)-([0-9]{2,4})  ([0-9]{2}):([0-9]{2}):([0-9]{2})   "
 __RE_SOURCE_DATE = "Source code date is ([0-9 ]{1,2}) ([a-zA-Z]+) ([0-9]{4})\."
+# dice seed, as interpreted from the statistics data card
+__RE_CARD_SEED = "ISEED *= *(-?[0-9]+)"
 
 # LIS file parts
 RE_PART_INPUT_CARDS_BEGIN = re.compile("^Descriptive interpretation of input data cards.")
@@ -65,6 +85,24 @@ RE_PART_STATISTICAL_SIMULATIONS_END = re.compile("^(?= MAIN20 dumps OVER12 dice
 RE_PART_STATISTICAL_RESULTS_BEGIN = re.compile("^MODTAB, AINCR, XMAXMX")
 RE_PART_STATISTICAL_RESULTS_END   = re.compile("^(?= .... Questionable Kolmogorov-Smirnov test result)")
 
+# LIS file parts as (name, beginning, ending) in order of appearance
+LIS_PARTS = [
+    ("INPUT_CARDS", RE_PART_INPUT_CARDS_BEGIN, RE_PART_INPUT_CARDS_END),
+    ("NODE_CONNECTIONS", RE_PART_NODE_CONNECTIONS_BEGIN, RE_PART_NODE_CONNECTIONS_END),
+    ("PHASOR_SOLUTION_UNKNOWN_VOLT", RE_PART_PHASOR_SOLUTION_UNKNOWN_VOLT_BEGIN, RE_PART_PHASOR_SOLUTION_UNKNOWN_VOLT_END),
+    ("PHASOR_SOLUTION_SWITCH", RE_PART_PHASOR_SOLUTION_SWITCH_BEGIN, RE_PART_PHASOR_SOLUTION_SWITCH_END),
+    ("PHASOR_SOLUTION_KNOWN_VOLT", RE_PART_PHASOR_SOLUTION_KNOWN_VOLT_BEGIN, RE_PART_PHASOR_SOLUTION_KNOWN_VOLT_END),
+    ("OUTPUT_VARIABLES", RE_PART_OUTPUT_VARIABLES_BEGIN, RE_PART_OUTPUT_VARIABLES_END),
+    ("STATISTICAL_SIMULATIONS", RE_PART_STATISTICAL_SIMULATIONS_BEGIN, RE_PART_STATISTICAL_SIMULATIONS_END),
+    ("STATISTICAL_RESULTS", RE_PART_STATISTICAL_RESULTS_BEGIN, RE_PART_STATISTICAL_RESULTS_END),
+]
+
+# Number of ending matches closing a part, when it is not the first one: the
+# node connections list has a two-line header between separators
+_LIS_PART_ENDINGS = {
+    "NODE_CONNECTIONS": 3,
+}
+
 __re_stat_out_v = re.compile(__RE_STAT_OUT_V)
 __re_stat_out_c = re.compile(__RE_STAT_OUT_C)
 __re_stat_out_e = re.compile(__RE_STAT_OUT_E)
@@ -73,6 +111,7 @@ __re_stat_out_shot = re.compile(__RE_STAT_OUT_SHOT)
 
 __re_simulation_datetime = re.compile(__RE_SIMULATION_DATETIME)
 __re_source_date = re.compile(__RE_SOURCE_DATE)
+__re_card_seed = re.compile(__RE_CARD_SEED)
 
 
 # Statistical distribution tables regular expressions
@@ -102,20 +141,1061 @@ __re_table_ending = re.compile(__RE_TABLE_ENDING)
 _re_random_sw_times = re.compile(__RE_RANDOM_SW_TIMES)
 _re_t183_sw_times = re.compile(__RE_T183_SW_TIMES)
 
+# Switching times of any statistical or systematic study, with the simulation
+# number, followed by lines of (switch number, time) pairs
+__RE_SW_TIMES = "^ +[A-Za-z]+ switching times for simulation number +([0-9]+)"
+__RE_FLOAT_E = "[-+]?(?:[0-9]+\\.?[0-9]*|\\.[0-9]+)[EeDd][-+]?[0-9]+"
+__RE_SW_TIMES_LINE = "^ *(?:[0-9]+ +" + __RE_FLOAT_E + " *)+\r?$"
+__RE_SW_TIMES_PAIR = "([0-9]+) +(" + __RE_FLOAT_E + ")"
+
+_re_sw_times_line = re.compile(__RE_SW_TIMES_LINE)
+_re_sw_times_pair = re.compile(__RE_SW_TIMES_PAIR)
+_re_float_e = re.compile(__RE_FLOAT_E)
+
+
+def _bytes_pattern(pattern, flags = 0):
+    """
+    Returns a bytes version of a regular expression (either a string or a
+    compiled pattern), for matching lines read in binary mode.
+    """
+    if isinstance(pattern, str):
+        return re.compile(pattern.encode("ascii"), flags)
+    return re.compile(pattern.pattern.encode("ascii"),
+                      (pattern.flags & ~re.UNICODE) | flags)
+
+
+# Bytes patterns used when indexing a .lis file
+_reb_v_caption = _bytes_pattern(__RE_V_CAPTION_STR)
+_reb_c_caption = _bytes_pattern(__RE_C_CAPTION_STR)
+_reb_e_caption = _bytes_pattern(__RE_E_CAPTION_STR)
+_reb_table_ending = _bytes_pattern(__RE_TABLE_ENDING)
+_reb_random_sw_times = _bytes_pattern(__RE_RANDOM_SW_TIMES)
+_reb_stat_out_peak = _bytes_pattern(__RE_STAT_OUT_PEAK)
+_reb_stat_out_shot = _bytes_pattern(__RE_STAT_OUT_SHOT)
+
+# Peak value and shot lines of statistical outputs, read as text and binary
+_stat_out_value_patterns = {False: (__re_stat_out_peak, __re_stat_out_shot),
+                            True:  (_reb_stat_out_peak, _reb_stat_out_shot)}
+
+_reb_parts = [(name, _bytes_pattern(begin), _bytes_pattern(end)) for name, begin, end in LIS_PARTS]
+_reb_part_ends = dict((name, end) for name, begin, end in _reb_parts)
+
+
+def _newline_pattern(pattern, flags = 0):
+    """
+    Returns a bytes pattern matching a line pattern ("^...") right after a
+    newline, which is searched much faster than "^" in multiline mode. Its
+    matches start one byte before the matched line.
+    """
+    return _bytes_pattern(pattern.replace("^", "\\n", 1), flags)
+
+
+# Whole statistical output block: caption, peak value and shot lines
+__RE_STAT_OUT_BLOCK = "^(" + __RE_STAT_OUT_V[1:] + "|" + __RE_STAT_OUT_C[1:] + "|" + \
+    __RE_STAT_OUT_E[1:] + ")[^\\n]*\\n" + __RE_STAT_OUT_PEAK[1:] + \
+    "([^\\n]{0,15})[^\\n]*\\n(?i:" + __RE_STAT_OUT_SHOT[5:] + ")"
+
+def _lis_parts_pattern():
+    """
+    Returns a line pattern with every distinct LIS_PARTS beginning and ending
+    as a named group "pN", and the ("begin" or "end", part name) events of
+    each group.
+    """
+    events = collections.OrderedDict()
+    for name, begin, end in LIS_PARTS:
+        for kind, pattern in (("begin", begin), ("end", end)):
+            regex = pattern.pattern[1:]
+            if regex == "$":
+                # blank lines hold a "\r" in binary mode for DOS line endings
+                regex = "\\r?$"
+            events.setdefault(regex, []).append((kind, name))
+
+    groups = ["(?P<p{0}>{1})".format(i, regex) for i, regex in enumerate(events)]
+    return "^(?:" + "|".join(groups) + ")", list(events.values())
+
+__RE_LIS_PARTS, _lis_part_events = _lis_parts_pattern()
+
+# Line patterns searched over the whole file by the memory-mapped backend, as
+# (first line pattern, following lines pattern)
+_rebn_v_caption = (_reb_v_caption, _newline_pattern(__RE_V_CAPTION_STR))
+_rebn_c_caption = (_reb_c_caption, _newline_pattern(__RE_C_CAPTION_STR))
+_rebn_e_caption = (_reb_e_caption, _newline_pattern(__RE_E_CAPTION_STR))
+_rebn_stat_out_block = (_bytes_pattern(__RE_STAT_OUT_BLOCK),
+                        _newline_pattern(__RE_STAT_OUT_BLOCK))
+_rebn_random_sw_times = (_reb_random_sw_times, _newline_pattern(__RE_RANDOM_SW_TIMES))
+_rebn_sw_times = (_bytes_pattern(__RE_SW_TIMES), _newline_pattern(__RE_SW_TIMES))
+_rebn_lis_parts = (_bytes_pattern(__RE_LIS_PARTS, re.M),
+                   _newline_pattern(__RE_LIS_PARTS, re.M))
+
+# Statistical simulations events: switching times headers, type 183 closing
+# instants headers and (optionally) shot blocks
+def _stat_sim_pattern(shots):
+    events = [__RE_SW_TIMES[1:], __RE_T183_SW_TIMES[1:]]
+    if shots:
+        events.append(__RE_STAT_OUT_BLOCK[1:])
+    pattern = "^(?:" + "|".join("(" + event + ")" for event in events) + ")"
+    return (_bytes_pattern(pattern), _newline_pattern(pattern))
+
+_rebn_stat_sim = _stat_sim_pattern(False)
+_rebn_stat_sim_shots = _stat_sim_pattern(True)
+
+# Beginning (group 1) and ending (group 2) of the statistical simulations part
+__RE_STAT_SIM_PART = "^(?:(" + RE_PART_STATISTICAL_SIMULATIONS_BEGIN.pattern[1:] + ")|(" + \
+    RE_PART_STATISTICAL_SIMULATIONS_END.pattern[1:] + "))"
+_rebn_stat_sim_part = (_bytes_pattern(__RE_STAT_SIM_PART), _newline_pattern(__RE_STAT_SIM_PART))
+
+_stat_out_types = {
+    __RE_STAT_OUT_V[1:].encode("ascii"): "Tensão",
+    __RE_STAT_OUT_C[1:].encode("ascii"): "Corrente",
+    __RE_STAT_OUT_E[1:].encode("ascii"): "Energia",
+}
+
+
+# Line classification. Most .lis lines match none of the patterns a loop is
+# looking for, so they are rejected by a str.startswith check of the literal
+# prefixes of the patterns before a single combined pattern names the kind of
+# the remaining ones.
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+
+def _literal_prefix(regex):
+    """Literal text a line pattern ("^..." or "(?i)^...") starts with."""
+    icase = regex.startswith("(?i)")
+    if icase:
+        regex = regex[4:]
+    prefix = []
+    for char in regex[1:]:
+        if char in _REGEX_SPECIAL:
+            break
+        prefix.append(char)
+    return "".join(prefix), icase
+
+
+class _LineClassifier(object):
+    """
+    Classifies lines (str, or bytes if binary) among line patterns given as
+    (kind, regex) pairs. classify returns (kind, groups of its pattern), or
+    (None, None) for the lines matching none of them.
+    """
+    def __init__(self, kinds, binary = False):
+        self.binary = binary
+        prefixes = set()
+        groups = []
+        self._groups = {}
+        count = 0
+        for kind, regex in kinds:
+            prefix, icase = _literal_prefix(regex)
+            variants = [prefix]
+            if icase:
+                # only the first character, in either case, is certain
+                variants = [prefix[:1].lower(), prefix[:1].upper()]
+            prefixes.update(variants)
+            body = regex[5:] if icase else regex[1:]
+            if icase:
+                body = "(?i:" + body + ")"
+            groups.append("(?P<{0}>{1})".format(kind, body))
+            inner = re.compile(body).groups
+            self._groups[kind] = (count + 1, count + 1 + inner)
+            count += inner + 1
+
+        pattern = "^(?:" + "|".join(groups) + ")"
+        if binary:
+            self.prefixes = tuple(prefix.encode("latin-1") for prefix in prefixes)
+            self.pattern = _bytes_pattern(pattern)
+        else:
+            self.prefixes = tuple(prefixes)
+            self.pattern = re.compile(pattern)
+
+    def classify(self, line):
+        if not line.startswith(self.prefixes):
+            return None, None
+        m = self.pattern.match(line)
+        if m is None:
+            return None, None
+        kind = m.lastgroup
+        begin, end = self._groups[kind]
+        return kind, m.groups()[begin:end]
+
+
+# Statistical table captions and endings and statistical outputs
+_STATISTICAL_LINES = [
+    ("v_caption",    __RE_V_CAPTION_STR),
+    ("c_caption",    __RE_C_CAPTION_STR),
+    ("e_caption",    __RE_E_CAPTION_STR),
+    ("table_ending", __RE_TABLE_ENDING),
+    ("stat_out_v",   __RE_STAT_OUT_V),
+    ("stat_out_c",   __RE_STAT_OUT_C),
+    ("stat_out_e",   __RE_STAT_OUT_E),
+]
+_statistical_lines_b = _LineClassifier(_STATISTICAL_LINES, binary = True)
+_caption_lines = _LineClassifier(_STATISTICAL_LINES[:3])
+_stat_out_lines = _LineClassifier(_STATISTICAL_LINES[4:])
+
+# Table types (as TABLE_*) and variable type names of the line kinds
+_line_kind_tables = {
+    "v_caption":  "voltage", "c_caption":  "current", "e_caption":  "energy",
+    "stat_out_v": "voltage", "stat_out_c": "current", "stat_out_e": "energy",
+}
+_line_kind_types = {
+    "v_caption":  "Tensão", "c_caption":  "Corrente", "e_caption":  "Energia",
+    "stat_out_v": "Tensão", "stat_out_c": "Corrente", "stat_out_e": "Energia",
+}
+_CAPTION_KINDS = ("v_caption", "c_caption", "e_caption")
+_STAT_OUT_KINDS = ("stat_out_v", "stat_out_c", "stat_out_e")
+
+# Statistical simulations lines (see _SimulationsParser): random switching
+# times headers, with the simulation number, switching times headers of any
+# study, type 183 closing instants headers and the simulations part ending
+_RANDOM_SW_TIMES_LINES = [("random_sw_times", __RE_RANDOM_SW_TIMES + " *([0-9]*)")]
+_SW_TIMES_LINES = [("sw_times", __RE_SW_TIMES), ("t183_sw_times", __RE_T183_SW_TIMES)]
+_STAT_SIM_END_LINES = [("stat_sim_end", "^" + RE_PART_STATISTICAL_SIMULATIONS_END.pattern[4:-1])]
+
+# Line classifiers of each reader of the statistical simulations
+_random_sw_times_lines = _LineClassifier(_RANDOM_SW_TIMES_LINES)
+_sw_times_lines = _LineClassifier(_SW_TIMES_LINES)
+_sw_times_shot_lines = _LineClassifier(_STATISTICAL_LINES[4:] + _SW_TIMES_LINES)
+_tail_lines_b = _LineClassifier(_STATISTICAL_LINES[4:] + _RANDOM_SW_TIMES_LINES +
+                                _STAT_SIM_END_LINES, binary = True)
+_event_lines_b = _LineClassifier(_STATISTICAL_LINES[:3] + _STATISTICAL_LINES[4:] +
+                                 _RANDOM_SW_TIMES_LINES, binary = True)
+
+# Literal prefixes of the LIS_PARTS beginnings
+_part_begin_prefixes = tuple(
+    _literal_prefix(begin.pattern)[0].encode("latin-1") for name, begin, end in LIS_PARTS)
+
+
+# File reading backends. Every reader of the module takes a "backend"
+# argument defaulting to BACKEND_TEXT, which reads any file (compressed ones
+# and file objects too); BACKEND_MMAP is chosen per call for large listings.
+BACKEND_TEXT = "text"
+BACKEND_MMAP = "mmap"
+
+
+def _check_backend(backend, lisfile = None):
+    """
+    Validates a backend, returning the one to use for lisfile: compressed
+    listings and file objects cannot be memory-mapped, so they are streamed
+    by the text backend.
+    """
+    if backend not in (BACKEND_TEXT, BACKEND_MMAP):
+        raise ValueError("Unknown .lis reading backend: {0}".format(backend))
+    if backend == BACKEND_MMAP and lisfile is not None and \
+            (_is_file_object(lisfile) or _compression(lisfile) is not None):
+        return BACKEND_TEXT
+    return backend
+
+
+# Compressed listings magic bytes
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC   = b"\xfd7zXZ\x00"
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_XZ   = "xz"
+
+
+def _is_file_object(lisfile):
+    return hasattr(lisfile, "read")
+
+
+def _compression(lisfile):
+    """
+    Returns COMPRESSION_GZIP or COMPRESSION_XZ for a compressed listing path,
+    None for plain listings.
+    """
+    with open(lisfile, "rb") as file:
+        return _magic_compression(file.read(len(_XZ_MAGIC)))
+
+
+def _magic_compression(head):
+    if head.startswith(_GZIP_MAGIC):
+        return COMPRESSION_GZIP
+    if head.startswith(_XZ_MAGIC):
+        return COMPRESSION_XZ
+    return None
+
+
+def _decompressed(file):
+    """
+    Wraps a binary file object in a decompressing reader if its contents are
+    gzip or xz compressed (detected by their magic bytes).
+    """
+    if hasattr(file, "peek"):
+        head = file.peek(len(_XZ_MAGIC))[:len(_XZ_MAGIC)]
+    else:
+        head = file.read(len(_XZ_MAGIC))
+        file.seek(-len(head), io.SEEK_CUR)
+
+    compression = _magic_compression(head)
+    if compression == COMPRESSION_GZIP:
+        return gzip.GzipFile(fileobj = file, mode = "rb")
+    if compression == COMPRESSION_XZ:
+        return lzma.LZMAFile(file, "rb")
+    return file
+
+
+@contextlib.contextmanager
+def open_lis(lisfile, mode = "r"):
+    """
+    Opens a .lis file for reading in text ("r") or binary ("rb") mode, as
+    open would. gzip and xz compressed files are decompressed on the fly.
+    lisfile may also be an open binary or text file object (compressed or
+    not), which is read from its beginning when seekable and left open.
+    """
+    with _open_lis(lisfile, mode) as file:
+        counters = _scan_counters()
+        yield file if counters is None else _CountedFile(file, counters)
+
+
+@contextlib.contextmanager
+def _open_lis(lisfile, mode):
+    if mode not in ("r", "rb"):
+        raise ValueError("Invalid .lis file mode: {0}".format(mode))
+
+    if not _is_file_object(lisfile):
+        raw = open(lisfile, "rb")
+        owned = True
+    else:
+        raw = lisfile
+        owned = False
+        if raw.seekable():
+            raw.seek(0)
+        if isinstance(raw, io.TextIOBase):
+            if mode == "r":
+                yield raw
+                return
+            if not hasattr(raw, "buffer"):
+                raise ValueError("Binary reading needs a binary file object")
+            raw = raw.buffer
+            if raw.seekable():
+                raw.seek(0)
+
+    file = raw
+    try:
+        file = _decompressed(raw)
+        if mode == "r":
+            text = io.TextIOWrapper(file, locale.getpreferredencoding(False))
+            try:
+                yield text
+            finally:
+                # leave file objects given by the caller open
+                text.detach()
+        else:
+            yield file
+    finally:
+        if file is not raw:
+            file.close()
+        if owned:
+            raw.close()
+
+
+@contextlib.contextmanager
+def _mapped(lisfile):
+    """
+    Memory-maps a .lis file for reading. Empty files are given as an empty
+    bytes object, since they cannot be mapped.
+    """
+    with open(lisfile, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+        else:
+            with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as buf:
+                yield buf
+
+
+def _find_lines(buf, patterns, begin = 0, end = None):
+    """
+    Yields (line position, match) for every line of a memory-mapped file
+    matching a pair of line patterns (see _newline_pattern), optionally only
+    the lines between the begin and end offsets, begin being a line start.
+    Matches must end before end.
+    """
+    if end is None:
+        end = len(buf)
+    counters = _scan_counters()
+    if counters is not None:
+        counters.lines += _count_lines(buf, begin, end)
+        # the pair is counted as a single pattern
+        totals = counters.pattern(_pattern_name(patterns))
+        totals[0] += 1
+        for line_pos, m in _find_lines_of(buf, patterns, begin, end):
+            totals[1] += 1
+            yield line_pos, m
+    else:
+        yield from _find_lines_of(buf, patterns, begin, end)
+
+
+def _find_lines_of(buf, patterns, begin, end):
+    first, following = patterns
+    if begin == 0:
+        m = first.match(buf, 0, end)
+        if m:
+            yield 0, m
+        pos = 0
+    else:
+        # the newline ending the previous line
+        pos = begin - 1
+    for m in following.finditer(buf, pos, end):
+        yield m.start() + 1, m
+
+
+def _line_end(buf, pos):
+    """
+    Returns the position after the line (newline included) starting at pos.
+    """
+    end = buf.find(b"\n", pos)
+    if end < 0:
+        return len(buf)
+    return end + 1
+
+
+class _TextLines(object):
+    """
+    Lines of a binary file read as in text mode, while seek takes the byte
+    offsets of a LisIndex (text files only seek to their own tell cookies).
+    """
+    def __init__(self, file):
+        self.file = file
+        self.encoding = locale.getpreferredencoding(False)
+
+    def seek(self, pos):
+        self.file.seek(pos)
+
+    def readline(self):
+        line = self.file.readline().decode(self.encoding)
+        if line.endswith("\r\n"):
+            line = line[:-2] + "\n"
+        return line
+
+
+def _decode_lines(data):
+    """
+    Decodes a block of lines the same way a file opened in text mode would,
+    returning them with their newline characters.
+    """
+    text = data.decode(locale.getpreferredencoding(False))
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+# Opt-in instrumentation (see instrument): the ParseStats and callback of
+# each instrumented thread, and the _ScanCounters of its running extractor
+# call. The parsers count explicitly into the counters of their call, so
+# nothing is shared between threads nor replaced in the module.
+_instrumentation = threading.local()
+
+
+def _thread_stats():
+    """ParseStats of the calling thread, None if not instrumented."""
+    return getattr(_instrumentation, "stats", None)
+
+
+def _scan_counters():
+    """
+    _ScanCounters of the instrumented extractor call running in the calling
+    thread, None if not instrumented. Parsers get them once per call and
+    count through _counted.
+    """
+    return getattr(_instrumentation, "counters", None)
+
+
+class ParseStats(object):
+    """
+    Statistics recorded by the extractors while instrumented:
+      "extractors": {name: {"calls", "seconds", "bytes", "lines", "rows"}}
+      "patterns":   {pattern name: {"evaluations", "matches"}}
+      "files":      {lisfile: {"seconds", "bytes", "lines"}}
+    Bytes are the sizes of the files read (as stored, compressed or not),
+    counted once per extractor call; nested extractor calls are recorded on
+    their own as well. Lines are those the parsers read (decompressed), or
+    searched for the memory-mapped backend, counted while parsing. Patterns
+    are named as the module patterns, bytes versions under the name of the
+    text ones.
+    Statistics of several files, processes or runs are summed by merge.
+    """
+    def __init__(self):
+        self.extractors  = {}
+        self.patterns    = {}
+        self.files       = {}
+
+    def merge(self, other):
+        """Adds the statistics of another ParseStats (or its as_dict)."""
+        if isinstance(other, ParseStats):
+            other = other.as_dict()
+        for attribute in ("extractors", "patterns", "files"):
+            totals = getattr(self, attribute)
+            for name, counters in other[attribute].items():
+                total = totals.setdefault(name, dict.fromkeys(counters, 0))
+                for counter, value in counters.items():
+                    total[counter] = total.get(counter, 0) + value
+        return self
+
+    def as_dict(self):
+        return {
+            "extractors": dict((k, dict(v)) for k, v in self.extractors.items()),
+            "patterns":   dict((k, dict(v)) for k, v in self.patterns.items()),
+            "files":      dict((k, dict(v)) for k, v in self.files.items()),
+        }
+
+    @staticmethod
+    def _file_size(lisfile):
+        if lisfile is None or _is_file_object(lisfile):
+            return 0
+        try:
+            return os.stat(lisfile).st_size
+        except OSError:
+            return 0
+
+    def record(self, name, lisfile, seconds, rows, scanned = None):
+        """Adds an extractor call and its _ScanCounters, if given."""
+        size = self._file_size(lisfile)
+        lines = scanned.lines if scanned is not None else 0
+        counters = self.extractors.setdefault(
+            name, {"calls": 0, "seconds": 0.0, "bytes": 0, "lines": 0, "rows": 0})
+        counters["calls"]   += 1
+        counters["seconds"] += seconds
+        counters["bytes"]   += size
+        counters["lines"]   += lines
+        counters["rows"]    += rows
+        if scanned is not None:
+            for pattern, (evaluations, matches) in scanned.patterns.items():
+                counters = self.patterns.setdefault(pattern, {"evaluations": 0, "matches": 0})
+                counters["evaluations"] += evaluations
+                counters["matches"]     += matches
+        if lisfile is not None and not _is_file_object(lisfile):
+            counters = self.files.setdefault(
+                str(lisfile), {"seconds": 0.0, "bytes": 0, "lines": 0})
+            counters["seconds"] += seconds
+            counters["bytes"]   += size
+            counters["lines"]   += lines
+        return counters
+
+    def slowest_files(self, n = 10):
+        """Returns the n files of lowest throughput, as (lisfile, MB/s)."""
+        speeds = [(lisfile, counters["bytes"] / 1.0e6 / max(counters["seconds"], 1.0e-9))
+                  for lisfile, counters in self.files.items()]
+        return sorted(speeds, key = lambda item: item[1])[:n]
+
+    def report(self):
+        """Returns the statistics as a text table."""
+        lines = ["{0:32s} {1:>7s} {2:>10s} {3:>10s} {4:>12s} {5:>10s}".format(
+            "extractor", "calls", "seconds", "MB/s", "lines", "rows")]
+        for name, c in sorted(self.extractors.items()):
+            lines.append("{0:32s} {1:7d} {2:10.3f} {3:10.1f} {4:12d} {5:10d}".format(
+                name, c["calls"], c["seconds"],
+                c["bytes"] / 1.0e6 / max(c["seconds"], 1.0e-9), c["lines"], c["rows"]))
+        lines.append("")
+        lines.append("{0:32s} {1:>12s} {2:>12s}".format("pattern", "evaluations", "matches"))
+        for name, c in sorted(self.patterns.items()):
+            if c["evaluations"] == 0:
+                continue
+            lines.append("{0:32s} {1:12d} {2:12d}".format(name, c["evaluations"], c["matches"]))
+        return "\n".join(lines)
+
+
+class _ScanCounters(object):
+    """Lines read and patterns evaluated by an instrumented extractor call."""
+    def __init__(self):
+        self.lines = 0
+        # pattern name -> [evaluations, matches]
+        self.patterns = {}
+
+    def pattern(self, name):
+        totals = self.patterns.get(name)
+        if totals is None:
+            totals = self.patterns[name] = [0, 0]
+        return totals
+
+
+class _CountedPattern(object):
+    """Compiled pattern counting its evaluations and matches into totals."""
+    def __init__(self, pattern, totals):
+        self._pattern = pattern
+        self._totals  = totals
+
+    def __getattr__(self, name):
+        return getattr(self._pattern, name)
+
+    def _count(self, m):
+        self._totals[0] += 1
+        if m is not None:
+            self._totals[1] += 1
+        return m
+
+    def match(self, *args):
+        return self._count(self._pattern.match(*args))
+
+    def search(self, *args):
+        return self._count(self._pattern.search(*args))
+
+    def fullmatch(self, *args):
+        return self._count(self._pattern.fullmatch(*args))
+
+    def finditer(self, *args):
+        self._totals[0] += 1
+        for m in self._pattern.finditer(*args):
+            self._totals[1] += 1
+            yield m
+
+    def findall(self, *args):
+        found = self._pattern.findall(*args)
+        self._totals[0] += 1
+        self._totals[1] += len(found)
+        return found
+
+
+class _CountedFile(object):
+    """File object counting the lines read through it into a _ScanCounters."""
+    def __init__(self, file, counters):
+        self._file     = file
+        self._counters = counters
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        counters = self._counters
+        for line in self._file:
+            counters.lines += 1
+            yield line
+
+    def readline(self, *args):
+        line = self._file.readline(*args)
+        if line:
+            self._counters.lines += 1
+        return line
+
+    def read(self, *args):
+        data = self._file.read(*args)
+        self._counters.lines += data.count("\n" if isinstance(data, str) else b"\n")
+        return data
+
+
+# id of every module pattern, line classifier and pattern pair -> its name
+_pattern_names = {}
+
+
+def _pattern_name(value):
+    """Name of a module pattern (see ParseStats), line classifier or pair."""
+    if not _pattern_names:
+        names = {}
+        def add(value, name):
+            if isinstance(value, (re.Pattern, _LineClassifier)):
+                names.setdefault(id(value), (name, value))
+            elif isinstance(value, (tuple, list)):
+                if value and all(isinstance(item, re.Pattern) for item in value):
+                    names.setdefault(id(value), (name, value))
+                for i, item in enumerate(value):
+                    add(item, "{0}[{1}]".format(name, i))
+            elif isinstance(value, dict):
+                for key, item in value.items():
+                    add(item, "{0}[{1}]".format(name, key))
+
+        # not rebinding value, the pattern looked up below
+        for name, item in list(globals().items()):
+            if not (name.startswith("__") and name.endswith("__")):
+                add(item, name)
+        text_names = {}
+        for name, pattern in names.values():
+            if isinstance(pattern, re.Pattern) and isinstance(pattern.pattern, str):
+                text_names.setdefault(pattern.pattern, name)
+        for key, (name, pattern) in names.items():
+            if isinstance(pattern, re.Pattern) and isinstance(pattern.pattern, bytes):
+                name = text_names.get(pattern.pattern.decode("latin-1"), name)
+            _pattern_names[key] = name
+    if id(value) in _pattern_names:
+        return _pattern_names[id(value)]
+    return repr(getattr(value, "pattern", value))
+
+
+def _counted(counters, value):
+    """
+    Returns a pattern or line classifier (or a tuple, list or dict of them)
+    counting the evaluations and matches of its patterns into a parser's
+    _ScanCounters, or value itself without counters, so that parsers cost
+    the same as ever when not instrumented.
+    """
+    if counters is None:
+        return value
+    if isinstance(value, re.Pattern):
+        return _CountedPattern(value, counters.pattern(_pattern_name(value)))
+    if isinstance(value, _LineClassifier):
+        # only the lines passing the prefix check reach its pattern
+        classifier = _LineClassifier.__new__(_LineClassifier)
+        classifier.__dict__.update(value.__dict__)
+        classifier.pattern = _CountedPattern(value.pattern,
+                                             counters.pattern(_pattern_name(value)))
+        return classifier
+    if isinstance(value, (tuple, list)):
+        return type(value)(_counted(counters, item) for item in value)
+    if isinstance(value, dict):
+        return dict((key, _counted(counters, item)) for key, item in value.items())
+    return value
+
+
+# Block size of the buffers whose lines are counted while instrumented
+_COUNT_BLOCK_BYTES = 1024 * 1024
+
+
+def _count_lines(buf, begin, end):
+    """Lines between two offsets of a buffer, counted by blocks."""
+    lines = 0
+    for pos in range(begin, end, _COUNT_BLOCK_BYTES):
+        lines += buf[pos:min(pos + _COUNT_BLOCK_BYTES, end)].count(b"\n")
+    return lines
+
+
+@contextlib.contextmanager
+def instrument(stats = None, callback = None):
+    """
+    Records the extractor calls of the calling thread into a ParseStats while
+    in the context, which yields it: their time, bytes, lines and rows, and
+    the evaluations and matches of the patterns they use. callback, if given,
+    is called with (extractor name, lisfile, seconds, rows) after each
+    extractor call.
+
+    Only the extractor calls of this thread, while in the context, count
+    anything; other threads (and this one, outside the context) parse as
+    when nothing is instrumented. Contexts may be nested.
+    """
+    if stats is None:
+        stats = ParseStats()
+    previous = (_thread_stats(), getattr(_instrumentation, "callback", None),
+                _scan_counters())
+    try:
+        _instrumentation.stats, _instrumentation.callback = stats, callback
+        _instrumentation.counters = None
+        yield stats
+    finally:
+        (_instrumentation.stats, _instrumentation.callback,
+         _instrumentation.counters) = previous
+
+
+def _instrumented(name = None, lisfile_arg = 0, rows = len):
+    """
+    Extractor decorator recording its calls while instrumented. name defaults
+    to the class name of the instance (for methods), lisfile_arg is the
+    position of the .lis file argument and rows(result, args) the number of
+    rows parsed. The call gets its own _ScanCounters (see _scan_counters),
+    whose lines are counted by the calls it is nested in too.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stats = _thread_stats()
+            if stats is None:
+                return function(*args, **kwargs)
+
+            outer = _scan_counters()
+            scanned = _instrumentation.counters = _ScanCounters()
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                _instrumentation.counters = outer
+            seconds = time.perf_counter() - start
+            if outer is not None:
+                outer.lines += scanned.lines
+            extractor = name if name is not None else type(args[0]).__name__
+            lisfile = args[lisfile_arg] if len(args) > lisfile_arg else \
+                kwargs.get("lisfile", kwargs.get("file"))
+            parsed = rows(result, args) if rows is not len else \
+                (len(result) if hasattr(result, "__len__") else 0)
+            stats.record(extractor, lisfile, seconds, parsed, scanned)
+            callback = _instrumentation.callback
+            if callback is not None:
+                callback(extractor, lisfile, seconds, parsed)
+            return result
+        return wrapper
+    return decorator
+
+
+class _PartsTracker(object):
+    """
+    Follows the LIS_PARTS beginnings and endings found line by line,
+    recording the (begin, end) byte offsets of each part occurrence.
+    """
+    def __init__(self):
+        self.sections = {}
+        # part name -> [begin offset, ending matches]
+        self.opened = {}
+
+    def begin(self, name, pos):
+        if name not in self.opened:
+            self.opened[name] = [pos, 0]
+
+    def end(self, name, pos):
+        part = self.opened.get(name)
+        if part is None:
+            return
+        part[1] += 1
+        if part[1] >= _LIS_PART_ENDINGS.get(name, 1):
+            del self.opened[name]
+            self.sections.setdefault(name, []).append((part[0], pos))
+
+    def close(self, size):
+        """Parts still open end with the file."""
+        for name, part in self.opened.items():
+            self.sections.setdefault(name, []).append((part[0], size))
+        self.opened = {}
+
+
+@_instrumented("find_lis_parts")
+def find_lis_parts(lisfile, backend = BACKEND_TEXT):
+    """
+    Returns the byte offsets of every part of a .lis file (see LIS_PARTS), as
+    {part name: [(begin, end), ...]}. A part begins at the line matching its
+    beginning pattern and ends before the line matching its ending pattern.
+    """
+    backend = _check_backend(backend, lisfile)
+    parts = _PartsTracker()
+    if backend == BACKEND_MMAP:
+        with _mapped(lisfile) as buf:
+            for pos, m in _find_lines(buf, _rebn_lis_parts):
+                if pos == len(buf):
+                    break
+                events = _lis_part_events[int(m.lastgroup[1:])]
+                for kind, name in events:
+                    if kind == "end":
+                        parts.end(name, pos)
+                for kind, name in events:
+                    if kind == "begin":
+                        parts.begin(name, pos)
+            parts.close(len(buf))
+        return parts.sections
+
+    part_patterns = _counted(_scan_counters(), (_reb_parts, _reb_part_ends))
+    pos = 0
+    with open_lis(lisfile, "rb") as file:
+        for line in file:
+            _track_parts_line(parts, line, pos, part_patterns)
+            pos += len(line)
+    parts.close(pos)
+    return parts.sections
+
+
+def _track_parts_line(parts, line, pos, part_patterns = (_reb_parts, _reb_part_ends)):
+    """
+    Follows the parts beginning or ending at a line, through the (beginning,
+    ending) part patterns given (counted, see _counted).
+    """
+    part_begins, part_ends = part_patterns
+    if parts.opened:
+        text = line.rstrip(b"\r\n")
+        for name in list(parts.opened):
+            if part_ends[name].match(text):
+                parts.end(name, pos)
+    if line.startswith(_part_begin_prefixes):
+        for name, begin, end in part_begins:
+            if begin.match(line):
+                parts.begin(name, pos)
+
+
+# Statistical distribution table row, with the same sequence, units and types
+# as in .lis file: interval number, per unit value, physical value, frequency
+# (density), cumulative frequency and per cent greater or equal current value
+STAT_TABLE_DTYPE = np.dtype([
+    ("interval",   np.int64),
+    ("pu",         np.float64),
+    ("value",      np.float64),
+    ("density",    np.int64),
+    ("cumulative", np.int64),
+    ("ge",         np.float64),
+])
+
+# Statistical distribution table base and grouped/ungrouped data moments
+STAT_MOMENTS_DTYPE = np.dtype([
+    ("base",  np.float64),
+    ("gmean", np.float64),
+    ("gvar",  np.float64),
+    ("gstd",  np.float64),
+    ("umean", np.float64),
+    ("uvar",  np.float64),
+    ("ustd",  np.float64),
+])
+
+# Fixed-width records. Each ATP fixed-width line layout is declared once as a
+# FixedWidthRecord and compiled into parsing functions used by the extractors.
+RecordField = collections.namedtuple("RecordField", ["name", "start", "end", "type"])
+
+# numpy types of the record field types
+_RECORD_FIELD_DTYPES = {int: np.int64, float: np.float64, str: object}
+
+
+class FixedWidthRecord(object):
+    """
+    Layout of a fixed-width .lis line: its fields as (name, start, end, type)
+    columns, with end None for the rest of the line and type int, float or
+    str (stripped). The layout is compiled into:
+      parse(line): the fields values of a line (str or bytes), as a tuple,
+        or the value itself for single field records
+      parse_at(buf, pos, end): the same, for the line of a buffer (e.g. a
+        memory-mapped file) starting at pos and ending at end
+    parse_lines converts many lines at once into a structured array.
+
+    ATP versions printing a record at other columns are declared with
+    variant, without changing the code reading it.
+    """
+    def __init__(self, name, fields):
+        self.name   = name
+        self.fields = [RecordField(*field) for field in fields]
+        self.dtype  = np.dtype([(field.name, _RECORD_FIELD_DTYPES[field.type])
+                                for field in self.fields])
+        self.parse    = self._compile("line", "line[{start}:{end}]")
+        self.parse_at = self._compile("buf, pos, end", "buf[pos + {start}:{end_at}]")
+
+    def __reduce__(self):
+        # compiled functions are not picklable, the layout is
+        return (FixedWidthRecord, (self.name, [tuple(field) for field in self.fields]))
+
+    def __repr__(self):
+        return "FixedWidthRecord({0!r}, {1!r})".format(
+            self.name, [tuple(field) for field in self.fields])
+
+    def _compile(self, arguments, item):
+        values = []
+        for field in self.fields:
+            text = item.format(
+                start = field.start,
+                end = "" if field.end is None else field.end,
+                end_at = "end" if field.end is None else
+                         "min(pos + {0}, end)".format(field.end))
+            if field.type is str:
+                values.append("{0}.strip()".format(text))
+            else:
+                values.append("{0}({1})".format(field.type.__name__, text))
+        if len(values) == 1:
+            body = values[0]
+        else:
+            body = "(" + ", ".join(values) + ")"
+        source = "def parse_{0}({1}):\n    return {2}\n".format(self.name, arguments, body)
+        namespace = {}
+        exec(compile(source, "<record {0}>".format(self.name), "exec"), namespace)
+        return namespace["parse_" + self.name]
+
+    def field(self, name):
+        for field in self.fields:
+            if field.name == name:
+                return field
+        raise KeyError(name)
+
+    def variant(self, name = None, **columns):
+        """
+        Returns a copy of the record with the (start, end) columns of some
+        fields changed, e.g. variant(peak = (41, 56)).
+        """
+        fields = []
+        for field in self.fields:
+            if field.name in columns:
+                start, end = columns[field.name]
+                field = field._replace(start = start, end = end)
+            fields.append(field)
+        return FixedWidthRecord(name or self.name, fields)
+
+    @property
+    def width(self):
+        """Line width taken by the record fields."""
+        if any(field.end is None for field in self.fields):
+            raise ValueError("record {0} has a field up to the line end".format(self.name))
+        return max(field.end for field in self.fields)
+
+    def parse_lines(self, lines):
+        """
+        Converts the fields of many lines (str or bytes) at once, through a
+        fixed-width byte layout. Returns a structured array of dtype.
+        """
+        result = np.zeros(len(lines), dtype = self.dtype)
+        if not lines:
+            return result
+
+        width = self.width
+        layout = np.dtype({
+            "names":    [field.name for field in self.fields],
+            "formats":  ["S{0}".format(field.end - field.start) for field in self.fields],
+            "offsets":  [field.start for field in self.fields],
+            "itemsize": width,
+        })
+        if isinstance(lines[0], bytes):
+            block = b"".join([line.rstrip(b"\r\n").ljust(width)[:width] for line in lines])
+        else:
+            block = "".join([line.rstrip("\r\n").ljust(width)[:width]
+                             for line in lines]).encode("latin-1")
+        raw = np.frombuffer(block, dtype = layout)
+        for field in self.fields:
+            if field.type is str:
+                result[field.name] = [value.decode("latin-1").strip() for value in raw[field.name]]
+            else:
+                result[field.name] = raw[field.name].astype(self.dtype[field.name])
+        return result
+
+
+# Statistical distribution table row (see stat_table_read_line)
+STAT_TABLE_ROW = FixedWidthRecord("stat_table_row", [
+    ("interval",    0, 10, int),
+    ("pu",         10, 30, float),
+    ("value",      30, 50, float),
+    ("density",    50, 64, int),
+    ("cumulative", 64, 78, int),
+    ("ge",         78, 98, float),
+])
+
+# Mean, variance and standard deviation lines ending a distribution table
+STAT_TABLE_SUMMARY = FixedWidthRecord("stat_table_summary", [
+    ("grouped",   40, 54, float),
+    ("ungrouped", 59, 73, float),
+])
+
+# Distribution table captions, with their base up to the line end
+VOLTAGE_TABLE_CAPTION = FixedWidthRecord("voltage_table_caption", [("base", 114, None, float)])
+CURRENT_TABLE_CAPTION = FixedWidthRecord("current_table_caption", [("base", 116, None, float)])
+
+# Peak value line of a statistical output block
+STAT_OUT_PEAK = FixedWidthRecord("stat_out_peak", [("peak", 40, 55, float)])
+
+# Line following "Random switching times for simulation number", with the
+# times of the three phases of a statistical switch
+THREE_PHASE_SWITCHING_TIMES = FixedWidthRecord("three_phase_switching_times", [
+    ("sw_a", 38, 51, float),
+    ("sw_b", 58, 71, float),
+    ("sw_c", 78, 91, float),
+])
+
+
+# Type 183 closing instants lines start with the switch name, up to this
+# column; the times follow it
+_T183_NAME_END = 8
+
+
+def _t183_times(line):
+    """Closing instants of a type 183 line, as strings, after its name."""
+    return _re_float_e.findall(line, _T183_NAME_END)
+
 
 class LisSwitchingTimes:
     """Base class for extraction of statistical simulations switching time."""
-    def __init__(self, lisfile):
+    @_instrumented(lisfile_arg = 1, rows = lambda result, args: len(args[0].sw_a))
+    def __init__(self, lisfile, backend = BACKEND_TEXT):
         # A, B, and C phases switching times
         self.sw_a = []
         self.sw_b = []
         self.sw_c = []
 
-        self.read(lisfile)
+        backend = _check_backend(backend, lisfile)
+        if backend == BACKEND_MMAP:
+            self.read_mmap(lisfile)
+        else:
+            self.read(lisfile)
 
     def read(self, lisfile):
         pass
 
+    def read_mmap(self, lisfile):
+        """Memory-mapped reading, falling back to read if not specialized."""
+        self.read(lisfile)
+
 
 class ThreePhaseSwitchingTimes(LisSwitchingTimes):
     """Extract all switching times written in the lis file after "Random switching 
@@ -123,33 +1203,126 @@ class ThreePhaseSwitchingTimes(LisSwitchingTimes):
     Works only with one threephase statistical switch.
     """
     def read(self, lisfile):
-        with open(lisfile, "r") as file:
-            line = file.readline()
-            while line != "":
-                if _re_random_sw_times.match(line):
-                    """
-                    Random switching times for simulation number  XXX:
-                     23  XXXXXXXXXXXXX   24  XXXXXXXXXXXXX   25  XXXXXXXXXXXXX
-                    """
-                    # read next line with timings
-                    line = file.readline()
-                    self.sw_a.append(float(line[38:51]))
-                    self.sw_b.append(float(line[58:71]))
-                    self.sw_c.append(float(line[78:91]))
+        # Random switching times for simulation number  XXX:
+        #  23  XXXXXXXXXXXXX   24  XXXXXXXXXXXXX   25  XXXXXXXXXXXXX
+        parser = _SimulationsParser(_random_sw_times_lines, counters = _scan_counters())
+        with open_lis(lisfile, "r") as file:
+            for line in file:
+                event = parser.feed(line)
+                if event is not None:
+                    simulation, sw_a, sw_b, sw_c = event[1]
+                    self.sw_a.append(sw_a)
+                    self.sw_b.append(sw_b)
+                    self.sw_c.append(sw_c)
+
+    def read_mmap(self, lisfile):
+        with _mapped(lisfile) as buf:
+            self.read_range(buf)
+
+    def read_range(self, buf, begin = 0, end = None):
+        """Reads the switching times between two offsets of a mapped file."""
+        for line_pos, m in _find_lines(buf, _rebn_random_sw_times, begin, end):
+            # timings are in the next line
+            pos = _line_end(buf, m.end())
+            line_end = _line_end(buf, pos)
+            try:
+                sw_a, sw_b, sw_c = THREE_PHASE_SWITCHING_TIMES.parse_at(buf, pos, line_end)
+            except ValueError:
+                # as _SimulationsParser reads them
+                times = _three_phase_times(buf[pos:line_end])
+                if times is None:
+                    continue
+                sw_a, sw_b, sw_c = times
+            self.sw_a.append(sw_a)
+            self.sw_b.append(sw_b)
+            self.sw_c.append(sw_c)
+
+    @classmethod
+    def from_times(cls, sw_a, sw_b, sw_c):
+        """Builds the switching times from their lists, without reading a file."""
+        times = cls.__new__(cls)
+        times.sw_a = list(sw_a)
+        times.sw_b = list(sw_b)
+        times.sw_c = list(sw_c)
+        return times
+
+
+class SwitchingTimes(LisSwitchingTimes):
+    """
+    Extract the times of any number of statistical/systematic switches and
+    the closing instants of type 183 switches of every simulation. Times are
+    kept in "times", an array of shape (simulations x switches) whose rows
+    are numbered by "simulations" and columns labelled by "switches": the
+    switch number for statistical/systematic switches and "T183-n" for the
+    n-th type 183 closing instant. Missing times are NaN.
+
+    sw_a, sw_b and sw_c hold the first three columns, as in
+    ThreePhaseSwitchingTimes.
+    """
+    def __init__(self, lisfile = None, backend = BACKEND_TEXT):
+        self.simulations = np.zeros(0, dtype = np.int32)
+        self.switches    = []
+        self.times       = np.zeros((0, 0))
+        if lisfile is None:
+            self.sw_a = []
+            self.sw_b = []
+            self.sw_c = []
+        else:
+            LisSwitchingTimes.__init__(self, lisfile, backend)
 
-                line = file.readline()
+    def read(self, lisfile):
+        _read_statistical_simulations(lisfile, BACKEND_TEXT, False, self)
+
+    def read_mmap(self, lisfile):
+        _read_statistical_simulations(lisfile, BACKEND_MMAP, False, self)
+
+    def column(self, switch):
+        """Returns the times of a switch label."""
+        return self.times[:, self.switches.index(str(switch))]
+
+    def rows_of(self, shots):
+        """
+        Returns the rows of "times" of the given simulation numbers (e.g. the
+        "shot" column of a ShotTable), -1 for unknown simulations.
+        """
+        order = np.argsort(self.simulations, kind = "stable")
+        simulations = self.simulations[order]
+        shots = np.asarray(shots)
+        pos = np.searchsorted(simulations, shots)
+        pos = np.minimum(pos, max(len(simulations) - 1, 0))
+        found = simulations[pos] == shots if len(simulations) else \
+            np.zeros(len(shots), dtype = bool)
+        return np.where(found, order[pos] if len(order) else -1, -1)
+
+    def of_shots(self, shots):
+        """
+        Returns the times of the given simulation numbers, one row per shot
+        (NaN for unknown simulations), joining shot peaks to their switching
+        times.
+        """
+        rows = self.rows_of(shots)
+        times = np.full((len(rows), len(self.switches)), np.nan)
+        found = rows >= 0
+        times[found] = self.times[rows[found]]
+        return times
 
 
 class StatTable(object):
     """
     Base class for reading statistical distribution table data of an ATP .lis 
     file.
+
+    "table" is the list of rows, each one as given by stat_table_read_line,
+    and "array" the same rows as a STAT_TABLE_DTYPE structured array, for
+    vectorized code. Rows changed through "table" are seen by "array".
     """
     def __init__(self):
         self.type  = ""
         self.node1 = ""
         self.node2 = ""
-        self.table = []
+        # rows as read (array) and as lists (built from it when accessed)
+        self._array = np.zeros(0, dtype = STAT_TABLE_DTYPE)
+        self._rows  = None
         self.base  = 1.0
         self.gmean = 0.0
         self.gvar  = 0.0
@@ -157,14 +1330,50 @@ class StatTable(object):
         self.umean = 0.0
         self.uvar  = 0.0
         self.ustd  = 0.0
-        self.BASE_COLUMN = 0
+        # FixedWidthRecord of the table caption, holding its base
+        self.caption = None
+
+    @property
+    def table(self):
+        """Table rows, as lists of stat_table_read_line values."""
+        if self._rows is None:
+            self._rows = [list(row) for row in self._array.tolist()]
+        return self._rows
+
+    @table.setter
+    def table(self, rows):
+        self._rows  = rows
+        self._array = None
+
+    @property
+    def array(self):
+        """Table rows, as a STAT_TABLE_DTYPE structured array."""
+        if self._rows is not None:
+            # the row lists may have been changed since
+            return np.array([tuple(row) for row in self._rows], dtype = STAT_TABLE_DTYPE)
+        return self._array
+
+    @array.setter
+    def array(self, rows):
+        self._array = rows
+        self._rows  = None
+
+    @property
+    def BASE_COLUMN(self):
+        """Column of the base in the table caption."""
+        caption = getattr(self, "caption", None)
+        return 0 if caption is None else caption.field("base").start
+
+    @BASE_COLUMN.setter
+    def BASE_COLUMN(self, column):
+        self.caption = VOLTAGE_TABLE_CAPTION.variant("table_caption", base = (column, None))
 
     def read_base(self, line):
         """
         Given the first line of a voltage/current distribution table, read its
         base.
         """
-        self.base = float(line[self.BASE_COLUMN:].strip())
+        self.base = self.caption.parse(line)
 
     def read_phase_table(self, file, line):
         # read voltage/current base at first table line 
@@ -183,8 +1392,33 @@ class StatTable(object):
         # read data
         self.read_table(file)
 
-    def open_and_read(self, lisfile, summary):
-        with open(lisfile, "r") as file:
+    def read_indexed(self, file, entry):
+        """
+        Given a binary file and a LisIndex table entry, seek straight to its
+        caption (a byte offset) and read it. Summary tables are read from the
+        ending of the last phase table.
+        """
+        if entry is None:
+            return
+        file = _TextLines(file)
+        file.seek(entry.caption)
+        line = file.readline()
+        if entry.phase != TABLE_SUMMARY:
+            self.read_phase_table(file, line)
+        else:
+            self.read_base(line)
+            file.seek(entry.start)
+            line = file.readline()
+            self.read_summary_table(file, line)
+
+    @_instrumented(lisfile_arg = 1, rows = lambda result, args: len(args[0].array))
+    def open_and_read(self, lisfile, summary, index = None):
+        if index is not None:
+            with open_lis(lisfile, "rb") as file:
+                entry = index.find(self.type, self.node1, self.node2, summary)
+                self.read_indexed(file, entry)
+            return
+        with open_lis(lisfile, "r") as file:
             self.read(file, summary)
 
     def read(self, file, summary):
@@ -192,10 +1426,12 @@ class StatTable(object):
 
     def read_table(self, file):
         # read summary table data
+        lines = []
         line = file.readline()
-        while not is_table_ending(line):
-            self.table.append(stat_table_read_line(line))
+        while line != "" and not is_table_ending(line):
+            lines.append(line)
             line = file.readline()
+        self.array = stat_table_read_lines(lines)
         # table ending found, read mean, variance and std.
         meanl = file.readline()
         varl  = file.readline()
@@ -209,10 +1445,33 @@ class StatTable(object):
         self.uvar  = gu_data[4]
         self.ustd  = gu_data[5]
 
-    def read_v_table(self, lisfile, node, summary = False):
+    def table_rows(self):
+        """
+        Returns a copy of the table rows, each one as given by
+        stat_table_read_line.
+        """
+        return [list(row) for row in self.table]
+
+    def moments(self):
+        """
+        Returns the table base and grouped/ungrouped data mean, variance and
+        standard deviation as a STAT_MOMENTS_DTYPE record.
+        """
+        return np.array((self.base, self.gmean, self.gvar, self.gstd,
+                         self.umean, self.uvar, self.ustd),
+                        dtype = STAT_MOMENTS_DTYPE)[()]
+
+    @_instrumented("StatTable.read_v_table", 1, lambda result, args: len(args[0].array))
+    def read_v_table(self, lisfile, node, summary = False, index = None):
         self.node1 = node
         self.node2 = ""
         self.type = "voltage"
+        self.caption = VOLTAGE_TABLE_CAPTION
+
+        if index is not None:
+            with open_lis(lisfile, "rb") as file:
+                self.read_indexed(file, index.find(self.type, node, "", summary))
+            return
 
         node_prefix = _get_node_name_prefix(node)
 
@@ -220,12 +1479,12 @@ class StatTable(object):
         phase = ""
         waitingTableEnd = False
         
-        with open(lisfile, "r") as file:
+        with open_lis(lisfile, "r") as file:
             line = file.readline()
             while line != "":
                 if is_vpeak_statistical_table(node_prefix, line) and not summary:
                     # get base
-                    self.base = float(line[114:].strip())
+                    self.base = VOLTAGE_TABLE_CAPTION.parse(line)
                     # skip next two rows
                     file.readline()
                     file.readline()
@@ -236,7 +1495,7 @@ class StatTable(object):
                 elif summary:
                     if is_vpeak_statistical_table(node_prefix, line):
                         # get base
-                        self.base = float(line[114:].strip())
+                        self.base = VOLTAGE_TABLE_CAPTION.parse(line)
                         if phase == "":
                             phase = "A"
                         elif phase == "A":
@@ -258,10 +1517,17 @@ class StatTable(object):
 
                 line = file.readline()
 
-    def read_c_table(self, lisfile, node1, node2, summary = False):
+    @_instrumented("StatTable.read_c_table", 1, lambda result, args: len(args[0].array))
+    def read_c_table(self, lisfile, node1, node2, summary = False, index = None):
         self.node1 = node1
         self.node2 = node2
         self.type = "current"
+        self.caption = CURRENT_TABLE_CAPTION
+
+        if index is not None:
+            with open_lis(lisfile, "rb") as file:
+                self.read_indexed(file, index.find(self.type, node1, node2, summary))
+            return
 
         node1_prefix = _get_node_name_prefix(node1)
         node2_prefix = _get_node_name_prefix(node2)
@@ -270,12 +1536,12 @@ class StatTable(object):
         phase = ""
         waitingTableEnd = False
 
-        with open(lisfile, "r") as file:
+        with open_lis(lisfile, "r") as file:
             line = file.readline()
             while line != "":
                 if is_cpeak_statistical_table(node1_prefix, node2_prefix, line) and not summary:
                     # get base current
-                    self.base = float(line[116:].strip())
+                    self.base = CURRENT_TABLE_CAPTION.parse(line)
                     # skip next two rows
                     file.readline()
                     file.readline()
@@ -286,7 +1552,7 @@ class StatTable(object):
                 elif summary:
                     if is_cpeak_statistical_table(node1_prefix, node2_prefix, line):
                         # get base
-                        self.base = float(line[116:].strip())
+                        self.base = CURRENT_TABLE_CAPTION.parse(line)
                         if phase == "":
                             phase = "A"
                         elif phase == "A":
@@ -313,14 +1579,15 @@ class VoltageStatTable(StatTable):
     """
     Read data from statistical distribution of peak voltages tables of an ATP
     .lis file, given its node name and whether its the summary table or not.
+    An optional LisIndex of the file avoids scanning it for the table.
     """
-    def __init__(self, lisfile, node, summary = False):
+    def __init__(self, lisfile, node, summary = False, index = None):
         super(VoltageStatTable, self).__init__()
         self.node1 = node
         self.node2 = ""
         self.type = "voltage"
-        self.BASE_COLUMN = 114
-        self.open_and_read(lisfile, summary)
+        self.caption = VOLTAGE_TABLE_CAPTION
+        self.open_and_read(lisfile, summary, index)
 
     def read(self, file, summary):
         node_prefix = _get_node_name_prefix(self.node1)
@@ -360,15 +1627,15 @@ class CurrentStatTable(StatTable):
     """
     Read data from statistical distribution of peak current tables of an ATP
     .lis file, given its branch nodes names and whether its the summary table 
-    or not.
+    or not. An optional LisIndex of the file avoids scanning it for the table.
     """
-    def __init__(self, lisfile, node1, node2, summary = False):
+    def __init__(self, lisfile, node1, node2, summary = False, index = None):
         super(CurrentStatTable, self).__init__()
         self.node1 = node1
         self.node2 = node2
         self.type = "current"
-        self.BASE_COLUMN = 116
-        self.open_and_read(lisfile, summary)
+        self.caption = CURRENT_TABLE_CAPTION
+        self.open_and_read(lisfile, summary, index)
 
     def read(self, file, summary):
         node_prefix1 = _get_node_name_prefix(self.node1)
@@ -405,58 +1672,412 @@ class CurrentStatTable(StatTable):
                 line = file.readline()
 
 
-def get_shots_information(lisfile):
-    shots = []
-    with open(lisfile, "r") as file:
-        line = file.readline()
-        while line != "":
-            vmatch = __re_stat_out_v.match(line)
-            cmatch = __re_stat_out_c.match(line)
-            ematch = __re_stat_out_e.match(line)
+# Month names as printed in the .lis header (abbreviated or in full)
+_MONTHS = dict((name, number + 1) for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]))
 
-            if vmatch:
-                # peak value
-                line = file.readline()
-                if __re_stat_out_peak.match(line):
-                    peak = float(line[40:55].strip())
-                    line = file.readline()
-                    smatch = __re_stat_out_shot.match(line)
-                    ttype = "Tensão"
+# Lines of the .lis header searched for its dates
+_HEADER_LINES = 50
 
-                    no01, no02, shot = get_shot_information(line)
-                    shots.append([ttype, no01, no02, peak, shot])
 
-            elif cmatch:
-                # peak value
-                line = file.readline()
-                if __re_stat_out_peak.match(line):
-                    peak = float(line[40:55].strip())
-                    line = file.readline()
-                    smatch = __re_stat_out_shot.match(line)
-                    ttype = "Corrente"
+def get_file_dates(lisfile):
+    """
+    Returns the ATP source code date (datetime.date) and the simulation date
+    and time of day (datetime.datetime) printed in the header of a .lis file,
+    None for those not found.
+    """
+    source_date = None
+    simulation = None
+    with open_lis(lisfile) as file:
+        for number, line in enumerate(file):
+            if number >= _HEADER_LINES or (source_date and simulation):
+                break
+            m = __re_simulation_datetime.search(line)
+            if m and simulation is None:
+                day, month, year, hour, minute, second = m.groups()
+                year = int(year) + (2000 if len(year) == 2 else 0)
+                month = _MONTHS.get(month[:3].lower())
+                if month:
+                    simulation = datetime.datetime(year, month, int(day), int(hour),
+                                                   int(minute), int(second))
+            m = __re_source_date.search(line)
+            if m and source_date is None:
+                day, month, year = m.groups()
+                month = _MONTHS.get(month[:3].lower())
+                if month:
+                    source_date = datetime.date(int(year), month, int(day))
+    return source_date, simulation
+
+
+# End of run timing figures, the last lines ATP writes for a case
+END_OF_RUN = b"Timing figures characterizing central processor"
+
+# Bytes at the end of a file searched for the end of run
+_TAIL_BYTES = 64 * 1024
+
+
+def is_complete(lisfile):
+    """
+    Whether ATP finished writing a .lis file: its last 64 kB hold the end of
+    run timing figures (see END_OF_RUN). Compressed files are decompressed
+    up to their end.
+    """
+    # the decompressing readers are told apart, not wrapped to count lines
+    with _open_lis(lisfile, "rb") as file:
+        if file.seekable() and not isinstance(file, (gzip.GzipFile, lzma.LZMAFile)):
+            size = file.seek(0, io.SEEK_END)
+            file.seek(max(size - _TAIL_BYTES, 0))
+            tail = file.read()
+        else:
+            tail = b""
+            chunk = file.read(1024 * 1024)
+            while chunk:
+                tail = tail[-_TAIL_BYTES:] + chunk
+                chunk = file.read(1024 * 1024)
+    return END_OF_RUN in tail[-_TAIL_BYTES - len(END_OF_RUN):]
 
-                    no01, no02, shot = get_shot_information(line)
-                    shots.append([ttype, no01, no02, peak, shot])
 
-            elif ematch:
-                # peak value
-                line = file.readline()
-                if __re_stat_out_peak.match(line):
-                    peak = float(line[40:55].strip())
-                    line = file.readline()
-                    smatch = __re_stat_out_shot.match(line)
-                    ttype = "Energia"
+# Hashable identity of an ATP case (see get_case_fingerprint)
+CaseFingerprint = collections.namedtuple("CaseFingerprint",
+                                         ["digest", "cards", "seed", "source_date"])
 
-                    no01, no02, shot = get_shot_information(line)
-                    shots.append([ttype, no01, no02, peak, shot])
 
-            line = file.readline()
+def normalize_card(card):
+    """
+    Returns an input data card image as used by case fingerprints: without
+    its trailing blanks, or None for comment cards ("C" in column 1 followed
+    by a blank), which do not change the case.
+    """
+    card = card.rstrip()
+    if card[:2] == "C " or card == "C":
+        return None
+    return card
+
+
+def get_case_fingerprint(lisfile):
+    """
+    Returns the CaseFingerprint of the first data case of a .lis file: the
+    BLAKE2b digest of its normalized input data card images (see
+    normalize_card), its dice seed (from the statistics data card
+    interpretation, None if not printed) and the ATP source code date. Only
+    the header and the input data cards echo are read, so identical cases
+    under different file names, simulated at different times, are found
+    without parsing them. Returns None if the cards echo does not begin
+    within the header.
+    """
+    source_date = None
+    seed = None
+    cards = 0
+    digest = hashlib.blake2b(digest_size = 20)
+    with open_lis(lisfile) as file:
+        for number, line in enumerate(file):
+            if number >= _HEADER_LINES:
+                return None
+            if RE_PART_INPUT_CARDS_BEGIN.match(line):
+                break
+            m = __re_source_date.search(line)
+            if m and source_date is None:
+                day, month, year = m.groups()
+                month = _MONTHS.get(month[:3].lower())
+                if month:
+                    source_date = datetime.date(int(year), month, int(day))
+        else:
+            return None
+
+        for line in file:
+            line = line.rstrip("\r\n")
+            if RE_PART_INPUT_CARDS_END.match(line):
+                break
+            interpretation, vertbar, card = line.partition("|")
+            if not vertbar:
+                continue
+            m = __re_card_seed.search(interpretation)
+            if m and seed is None:
+                seed = int(m.group(1))
+            card = normalize_card(card)
+            if card is not None:
+                digest.update(card.encode("latin-1", "replace") + b"\n")
+                cards += 1
+
+    digest.update(repr((seed, source_date)).encode("ascii"))
+    return CaseFingerprint(digest.hexdigest(), cards, seed, source_date)
+
+
+def _shot_row(ttype, peak, groups):
+    """
+    get_shots_information row of a statistical output, from the groups of
+    its shot line (str or bytes, see __RE_STAT_OUT_SHOT).
+    """
+    shot, no01, names, no02 = groups
+    if isinstance(no01, bytes):
+        no01 = no01.decode("latin-1")
+        no02 = no02.decode("latin-1") if no02 else ""
+    return [ttype, no01, no02 or "", peak, int(shot)]
+
+
+class _SimulationsParser(object):
+    """
+    Line by line parser of the shot peaks and switching times of statistical
+    simulations, shared by their readers. Lines (str, or bytes for a binary
+    classifier) are classified by a _LineClassifier of the line kinds the
+    reader needs (see _STATISTICAL_LINES and _SW_TIMES_LINES), and the lines
+    following a classified one are parsed from a state kept between calls,
+    so that reading may stop after any line and resume (see LisTail).
+
+    feed(line) returns what a line completes, or None:
+      (EVENT_SHOT_PEAK, get_shots_information row) at the shot line of a
+        statistical output
+      (EVENT_SWITCHING_TIMES, (simulation, A, B, C phases times)) at the line
+        following a random switching times header (see _three_phase_times)
+      (kind, groups) for the lines of the other kinds of the classifier
+    The lines of switching times headers of any study and of type 183
+    closing instants headers are added to "times", a _SwitchingTimesBuilder.
+    """
+    _IDLE        = 0
+    _PEAK        = 1
+    _SHOT        = 2
+    _THREE_PHASE = 3
+    _TIMES       = 4
+    _T183        = 5
+
+    def __init__(self, classifier, times = None, counters = None):
+        self.binary = classifier.binary
+        self.classifier = _counted(counters, classifier)
+        self.prefixes = classifier.prefixes
+        self.stat_out_peak, self.stat_out_shot = _counted(
+            counters, _stat_out_value_patterns[self.binary])
+        self.sw_times_line = _counted(counters, _re_sw_times_line)
+        self.times = times
+        self.state = _SimulationsParser._IDLE
+        self.type = None
+        self.peak = 0.0
+        self.simulation = 0
+
+    def feed(self, line):
+        state = self.state
+        # most lines are read in the idle state, checked first
+        if state != _SimulationsParser._IDLE:
+            self.state = _SimulationsParser._IDLE
+            if state == _SimulationsParser._PEAK:
+                # a statistical output not followed by its peak value is skipped
+                if self.stat_out_peak.match(line):
+                    self.peak = STAT_OUT_PEAK.parse(line)
+                    self.state = _SimulationsParser._SHOT
+                return None
+            if state == _SimulationsParser._SHOT:
+                m = self.stat_out_shot.match(line)
+                if m:
+                    return EVENT_SHOT_PEAK, _shot_row(self.type, self.peak, m.groups())
+                return None
+            if state == _SimulationsParser._THREE_PHASE:
+                times = _three_phase_times(line)
+                if times is not None:
+                    return EVENT_SWITCHING_TIMES, (self.simulation,) + times
+                return None
+            text = line.decode("latin-1") if self.binary else line
+            if state == _SimulationsParser._TIMES:
+                if self.sw_times_line.match(text):
+                    self.times.add_line(text)
+                    self.state = state
+                    return None
+            elif text.strip() and _t183_times(text):
+                self.times.add_t183_line(text)
+                self.state = state
+                return None
+
+        # the line ending a list of times may start something else; most
+        # lines are rejected by the classifier prefixes, without a call
+        if not line.startswith(self.prefixes):
+            return None
+        kind, groups = self.classifier.classify(line)
+        if kind is None:
+            return None
+        if kind in _STAT_OUT_KINDS:
+            self.type = _line_kind_types[kind]
+            self.state = _SimulationsParser._PEAK
+        elif kind == "random_sw_times":
+            # "Random switching times for simulation number  XXX:"
+            self.simulation = int(groups[0]) if groups[0] else self.simulation + 1
+            self.state = _SimulationsParser._THREE_PHASE
+        elif kind == "sw_times":
+            self.times.start(int(groups[0]))
+            self.state = _SimulationsParser._TIMES
+        elif kind == "t183_sw_times":
+            self.times.start_t183()
+            self.state = _SimulationsParser._T183
+        else:
+            return kind, groups
+        return None
+
+
+@_instrumented("get_shots_information")
+def get_shots_information(lisfile, backend = BACKEND_TEXT):
+    backend = _check_backend(backend, lisfile)
+    if backend == BACKEND_MMAP:
+        return _get_shots_information_mmap(lisfile)
+
+    parser = _SimulationsParser(_stat_out_lines, counters = _scan_counters())
+    shots = []
+    with open_lis(lisfile, "r") as file:
+        for line in file:
+            event = parser.feed(line)
+            if event is not None:
+                shots.append(event[1])
 
     return shots
 
 
+def _get_shots_information_mmap(lisfile):
+    """
+    get_shots_information memory-mapped backend, matching the caption, peak
+    value and shot lines of each statistical output at once over the whole
+    file.
+    """
+    with _mapped(lisfile) as buf:
+        return _shots_information_range(buf)
+
+
+def _shots_information_range(buf, begin = 0, end = None):
+    """
+    get_shots_information rows between two offsets of a mapped file. Each
+    statistical output is matched at once, caption, peak value and shot line
+    (groups 3 to 6 are those of its shot line), rather than fed line by line
+    to a _SimulationsParser, which takes more than twice as long.
+    """
+    shots = []
+    for pos, m in _find_lines(buf, _rebn_stat_out_block, begin, end):
+        shots.append(_shot_row(_stat_out_types[m.group(1)], float(m.group(2)),
+                               m.groups()[2:6]))
+    return shots
+
+
+# Files smaller than this are parsed serially by read_simulations_parallel
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+
+def _statistical_simulations_parts(buf):
+    """
+    Returns the (begin, end) byte offsets of the STATISTICAL_SIMULATIONS parts
+    of a mapped file, as find_lis_parts does, matching only their own
+    beginning and ending lines.
+    """
+    parts = _PartsTracker()
+    for pos, m in _find_lines(buf, _rebn_stat_sim_part):
+        if m.group(1) is not None:
+            parts.begin("STATISTICAL_SIMULATIONS", pos)
+        elif pos < len(buf):
+            parts.end("STATISTICAL_SIMULATIONS", pos)
+    parts.close(len(buf))
+    return parts.sections.get("STATISTICAL_SIMULATIONS", [])
+
+
+def _simulation_ranges(buf, count, begin = 0, end = None):
+    """
+    Splits the bytes of a mapped file between two offsets into at most
+    "count" ranges starting at switching times headers ("Random switching
+    times for simulation number" lines and the like), so that every
+    simulation, with its switching times and statistical outputs, lies in a
+    single range. The first range starts at begin.
+    """
+    if end is None:
+        end = len(buf)
+    bounds = [begin]
+    size = end - begin
+    for i in range(1, count):
+        target = max(begin + size * i // count, bounds[-1] + 1)
+        if target >= end:
+            break
+        m = _rebn_sw_times[1].search(buf, target - 1, end)
+        if m is None:
+            break
+        if m.start() + 1 > bounds[-1]:
+            bounds.append(m.start() + 1)
+    bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _read_simulations_range(lisfile, begin, end, general):
+    """
+    Shot rows and switching times of a file byte range: a
+    ThreePhaseSwitchingTimes, or the _SwitchingTimesBuilder of a
+    SwitchingTimes if "general" is set.
+    """
+    if general:
+        times = _SwitchingTimesBuilder()
+    else:
+        times = ThreePhaseSwitchingTimes.from_times([], [], [])
+    with _mapped(lisfile) as buf:
+        shots = _shots_information_range(buf, begin, end)
+        if general:
+            _read_statistical_simulations_range(buf, times, None, begin, end)
+        else:
+            times.read_range(buf, begin, end)
+    return shots, times
+
+
+@_instrumented("read_simulations_parallel", rows = lambda result, args: len(result[0]))
+def read_simulations_parallel(lisfile, workers = None, min_bytes = PARALLEL_MIN_BYTES,
+                              switching_times = None):
+    """
+    Returns the get_shots_information rows and the switching times of a .lis
+    file, parsing its statistical simulations in "workers" processes (the
+    number of CPUs by default). switching_times is the class of the switching
+    times returned, ThreePhaseSwitchingTimes (default) or SwitchingTimes.
+
+    The STATISTICAL_SIMULATIONS parts of the file are split in byte ranges
+    at simulation boundaries (see _simulation_ranges), a few per worker to
+    balance them, and the partial results are merged in file (shot) order,
+    so they are equal to the serial extractors ones.
+
+    Files smaller than min_bytes, those that cannot be memory-mapped
+    (compressed files and file objects) and those without statistical
+    simulations part are parsed serially.
+    """
+    if switching_times is None:
+        switching_times = ThreePhaseSwitchingTimes
+    if switching_times not in (ThreePhaseSwitchingTimes, SwitchingTimes):
+        raise ValueError("unknown switching times class: {0!r}".format(switching_times))
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    ranges = []
+    if _check_backend(BACKEND_MMAP, lisfile) == BACKEND_MMAP and workers > 1 and \
+            os.path.getsize(lisfile) >= min_bytes:
+        with _mapped(lisfile) as buf:
+            parts = _statistical_simulations_parts(buf)
+            total = sum(end - begin for begin, end in parts)
+            for begin, end in parts:
+                count = max(1, 4 * workers * (end - begin) // max(total, 1))
+                ranges.extend(_simulation_ranges(buf, count, begin, end))
+    if not ranges:
+        return (get_shots_information(lisfile, BACKEND_MMAP),
+                switching_times(lisfile, BACKEND_MMAP))
+
+    general = switching_times is SwitchingTimes
+    shots = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(_read_simulations_range, lisfile, begin, end, general)
+                   for begin, end in ranges]
+        results = [future.result() for future in futures]
+
+    for range_shots, times in results:
+        shots.extend(range_shots)
+    if general:
+        builder = results[0][1]
+        for range_shots, times in results[1:]:
+            builder.extend(times)
+        return shots, builder.switching_times()
+    return shots, ThreePhaseSwitchingTimes.from_times(
+        *[sum((getattr(times, phase) for range_shots, times in results), [])
+          for phase in ("sw_a", "sw_b", "sw_c")])
+
+
 def get_shot_information(line):
-    smatch = __re_stat_out_shot.match(line)
+    return _shot_groups(__re_stat_out_shot.match(line))
+
+
+def _shot_groups(smatch):
+    """Nodes and shot number of a statistical output shot line match."""
     shot = int(smatch.group(1).strip())
     no01 = smatch.group(2)
     no02 = smatch.group(4)
@@ -467,49 +2088,421 @@ def get_shot_information(line):
     return no01, no02, shot
 
 
-def get_statistical_variable_names(lisfile):
+# Shot quantity codes, indexing the type names used by get_shots_information
+QUANTITY_VOLTAGE = 0
+QUANTITY_CURRENT = 1
+QUANTITY_ENERGY  = 2
+QUANTITY_NAMES = ["Tensão", "Corrente", "Energia"]
+
+_quantity_codes = dict((name, code) for code, name in enumerate(QUANTITY_NAMES))
+_stat_out_quantities = dict((caption, _quantity_codes[name])
+                            for caption, name in _stat_out_types.items())
+
+
+class ShotTable(object):
+    """
+    Columnar store of statistical simulation shot peaks. Each row holds a
+    variable id, its peak value and shot number; variables are kept once as
+    (quantity code, node1 id, node2 id), node names once in "nodes".
+    """
+    def __init__(self, nodes = None, variables = None, variable = None,
+                 peak = None, shot = None):
+        # interned node names, "" included
+        self.nodes     = nodes if nodes is not None else []
+        # (quantity code, node1 id, node2 id) of each variable id
+        self.variables = variables if variables is not None else []
+        self.variable  = variable if variable is not None else np.zeros(0, np.int32)
+        self.peak      = peak if peak is not None else np.zeros(0, np.float64)
+        self.shot      = shot if shot is not None else np.zeros(0, np.int32)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds a table from get_shots_information rows."""
+        builder = _ShotTableBuilder()
+        for ttype, node1, node2, peak, shot in rows:
+            builder.add(_quantity_codes[ttype], node1, node2, peak, shot)
+        return builder.table()
+
+    def __len__(self):
+        return len(self.peak)
+
+    @property
+    def nbytes(self):
+        """Memory taken by the row columns, in bytes."""
+        return self.variable.nbytes + self.peak.nbytes + self.shot.nbytes
+
+    def _variable_columns(self):
+        if self.variables:
+            return np.array(self.variables, dtype = np.int32)
+        return np.zeros((0, 3), dtype = np.int32)
+
+    @property
+    def quantity(self):
+        """Quantity code of each row."""
+        return self._variable_columns()[:, 0][self.variable].astype(np.int8)
+
+    @property
+    def node1(self):
+        """First node id of each row."""
+        return self._variable_columns()[:, 1][self.variable]
+
+    @property
+    def node2(self):
+        """Second node id of each row."""
+        return self._variable_columns()[:, 2][self.variable]
+
+    def variable_name(self, variable):
+        """Returns a variable id as [type, node1, node2], as in the rows."""
+        quantity, node1, node2 = self.variables[variable]
+        return [QUANTITY_NAMES[quantity], self.nodes[node1], self.nodes[node2]]
+
+    def rows(self):
+        """Returns the table as get_shots_information rows."""
+        names = [self.variable_name(v) for v in range(len(self.variables))]
+        return [names[v] + [peak, shot] for v, peak, shot in
+                zip(self.variable.tolist(), self.peak.tolist(), self.shot.tolist())]
+
+    def take(self, rows):
+        """Returns a table with the given rows (indices or boolean mask)."""
+        return ShotTable(self.nodes, self.variables, self.variable[rows],
+                         self.peak[rows], self.shot[rows])
+
+    def top(self, n = 1):
+        """
+        Returns the n largest peaks of each variable, sorted by variable and
+        then by decreasing peak.
+        """
+        order = np.lexsort((-self.peak, self.variable))
+        variable = self.variable[order]
+        starts = np.searchsorted(variable, variable, side = "left")
+        rank = np.arange(len(variable)) - starts
+        return self.take(order[rank < n])
+
+    def worst_shots(self):
+        """Returns the row of largest peak of each variable."""
+        return self.top(1)
+
+    def variables_with_prefix(self, prefix, node2 = False):
+        """
+        Returns the ids of the variables whose first node name (or either
+        node name, if node2 is set) starts with prefix.
+        """
+        nodes = set(i for i, name in enumerate(self.nodes) if name.startswith(prefix))
+        return [v for v, (quantity, node1, node2_id) in enumerate(self.variables)
+                if node1 in nodes or (node2 and node2_id in nodes)]
+
+    def filter_prefix(self, prefix, node2 = False):
+        """Returns the rows of the variables given by variables_with_prefix."""
+        variables = self.variables_with_prefix(prefix, node2)
+        return self.take(np.isin(self.variable, variables))
+
+    def filter_quantity(self, quantity):
+        """Returns the rows of a quantity code."""
+        return self.take(self.quantity == quantity)
+
+    def table_key(self, variable):
+        """
+        Returns the key of the distribution table of a variable id in
+        LisIndex.tables and read_stat_tables.
+        """
+        quantity, node1, node2 = self.variables[variable]
+        node1 = self.nodes[node1].strip()
+        return (_QUANTITY_TABLE_TYPES[quantity], node1,
+                self.nodes[node2].strip(), node1[-1:].upper())
+
+    def matrix(self):
+        """
+        Returns the shot numbers and a (shots x variables) array of peaks,
+        NaN where a variable has no peak in a shot. Columns are variable ids.
+        """
+        shots, rows = np.unique(self.shot, return_inverse = True)
+        peaks = np.full((len(shots), len(self.variables)), np.nan)
+        peaks[rows, self.variable] = self.peak
+        return shots, peaks
+
+    def shot_maximum(self, variables = None):
+        """
+        Returns the shot numbers and the maximum peak of each shot across a
+        group of variable ids (every variable by default).
+        """
+        if variables is None:
+            shot, peak = self.shot, self.peak
+        else:
+            mask = np.isin(self.variable, variables)
+            shot, peak = self.shot[mask], self.peak[mask]
+        if len(shot) == 0:
+            return shot, peak
+
+        order = np.argsort(shot, kind = "stable")
+        shot, peak = shot[order], peak[order]
+        starts = np.flatnonzero(np.r_[True, shot[1:] != shot[:-1]])
+        return shot[starts], np.maximum.reduceat(peak, starts)
+
+
+class _ShotTableBuilder(object):
+    """Appends shots to growable arrays, interning node names and variables."""
+    def __init__(self):
+        self.nodes = []
+        self.node_ids = {}
+        self.variables = []
+        self.variable_ids = {}
+        self.variable = array.array("i")
+        self.peak = array.array("d")
+        self.shot = array.array("i")
+        # variable ids by the raw (caption, node1, node2) bytes of add_block
+        self.block_ids = {}
+
+    def _node_id(self, name):
+        node = self.node_ids.get(name)
+        if node is None:
+            node = self.node_ids[name] = len(self.nodes)
+            self.nodes.append(name)
+        return node
+
+    def variable_id(self, quantity, node1, node2):
+        key = (quantity, node1, node2)
+        variable = self.variable_ids.get(key)
+        if variable is None:
+            variable = self.variable_ids[key] = len(self.variables)
+            self.variables.append((quantity, self._node_id(node1), self._node_id(node2)))
+        return variable
+
+    def add(self, quantity, node1, node2, peak, shot):
+        self.variable.append(self.variable_id(quantity, node1, node2))
+        self.peak.append(peak)
+        self.shot.append(shot)
+
+    def add_block(self, caption, peak, shot, node1, node2_full, node2):
+        """Adds a shot from the groups of a _rebn_stat_out_block match."""
+        key = (caption, node1, node2)
+        variable = self.block_ids.get(key)
+        if variable is None:
+            variable = self.block_ids[key] = self.variable_id(
+                _stat_out_quantities[caption], node1.decode("latin-1"),
+                node2.decode("latin-1") if node2 else "")
+        self.variable.append(variable)
+        self.peak.append(float(peak))
+        self.shot.append(int(shot))
+
+    def table(self):
+        return ShotTable(self.nodes, self.variables,
+                         np.frombuffer(self.variable, dtype = np.int32).copy(),
+                         np.frombuffer(self.peak, dtype = np.float64).copy(),
+                         np.frombuffer(self.shot, dtype = np.int32).copy())
+
+
+@_instrumented("get_shot_table")
+def get_shot_table(lisfile, backend = BACKEND_TEXT):
+    """
+    Same as get_shots_information, returning a ShotTable. The memory-mapped
+    backend fills the table columns without building any row list.
+    """
+    backend = _check_backend(backend, lisfile)
+    if backend == BACKEND_TEXT:
+        return ShotTable.from_rows(get_shots_information(lisfile))
+
+    builder = _ShotTableBuilder()
+    with _mapped(lisfile) as buf:
+        for pos, m in _find_lines(buf, _rebn_stat_out_block):
+            builder.add_block(*m.groups())
+
+    return builder.table()
+
+
+class _SwitchingTimesBuilder(object):
+    """Collects the switching times of each simulation, by switch label."""
+    def __init__(self):
+        self.simulations = []
+        self.rows = []
+        self.labels = {}
+        # whether the current simulation has type 183 closing instants
+        self.t183 = True
+        self.t183_count = 0
+
+    def start(self, simulation):
+        self.simulations.append(simulation)
+        self.rows.append({})
+        self.t183 = False
+        self.t183_count = 0
+
+    def start_t183(self):
+        # type 183 closing instants belong to the current simulation, unless
+        # it already has them (no statistical switch headers)
+        if self.t183:
+            self.start(len(self.simulations) + 1)
+        self.t183 = True
+
+    def _add(self, label, time):
+        if label not in self.labels:
+            self.labels[label] = len(self.labels)
+        self.rows[-1][label] = time
+
+    def add_line(self, line):
+        """Adds the (switch number, time) pairs of a switching times line."""
+        for switch, time in _re_sw_times_pair.findall(line):
+            self._add(str(int(switch)), float(time))
+
+    def add_t183_line(self, line):
+        """Adds the closing instants of a type 183 line."""
+        for time in _t183_times(line):
+            self.t183_count += 1
+            self._add("T183-{0}".format(self.t183_count), float(time))
+
+    def extend(self, other):
+        """Appends the simulations of a builder of the following lines."""
+        for row in other.rows:
+            self.rows.append({})
+            for label, time in row.items():
+                self._add(label, time)
+        self.simulations.extend(other.simulations)
+        self.t183 = other.t183
+        self.t183_count = other.t183_count
+
+    def switching_times(self, sw = None):
+        if sw is None:
+            sw = SwitchingTimes()
+        sw.simulations = np.array(self.simulations, dtype = np.int32)
+        sw.switches = list(self.labels)
+        sw.times = np.full((len(self.rows), len(self.labels)), np.nan)
+        for i, row in enumerate(self.rows):
+            for label, time in row.items():
+                sw.times[i, self.labels[label]] = time
+
+        phases = [sw.times[:, k].tolist() if k < len(sw.switches) else []
+                  for k in range(3)]
+        sw.sw_a, sw.sw_b, sw.sw_c = phases
+        return sw
+
+
+def _read_statistical_simulations(lisfile, backend, shots, sw = None):
+    """
+    Reads switching times (into sw, if given) and, if "shots" is set, shot
+    peaks in a single pass. Returns (ShotTable or None, SwitchingTimes).
+    """
+    backend = _check_backend(backend, lisfile)
+    times = _SwitchingTimesBuilder()
+    table = _ShotTableBuilder() if shots else None
+
+    if backend == BACKEND_MMAP:
+        _read_statistical_simulations_mmap(lisfile, times, table)
+        return table.table() if shots else None, times.switching_times(sw)
+
+    classifier = _sw_times_shot_lines if shots else _sw_times_lines
+    parser = _SimulationsParser(classifier, times, _scan_counters())
+    with open_lis(lisfile, "r") as file:
+        for line in file:
+            event = parser.feed(line)
+            if event is not None:
+                ttype, no01, no02, peak, shot = event[1]
+                table.add(_quantity_codes[ttype], no01, no02, peak, shot)
+
+    return table.table() if shots else None, times.switching_times(sw)
+
+
+def _read_statistical_simulations_mmap(lisfile, times, table):
+    """_read_statistical_simulations memory-mapped backend."""
+    with _mapped(lisfile) as buf:
+        _read_statistical_simulations_range(buf, times, table)
+
+
+def _read_statistical_simulations_range(buf, times, table, begin = 0, end = None):
+    """
+    Reads the switching times and (if table is given) the shot peaks between
+    two offsets of a mapped file.
+    """
+    patterns = _rebn_stat_sim if table is None else _rebn_stat_sim_shots
+    for line_pos, m in _find_lines(buf, patterns, begin, end):
+        if m.group(1) is not None:
+            times.start(int(m.group(2)))
+            pos = _line_end(buf, line_pos)
+            line_end = _line_end(buf, pos)
+            line = buf[pos:line_end].decode("latin-1")
+            while pos < line_end and _re_sw_times_line.match(line):
+                times.add_line(line)
+                pos, line_end = line_end, _line_end(buf, line_end)
+                line = buf[pos:line_end].decode("latin-1")
+
+        elif m.group(3) is not None:
+            times.start_t183()
+            pos = _line_end(buf, line_pos)
+            line_end = _line_end(buf, pos)
+            line = buf[pos:line_end].decode("latin-1")
+            while line.strip() and _t183_times(line):
+                times.add_t183_line(line)
+                pos, line_end = line_end, _line_end(buf, line_end)
+                line = buf[pos:line_end].decode("latin-1")
+
+        else:
+            table.add_block(*m.groups()[4:])
+
+
+@_instrumented("get_statistical_simulations", rows = lambda result, args: len(result[0]))
+def get_statistical_simulations(lisfile, backend = BACKEND_TEXT):
+    """
+    Reads the shot peaks and switching times of a statistical study in a
+    single pass, returning (ShotTable, SwitchingTimes). Join them through
+    SwitchingTimes.of_shots, e.g. the switching times of the worst shot of
+    each variable:
+
+        table, sw = get_statistical_simulations(lisfile)
+        worst = table.worst_shots()
+        times = sw.of_shots(worst.shot)
+    """
+    return _read_statistical_simulations(lisfile, backend, True)
+
+
+@_instrumented("get_statistical_variable_names")
+def get_statistical_variable_names(lisfile, backend = BACKEND_TEXT):
+    backend = _check_backend(backend, lisfile)
+    if backend == BACKEND_MMAP:
+        return _get_statistical_variable_names_mmap(lisfile)
+
+    caption_lines = _counted(_scan_counters(), _caption_lines)
     tables = []
-    with open(lisfile, "r") as file:
+    with open_lis(lisfile, "r") as file:
         for line in file:
-            vmatch = __re_v_caption.match(line)
-            cmatch = __re_c_caption.match(line)
-            ematch = __re_e_caption.match(line)
-            
-            if vmatch:
-                tno01 = vmatch.group(1)
-                tno02 = ""
-                ttype = "Tensão"
-                tables.append([ttype, tno01, tno02])
-
-            elif cmatch:
-                tno01 = cmatch.group(1)
-                tno02 = cmatch.group(3)
-                ttype = "Corrente"
-                tables.append([ttype, tno01, tno02])
-
-            elif ematch:
-                tno01 = ematch.group(1)
-                tno02 = ematch.group(3)
-                ttype = "Energia"
-                tables.append([ttype, tno01, tno02])
+            kind, groups = caption_lines.classify(line)
+            if kind == "v_caption":
+                tables.append(["Tensão", groups[0], ""])
+            elif kind is not None:
+                tables.append([_line_kind_types[kind], groups[0], groups[2]])
 
     return tables
 
 
+def _get_statistical_variable_names_mmap(lisfile):
+    """
+    get_statistical_variable_names memory-mapped backend, merging in file
+    order the captions found by each pattern over the whole file.
+    """
+    def names(patterns, ttype, node2_group):
+        for pos, m in _find_lines(buf, patterns):
+            tno02 = m.group(node2_group).decode("latin-1") if node2_group else ""
+            yield pos, [ttype, m.group(1).decode("latin-1"), tno02]
+
+    with _mapped(lisfile) as buf:
+        matches = heapq.merge(names(_rebn_v_caption, "Tensão", 0),
+                              names(_rebn_c_caption, "Corrente", 3),
+                              names(_rebn_e_caption, "Energia", 3),
+                              key = lambda match: match[0])
+        return [table for pos, table in matches]
+
+
 def stat_table_read_line(line_str):
     """
     Extract statistical distribution table values given one of its lines.
     Returns a list containing its values in the same sequence, units and types
     as in .lis file.
     """
-    interval    =   int(line_str[ 0:10])
-    voltage_pu  = float(line_str[10:30])
-    voltage_v   = float(line_str[30:50])
-    frequency_d =   int(line_str[50:64])
-    frequency_c =   int(line_str[64:78])
-    pu_ge_val   = float(line_str[78:98])
+    return list(STAT_TABLE_ROW.parse(line_str))
 
-    return [interval, voltage_pu, voltage_v, frequency_d, frequency_c, pu_ge_val]
+
+def stat_table_read_lines(lines):
+    """
+    Extract statistical distribution table values given a list of its lines,
+    converting all of them at once. Returns a STAT_TABLE_DTYPE array.
+    """
+    return STAT_TABLE_ROW.parse_lines(lines).astype(STAT_TABLE_DTYPE)
 
 
 def _get_node_name_prefix(node_name):
@@ -533,19 +2526,20 @@ def __make_threephase_node_name(node_name_prefix, phase):
     return new_name
 
 
+@functools.lru_cache(maxsize = 1024)
+def _threephase_node_names(node_name_prefix):
+    """The three phase node names of a prefix, as printed in table captions."""
+    return frozenset(__make_threephase_node_name(node_name_prefix, phase)
+                     for phase in "ABC")
+
+
 def is_vpeak_statistical_table(node_name_prefix, line):
     """
     Given a node name prefix (without A, B or C phase sufix), checks a .lis line 
     whether its is the beginning of a statistical voltage distribution table.
     """
-    node_names = [
-        __make_threephase_node_name(node_name_prefix, "A"),
-        __make_threephase_node_name(node_name_prefix, "B"),
-        __make_threephase_node_name(node_name_prefix, "C")
-    ]
-    matchobj = __re_v_caption.match(line)
-
-    return matchobj and matchobj.group(1) in node_names
+    kind, groups = _caption_lines.classify(line)
+    return kind == "v_caption" and groups[0] in _threephase_node_names(node_name_prefix)
 
 
 def is_cpeak_statistical_table(node1_name_prefix, node2_name_prefix, line):
@@ -553,19 +2547,9 @@ def is_cpeak_statistical_table(node1_name_prefix, node2_name_prefix, line):
     Given two node name prefixes (without A, B or C phase sufix), checks a .lis line 
     whether its is the beginning of a statistical voltage distribution table.
     """
-    node1_names = [
-        __make_threephase_node_name(node1_name_prefix, "A"),
-        __make_threephase_node_name(node1_name_prefix, "B"),
-        __make_threephase_node_name(node1_name_prefix, "C")
-    ]
-    node2_names = [
-        __make_threephase_node_name(node2_name_prefix, "A"),
-        __make_threephase_node_name(node2_name_prefix, "B"),
-        __make_threephase_node_name(node2_name_prefix, "C")
-    ]
-    matchobj = __re_c_caption.match(line)
-
-    return matchobj and matchobj.group(1) in node1_names and matchobj.group(3) in node2_names
+    kind, groups = _caption_lines.classify(line)
+    return kind == "c_caption" and groups[0] in _threephase_node_names(node1_name_prefix) \
+        and groups[2] in _threephase_node_names(node2_name_prefix)
 
 
 def is_table_ending(line):
@@ -580,93 +2564,1537 @@ def stat_table_read_ending_data(ending_lines):
     variance, standard deviation and ungrouped data mean, variance and standard
     deviation.
     """
-    GROUPED_DATA_START = 40
-    GROUPED_DATA_END   = 54
-    UNGROUP_DATA_START = 59
-    UNGROUP_DATA_END   = 73
-
     lines = ending_lines.splitlines()
-    mean_line = lines[0]
-    var_line  = lines[1]
-    std_line  = lines[2]
-
-    group_mean = float(mean_line[GROUPED_DATA_START : GROUPED_DATA_END])
-    group_var  = float( var_line[GROUPED_DATA_START : GROUPED_DATA_END])
-    group_std  = float( std_line[GROUPED_DATA_START : GROUPED_DATA_END])
-
-    ungroup_mean = float(mean_line[UNGROUP_DATA_START : UNGROUP_DATA_END])
-    ungroup_var  = float( var_line[UNGROUP_DATA_START : UNGROUP_DATA_END])
-    ungroup_std  = float( std_line[UNGROUP_DATA_START : UNGROUP_DATA_END])
+    group_mean, ungroup_mean = STAT_TABLE_SUMMARY.parse(lines[0])
+    group_var,  ungroup_var  = STAT_TABLE_SUMMARY.parse(lines[1])
+    group_std,  ungroup_std  = STAT_TABLE_SUMMARY.parse(lines[2])
 
     return (group_mean,   group_var,   group_std, 
             ungroup_mean, ungroup_var, ungroup_std)
 
 
-class LisFile(object):
-    input_cards_lines = []
-    node_connections_lines = []
-    
-    phasor_solution_uvolt_lines = []
-    phasor_solution_kvolt_lines = []
-    phasor_solution_switches_lines = []
+# Statistical distribution table types, as in StatTable.type
+TABLE_VOLTAGE = "voltage"
+TABLE_CURRENT = "current"
+TABLE_ENERGY  = "energy"
+TABLE_SUMMARY = "summary"
+
+# Table types of the shot quantity codes
+_QUANTITY_TABLE_TYPES = [TABLE_VOLTAGE, TABLE_CURRENT, TABLE_ENERGY]
+
+# Caption record of each statistical distribution table type (energy tables
+# have their base at the current tables column)
+_TABLE_CAPTIONS = {
+    TABLE_VOLTAGE: VOLTAGE_TABLE_CAPTION,
+    TABLE_CURRENT: CURRENT_TABLE_CAPTION,
+    TABLE_ENERGY:  CURRENT_TABLE_CAPTION,
+}
+
+# Variable types as returned by get_statistical_variable_names
+_TABLE_TYPE_NAMES = {
+    TABLE_VOLTAGE: "Tensão",
+    TABLE_CURRENT: "Corrente",
+    TABLE_ENERGY:  "Energia",
+}
+
+# LisIndex table entry. For phase tables "caption" and "start" are both the
+# caption line offset, while summary tables keep the last phase table caption
+# (for its base) and start at the ending line of that table.
+IndexedTable = collections.namedtuple("IndexedTable",
+    ["type", "node1", "node2", "phase", "caption", "start"])
+
+
+class LisIndex(object):
+    """
+    Byte offsets of an ATP .lis file built in a single pass: statistical
+    distribution table captions (voltage, current and energy, per phase and
+    summary), table endings, shot blocks, switching times and file parts.
+
+    Tables are looked up by (type, node1, node2, phase) with node names without
+    trailing whitespaces, summary tables using the node name prefixes and
+    TABLE_SUMMARY as phase.
+    """
+    def __init__(self, lisfile = None):
+        self.size     = 0
+        # every phase table entry, in file order
+        self.captions = []
+        self.tables   = {}
+        # (type, node1 prefix, node2 prefix) -> phase and summary entries
+        self.groups   = {}
+        self.endings  = []
+        # (offset, type) of "Statistical output of" lines
+        self.shots    = []
+        self.sw_times = []
+        # part name -> list of (begin, end) offsets
+        self.sections = {}
+
+        if lisfile is not None:
+            self.build(lisfile)
+
+    @_instrumented("LisIndex.build", 1, lambda result, args: len(args[0].tables) + len(args[0].shots))
+    def build(self, lisfile):
+        # groups waiting for the ending of their third phase table
+        waiting = {}
+        parts = _PartsTracker()
+        counters = _scan_counters()
+        statistical_lines, random_sw_times = _counted(
+            counters, (_statistical_lines_b, _reb_random_sw_times))
+        part_patterns = _counted(counters, (_reb_parts, _reb_part_ends))
+        pos = 0
+        with open_lis(lisfile, "rb") as file:
+            for line in file:
+                head = line[:1]
+                if head == b"S" or head == b"s":
+                    self._index_statistical_line(statistical_lines.classify(line), pos, waiting)
+                elif head == b" " and random_sw_times.match(line):
+                    self.sw_times.append(pos)
+                _track_parts_line(parts, line, pos, part_patterns)
+                pos += len(line)
+
+        parts.close(pos)
+        self.sections = parts.sections
+        self.size = pos
+
+    def _index_statistical_line(self, classified, pos, waiting):
+        kind, groups = classified
+        if kind is None:
+            return
+        if kind == "v_caption":
+            self._add_caption(TABLE_VOLTAGE, groups[0], b"", groups[1], pos, waiting)
+        elif kind == "c_caption":
+            self._add_caption(TABLE_CURRENT, groups[0], groups[2], groups[1], pos, waiting)
+        elif kind == "e_caption":
+            self._add_caption(TABLE_ENERGY, groups[0], groups[2], groups[1], pos, waiting)
+        elif kind == "table_ending":
+            self.endings.append(pos)
+            for group, last in waiting.items():
+                entry = IndexedTable(last.type, group[1], group[2], TABLE_SUMMARY,
+                                     last.caption, pos)
+                self.tables[group + (TABLE_SUMMARY,)] = entry
+                self.groups[group].append(entry)
+            waiting.clear()
+        else:
+            self.shots.append((pos, _line_kind_tables[kind]))
+
+    def _add_caption(self, ttype, node1, node2, phase, pos, waiting):
+        node1 = node1.decode("latin-1")
+        node2 = node2.decode("latin-1")
+        phase = phase.decode("latin-1").upper()
+        entry = IndexedTable(ttype, node1, node2, phase, pos, pos)
+        self.captions.append(entry)
+        # first table wins, as when scanning the file
+        self.tables.setdefault((ttype, node1.strip(), node2.strip(), phase), entry)
+
+        group = (ttype, _get_node_name_prefix(node1), _get_node_name_prefix(node2))
+        members = self.groups.setdefault(group, [])
+        members.append(entry)
+        if len(members) == 3:
+            waiting[group] = entry
+
+    def get(self, ttype, node1, node2 = "", phase = None):
+        """
+        Returns the entry of a table given its type, node names and phase (the
+        node1 last character by default), or None if there is no such table.
+        """
+        node1 = node1.strip()
+        if phase is None:
+            phase = node1[-1:].upper()
+        return self.tables.get((ttype, node1, node2.strip(), phase))
+
+    def find(self, ttype, node1, node2 = "", summary = False):
+        """
+        Returns the entry of the table read by VoltageStatTable and
+        CurrentStatTable given the same node names: the first phase table of
+        the nodes group or its summary table. Returns None if not found.
+        """
+        group = (ttype, _get_node_name_prefix(node1), _get_node_name_prefix(node2))
+        if summary:
+            return self.tables.get(group + (TABLE_SUMMARY,))
+        members = self.groups.get(group)
+        if members:
+            return members[0]
+        return None
+
+    def variable_names(self):
+        """Same as get_statistical_variable_names, without reading the file."""
+        return [[_TABLE_TYPE_NAMES[e.type], e.node1, e.node2] for e in self.captions]
+
+
+def _indexed_stat_table(file, entry):
+    table = StatTable()
+    table.type  = entry.type
+    table.node1 = entry.node1.strip()
+    table.node2 = entry.node2.strip()
+    table.caption = _TABLE_CAPTIONS[entry.type]
+    table.read_indexed(file, entry)
+    return table
+
+
+@_instrumented("read_stat_tables")
+def read_stat_tables(lisfile, index = None):
+    """
+    Reads every statistical distribution table of a .lis file (voltage,
+    current and energy, per phase and summary) in a single file opening.
+    Returns a dict of StatTable keyed as LisIndex.tables, in file order.
+    """
+    if index is None:
+        index = LisIndex(lisfile)
+
+    if _check_backend(BACKEND_MMAP, lisfile) != BACKEND_MMAP:
+        return _read_stat_tables_stream(lisfile, index)
+
+    tables = {}
+    with open_lis(lisfile, "rb") as file:
+        for key, entry in index.tables.items():
+            tables[key] = _indexed_stat_table(file, entry)
+
+    return tables
+
+
+def _read_stat_tables_stream(lisfile, index):
+    """
+    read_stat_tables of compressed files and file objects, which are only
+    seeked forward: the bytes from each table caption up to the next one are
+    read once and the tables (summaries included) are parsed from them.
+    """
+    captions = sorted(set(entry.caption for entry in index.tables.values()))
+    following = dict(zip(captions, captions[1:] + [index.size]))
+    entries = sorted(index.tables.items(), key = lambda item: item[1].caption)
+
+    tables = {}
+    region_begin, region = None, b""
+    with open_lis(lisfile, "rb") as file:
+        for key, entry in entries:
+            if entry.caption != region_begin:
+                region_begin = entry.caption
+                file.seek(region_begin)
+                region = file.read(following[region_begin] - region_begin)
 
-    output_variables_lines = []
+            entry = entry._replace(caption = 0, start = entry.start - region_begin)
+            tables[key] = _indexed_stat_table(io.BytesIO(region), entry)
 
-    stat_simulation_lines = []
-    stat_result_lines = []
+    return dict((key, tables[key]) for key in index.tables)
 
+
+def _three_phase_times(line):
+    """
+    Returns the (A, B, C phases) times of a random switching times line, NaN
+    for the phases of studies with fewer switches, or None if the line holds
+    no time.
+    """
+    try:
+        return THREE_PHASE_SWITCHING_TIMES.parse(line)
+    except ValueError:
+        if isinstance(line, bytes):
+            line = line.decode("latin-1")
+        times = [float(time) for switch, time in _re_sw_times_pair.findall(line)][:3]
+        if not times:
+            return None
+        return tuple(times + [float("nan")] * (3 - len(times)))
+
+
+# Bytes of the beginning of a followed file compared by LisTail to find out
+# whether it was rewritten
+_TAIL_HEAD_BYTES = 4096
+
+
+class LisTail(object):
+    """
+    Incremental reader of a .lis file still being written by ATP. Each poll
+    reads only the bytes appended since the previous one and returns the new
+    shot peaks (as get_shots_information) and random switching times (as
+    [simulation, A, B, C phases times], like ThreePhaseSwitchingTimes, NaN
+    for the phases of studies with fewer switches).
+
+    A partially written last line is kept until it is complete, and blocks
+    split between polls are resumed from the state of its _SimulationsParser.
+    A file replaced, shorter than what was already read or whose beginning
+    changed is taken as a new run and read from its start.
+    """
+    def __init__(self, lisfile):
+        self.lisfile  = lisfile
+        # bytes read so far, including the incomplete last line
+        self.offset   = 0
+        # the statistical simulations part has ended
+        self.finished = False
+        self._partial = b""
+        self._parser  = _SimulationsParser(_tail_lines_b)
+        # (device, inode) and first bytes of the file read
+        self._identity = None
+        self._head    = b""
+
+    def reset(self):
+        """Forgets what was read, so the next poll starts over."""
+        self.offset   = 0
+        self.finished = False
+        self._partial = b""
+        self._parser  = _SimulationsParser(_tail_lines_b)
+        self._identity = None
+        self._head    = b""
+
+    def _rewritten(self, file, stat):
+        """Whether the file is not the one read so far."""
+        if (stat.st_dev, stat.st_ino) != self._identity or stat.st_size < self.offset:
+            return True
+        file.seek(0)
+        return file.read(len(self._head)) != self._head
+
+    def poll(self):
+        """
+        Reads what was appended to the file since the last call. Returns the
+        lists of new shots and new switching times.
+        """
+        with open(self.lisfile, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if self.offset and self._rewritten(file, stat):
+                self.reset()
+            self._identity = (stat.st_dev, stat.st_ino)
+            file.seek(self.offset)
+            data = file.read()
+        if len(self._head) < _TAIL_HEAD_BYTES:
+            self._head += data[:_TAIL_HEAD_BYTES - len(self._head)]
+        self.offset += len(data)
+
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+
+        shots = []
+        sw_times = []
+        for line in data[:end].splitlines(True):
+            self._parse_line(line, shots, sw_times)
+
+        return shots, sw_times
+
+    def _parse_line(self, line, shots, sw_times):
+        event = self._parser.feed(line)
+        if event is None:
+            return
+        kind, data = event
+        if kind == EVENT_SHOT_PEAK:
+            shots.append(data)
+        elif kind == EVENT_SWITCHING_TIMES:
+            sw_times.append(list(data))
+        else:
+            # the statistical simulations part ending
+            self.finished = True
+
+    def follow(self, interval = 1.0, timeout = None):
+        """
+        Polls the file every "interval" seconds, yielding (shots, switching
+        times) whenever there is something new. Stops once the statistical
+        simulations are over, or after "timeout" seconds without the file
+        growing.
+        """
+        idle = 0.0
+        while not self.finished:
+            offset = self.offset
+            shots, sw_times = self.poll()
+            if shots or sw_times:
+                yield shots, sw_times
+            if self.offset != offset:
+                idle = 0.0
+            elif timeout is not None and idle >= timeout:
+                break
+            else:
+                time.sleep(interval)
+                idle += interval
+
+
+# Single-pass event stream. iter_events walks a .lis file once, yielding
+# LisEvent(kind, pos, data) records; the extractors are re-expressed as
+# consumers attached to a single run (see run_consumers and extract_all).
+EVENT_SECTION_BEGIN   = "section_begin"    # part name
+EVENT_SECTION_END     = "section_end"      # (part name, begin offset)
+EVENT_INPUT_CARD      = "input_card"       # card image, as LisFile.input_cards
+EVENT_TABLE_CAPTION   = "table_caption"    # TableCaption
+EVENT_TABLE_ROW       = "table_row"        # (table key, line), see STAT_TABLE_ROW
+EVENT_TABLE_SUMMARY   = "table_summary"    # (table key, grouped/ungrouped moments)
+EVENT_SHOT_PEAK       = "shot_peak"        # get_shots_information row
+EVENT_SWITCHING_TIMES = "switching_times"  # (simulation, A, B, C phases times)
+
+LisEvent = collections.namedtuple("LisEvent", ["kind", "pos", "data"])
+
+# Distribution table caption: its key as in LisIndex.tables, base and node
+# names as printed (summary tables have the key node name prefixes)
+TableCaption = collections.namedtuple("TableCaption", ["key", "base", "node1", "node2"])
+
+
+class _EventPartsTracker(_PartsTracker):
+    """_PartsTracker also listing the section events of each line."""
     def __init__(self):
+        _PartsTracker.__init__(self)
+        self.events = []
+
+    def begin(self, name, pos):
+        if name not in self.opened:
+            self.events.append(LisEvent(EVENT_SECTION_BEGIN, pos, name))
+        _PartsTracker.begin(self, name, pos)
+
+    def end(self, name, pos):
+        part = self.opened.get(name)
+        _PartsTracker.end(self, name, pos)
+        if part is not None and name not in self.opened:
+            self.events.append(LisEvent(EVENT_SECTION_END, pos, (name, part[0])))
+
+    def close(self, size):
+        for name, part in self.opened.items():
+            self.events.append(LisEvent(EVENT_SECTION_END, size, (name, part[0])))
+        _PartsTracker.close(self, size)
+
+
+class _TableReader(object):
+    """
+    State of the distribution table being streamed: header lines to skip,
+    rows up to the table ending and its three summary lines. A third phase
+    table is followed by the summary table of its group.
+    """
+    def __init__(self, key, skip, summary_key = None):
+        self.key = key
+        self.skip = skip
+        self.rows = True
+        self.summary = []
+        # key of the summary table following this one
+        self.summary_key = summary_key
+
+
+def iter_events(lisfile, kinds = None):
+    """
+    Yields the LisEvent of a .lis file (a file name, compressed file or file
+    object, see open_lis) reading it once, in file order. kinds, a set of
+    EVENT_* names, restricts the events produced.
+    """
+    kinds = set(kinds) if kinds is not None else None
+    def wanted(kind):
+        return kinds is None or kind in kinds
+    want_sections = wanted(EVENT_SECTION_BEGIN) or wanted(EVENT_SECTION_END) or \
+        wanted(EVENT_INPUT_CARD)
+    want_tables = wanted(EVENT_TABLE_CAPTION) or wanted(EVENT_TABLE_ROW) or \
+        wanted(EVENT_TABLE_SUMMARY)
+    want_captions = wanted(EVENT_TABLE_CAPTION)
+    want_rows = wanted(EVENT_TABLE_ROW)
+    want_summaries = wanted(EVENT_TABLE_SUMMARY)
+    want_cards = wanted(EVENT_INPUT_CARD)
+    encoding = locale.getpreferredencoding(False)
+    counters = _scan_counters()
+    part_patterns = _counted(counters, (_reb_parts, _reb_part_ends))
+    table_ending = _counted(counters, _reb_table_ending)
+    parser = _SimulationsParser(_event_lines_b, counters = counters)
+
+    parts = _EventPartsTracker()
+    # (type, node1 prefix, node2 prefix) -> phase tables seen
+    groups_seen = {}
+    table = None
+    pos = 0
+    with open_lis(lisfile, "rb") as file:
+        for line in file:
+            if want_sections:
+                _track_parts_line(parts, line, pos, part_patterns)
+                if parts.events:
+                    for event in parts.events:
+                        if kinds is None or event.kind in kinds:
+                            yield event
+                    parts.events = []
+                if want_cards and "INPUT_CARDS" in parts.opened and b"|" in line:
+                    text = line.decode(encoding).replace("\r\n", "\n").replace("\r", "\n")
+                    yield LisEvent(EVENT_INPUT_CARD, pos, text[text.index("|") + 1:])
+
+            if table is not None:
+                if table.skip:
+                    table.skip -= 1
+                elif table.rows:
+                    if table_ending.match(line):
+                        table.rows = False
+                    elif want_rows:
+                        yield LisEvent(EVENT_TABLE_ROW, pos, (table.key, line))
+                else:
+                    table.summary.append(line.decode("latin-1"))
+                    if len(table.summary) == 3:
+                        if want_summaries:
+                            moments = stat_table_read_ending_data("".join(table.summary))
+                            yield LisEvent(EVENT_TABLE_SUMMARY, pos, (table.key, moments))
+                        key = table.summary_key
+                        table = None
+                        if key is not None:
+                            # the summary table has the base of the C phase
+                            # one, and rows after another line and its heading
+                            if want_captions:
+                                caption = TableCaption(key, table_base, key[1], key[2])
+                                yield LisEvent(EVENT_TABLE_CAPTION, pos, caption)
+                            table = _TableReader(key, 8)
+                pos += len(line)
+                continue
+
+            event = parser.feed(line)
+            if event is not None:
+                kind, data = event
+                if kind in _CAPTION_KINDS and want_tables:
+                    ttype = _line_kind_tables[kind]
+                    node1 = data[0].decode("latin-1")
+                    node2 = data[2].decode("latin-1") if ttype != TABLE_VOLTAGE else ""
+                    phase = data[1].decode("latin-1").upper()
+                    key = (ttype, node1.strip(), node2.strip(), phase)
+                    table_base = _TABLE_CAPTIONS[ttype].parse(line)
+                    if want_captions:
+                        yield LisEvent(EVENT_TABLE_CAPTION, pos,
+                                       TableCaption(key, table_base, node1, node2))
+                    group = (ttype, _get_node_name_prefix(node1), _get_node_name_prefix(node2))
+                    groups_seen[group] = groups_seen.get(group, 0) + 1
+                    summary_key = group + (TABLE_SUMMARY,) if groups_seen[group] == 3 else None
+                    table = _TableReader(key, 2, summary_key)
+                elif kind not in _CAPTION_KINDS and wanted(kind):
+                    # shot peaks and switching times
+                    yield LisEvent(kind, pos, data)
+            pos += len(line)
+
+    if want_sections:
+        parts.close(pos)
+        for event in parts.events:
+            if kinds is None or event.kind in kinds:
+                yield event
+
+
+class EventConsumer(object):
+    """
+    Base class of the consumers of an event stream (see run_consumers): it is
+    fed the events of the kinds it lists, and result returns what it built.
+    """
+    kinds = ()
+
+    def feed(self, event):
         pass
 
-    def load(self, file):
-        with open(file, "r") as f:
-            where = None
-            for line in f:
-                # test each line to check in which block it is
-                if RE_PART_INPUT_CARDS_BEGIN.match(line):
-                    where = "INPUT"
-                if RE_PART_INPUT_CARDS_END.match(line):
-                    where = None
-
-                if RE_PART_STATISTICAL_SIMULATIONS_BEGIN.match(line):
-                    where = "STAT_SIM"
-                if RE_PART_STATISTICAL_SIMULATIONS_END.match(line):
-                    where = None
-
-                if RE_PART_STATISTICAL_RESULTS_BEGIN.match(line):
-                    where = "STAT_RES"
-                if RE_PART_STATISTICAL_RESULTS_END.match(line):
-                    where = None
-
-                # append lines when inside a data block
-                if where == "INPUT":
-                    self.input_cards_lines.append(line)
-                if where == "STAT_SIM":
-                    self.stat_simulation_lines.append(line)
-                if where == "STAT_RES":
-                    self.stat_result_lines.append(line)
-
-        print("Input cards")
-        print(self.input_cards_lines)
-        print()
-        print("Statistical simulations")
-        print(self.stat_simulation_lines)
-        print()
-        print("Statistical results")
-        print(self.stat_result_lines)
-        print()
-
-        self._process_input_cards()
+    def result(self):
+        return None
+
+
+class SectionsConsumer(EventConsumer):
+    """The parts byte offsets, as find_lis_parts."""
+    kinds = (EVENT_SECTION_END,)
+
+    def __init__(self):
+        self.sections = {}
+
+    def feed(self, event):
+        name, begin = event.data
+        self.sections.setdefault(name, []).append((begin, event.pos))
+
+    def result(self):
+        return self.sections
+
+
+class InputCardsConsumer(EventConsumer):
+    """The input data card images, as LisFile.input_cards."""
+    kinds = (EVENT_INPUT_CARD,)
+
+    def __init__(self):
+        self.cards = []
+
+    def feed(self, event):
+        self.cards.append(event.data)
+
+    def result(self):
+        return self.cards
+
+
+class VariableNamesConsumer(EventConsumer):
+    """The statistical variable names, as get_statistical_variable_names."""
+    kinds = (EVENT_TABLE_CAPTION,)
+
+    def __init__(self):
+        self.names = []
+
+    def feed(self, event):
+        caption = event.data
+        if caption.key[3] != TABLE_SUMMARY:
+            self.names.append([_TABLE_TYPE_NAMES[caption.key[0]], caption.node1, caption.node2])
+
+    def result(self):
+        return self.names
+
+
+class ShotsConsumer(EventConsumer):
+    """The shot peaks, as get_shots_information."""
+    kinds = (EVENT_SHOT_PEAK,)
+
+    def __init__(self):
+        self.shots = []
+
+    def feed(self, event):
+        self.shots.append(event.data)
+
+    def result(self):
+        return self.shots
+
+
+class SwitchingTimesConsumer(EventConsumer):
+    """The random switching times, as ThreePhaseSwitchingTimes."""
+    kinds = (EVENT_SWITCHING_TIMES,)
+
+    def __init__(self):
+        self.times = ([], [], [])
+
+    def feed(self, event):
+        for times, time in zip(self.times, event.data[1:]):
+            times.append(time)
+
+    def result(self):
+        return ThreePhaseSwitchingTimes.from_times(*self.times)
+
+
+class StatTablesConsumer(EventConsumer):
+    """Every statistical distribution table, as read_stat_tables."""
+    kinds = (EVENT_TABLE_CAPTION, EVENT_TABLE_ROW, EVENT_TABLE_SUMMARY)
+
+    def __init__(self):
+        self.tables = {}
+        # table being read and its row lines, None for repeated tables
+        self._table = None
+        self._lines = []
+
+    def feed(self, event):
+        if event.kind == EVENT_TABLE_CAPTION:
+            caption = event.data
+            key = caption.key
+            self._table = None
+            # first phase table wins, as in LisIndex.tables
+            if key in self.tables and key[3] != TABLE_SUMMARY:
+                return
+            table = StatTable()
+            table.type, table.node1, table.node2 = key[:3]
+            table.caption = _TABLE_CAPTIONS[key[0]]
+            table.base = caption.base
+            self.tables[key] = self._table = table
+            self._lines = []
+        elif self._table is None:
+            return
+        elif event.kind == EVENT_TABLE_ROW:
+            self._lines.append(event.data[1])
+        else:
+            table = self._table
+            table.array = stat_table_read_lines(self._lines)
+            (table.gmean, table.gvar, table.gstd,
+             table.umean, table.uvar, table.ustd) = event.data[1]
+            self._table = None
+
+    def result(self):
+        return self.tables
+
+
+def run_consumers(lisfile, consumers):
+    """
+    Feeds the events of a single reading of a .lis file to every consumer,
+    producing only the kinds they listed. Returns their results, in order.
+    """
+    feeds = {}
+    for consumer in consumers:
+        for kind in consumer.kinds:
+            feeds.setdefault(kind, []).append(consumer.feed)
+    for event in iter_events(lisfile, feeds):
+        for feed in feeds[event.kind]:
+            feed(event)
+    return [consumer.result() for consumer in consumers]
+
+
+@_instrumented("extract_all", rows = lambda result, args: len(result["shots"]))
+def extract_all(lisfile):
+    """
+    Extracts everything in a single reading of a .lis file, as a dict:
+      "sections":        find_lis_parts
+      "input_cards":     LisFile.input_cards
+      "variable_names":  get_statistical_variable_names
+      "shots":           get_shots_information
+      "switching_times": ThreePhaseSwitchingTimes
+      "stat_tables":     read_stat_tables
+    """
+    names = ["sections", "input_cards", "variable_names", "shots",
+             "switching_times", "stat_tables"]
+    results = run_consumers(lisfile, [
+        SectionsConsumer(), InputCardsConsumer(), VariableNamesConsumer(),
+        ShotsConsumer(), SwitchingTimesConsumer(), StatTablesConsumer()])
+    return dict(zip(names, results))
+
+
+def _part_lines(name, doc):
+    return property(lambda self: self.lines(name), doc = doc)
+
+
+class LisFile(object):
+    """
+    Parts of an ATP .lis file (see LIS_PARTS). Loading only records the byte
+    ranges of each part; their lines are read from the file when accessed, so
+    a loaded file takes little memory whatever its size.
+
+    The file mapping of view is kept until close (or the end of a with
+    block), which needs every view released first (see viewing).
+    """
+    def __init__(self, lisfile = None, backend = BACKEND_TEXT):
+        self.lisfile  = None
+        # part name -> [(begin, end), ...] byte offsets
+        self.sections = {}
+        # memory map of the file, shared by its views
+        self._mmap = None
+        # input card images, once read
+        self._input_cards = None
+
+        if lisfile is not None:
+            self.load(lisfile, backend)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_mmap"] = None
+        return state
+
+    def load(self, file, backend = BACKEND_TEXT):
+        self.close()
+        self.lisfile  = file
+        self.sections = find_lis_parts(file, backend)
+        self._input_cards = None
+
+    def close(self):
+        """
+        Closes the file mapping of the views, if any. Raises BufferError if a
+        view is not released.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def read_section(self, name):
+        """Returns the bytes of every occurrence of a part, concatenated."""
+        chunks = []
+        with open_lis(self.lisfile, "rb") as file:
+            for begin, end in self.sections.get(name, []):
+                file.seek(begin)
+                chunks.append(file.read(end - begin))
+        return b"".join(chunks)
+
+    def lines(self, name):
+        """Returns the lines of a part, as read from the file in text mode."""
+        return _decode_lines(self.read_section(name))
+
+    def view(self, name, occurrence = 0):
+        """
+        Returns a memoryview of one occurrence of a part over the memory-mapped
+        file, without copying it. Compressed files and file objects cannot be
+        mapped, so the part is read into memory instead.
+
+        The view keeps the file mapping open: release it (view.release()) once
+        done, or use viewing, before closing the LisFile.
+        """
+        begin, end = self.sections[name][occurrence]
+        if _check_backend(BACKEND_MMAP, self.lisfile) != BACKEND_MMAP:
+            with open_lis(self.lisfile, "rb") as file:
+                file.seek(begin)
+                return memoryview(file.read(end - begin))
+        if self._mmap is None:
+            with open(self.lisfile, "rb") as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        return memoryview(self._mmap)[begin:end]
+
+    @contextlib.contextmanager
+    def viewing(self, name, occurrence = 0):
+        """Context manager of a view, released when it exits."""
+        view = self.view(name, occurrence)
+        try:
+            yield view
+        finally:
+            view.release()
+
+    input_cards_lines = _part_lines("INPUT_CARDS",
+        "Descriptive interpretation of input data cards")
+    node_connections_lines = _part_lines("NODE_CONNECTIONS",
+        "List of input elements that are connected to each node")
+
+    phasor_solution_uvolt_lines = _part_lines("PHASOR_SOLUTION_UNKNOWN_VOLT",
+        "Steady-state phasor solution, branch by branch")
+    phasor_solution_kvolt_lines = _part_lines("PHASOR_SOLUTION_KNOWN_VOLT",
+        "Steady-state solution at nodes with known voltage")
+    phasor_solution_switches_lines = _part_lines("PHASOR_SOLUTION_SWITCH",
+        "Steady-state phasor switch currents")
+
+    output_variables_lines = _part_lines("OUTPUT_VARIABLES",
+        "EMTP output variables column headings and printout")
+
+    stat_simulation_lines = _part_lines("STATISTICAL_SIMULATIONS",
+        "Statistical overvoltage study simulations")
+    stat_result_lines = _part_lines("STATISTICAL_RESULTS",
+        "Statistical distribution tables")
+
+    @property
+    def input_cards(self):
+        """
+        Input data card images, without their interpretation, read from the
+        file when first accessed.
+        """
+        if self._input_cards is None:
+            self._input_cards = self._process_input_cards()
+        return self._input_cards
+
+    @input_cards.setter
+    def input_cards(self, cards):
+        self._input_cards = cards
+
+    def output_variables(self, occurrence = 0):
+        """Returns the OutputVariables of the file."""
+        return OutputVariables(self, occurrence = occurrence)
+
+    def phasor_solution(self, occurrence = 0):
+        """Returns the PhasorSolution of the file."""
+        return PhasorSolution(self, occurrence = occurrence)
+
+    def node_graph(self, occurrence = 0):
+        """Returns the NodeGraph of the file."""
+        return NodeGraph(self, occurrence = occurrence)
+
+    def case_fingerprint(self):
+        """Returns the CaseFingerprint of the file (see get_case_fingerprint)."""
+        return get_case_fingerprint(self.lisfile)
 
     def _process_input_cards(self):
-        self.input_cards = []
+        input_cards = []
         for line in self.input_cards_lines:
             vertbar = line.index("|")
             fline = line[vertbar+1:]
-            self.input_cards.append(fline)
+            input_cards.append(fline)
+        return input_cards
+
+
+# Steady-state phasor solution tables. Node names are ids into
+# PhasorSolution.nodes; missing values are NaN.
+PHASOR_BRANCH_DTYPE = np.dtype([
+    # one row per branch end: bus K (side 0) and bus M (side 1)
+    ("node",    "i4"),
+    ("branch",  "i4"),
+    ("side",    "i1"),
+    ("v_real",  "f8"),
+    ("v_imag",  "f8"),
+    ("v_mag",   "f8"),
+    ("v_angle", "f8"),
+    ("i_real",  "f8"),
+    ("i_imag",  "f8"),
+    ("i_mag",   "f8"),
+    ("i_angle", "f8"),
+    ("p",       "f8"),
+    ("q",       "f8"),
+    ("p_loss",  "f8"),
+    ("q_loss",  "f8"),
+])
+
+PHASOR_SWITCH_DTYPE = np.dtype([
+    ("node1",   "i4"),
+    ("node2",   "i4"),
+    ("closed",  "?"),
+    ("i_real",  "f8"),
+    ("i_imag",  "f8"),
+    ("i_mag",   "f8"),
+    ("i_angle", "f8"),
+    ("p",       "f8"),
+    ("q",       "f8"),
+])
+
+PHASOR_SOURCE_DTYPE = np.dtype([
+    ("node",    "i4"),
+    ("v_real",  "f8"),
+    ("v_imag",  "f8"),
+    ("v_mag",   "f8"),
+    ("v_angle", "f8"),
+    ("i_real",  "f8"),
+    ("i_imag",  "f8"),
+    ("i_mag",   "f8"),
+    ("i_angle", "f8"),
+    ("p",       "f8"),
+    ("q",       "f8"),
+    ("mva",     "f8"),
+    ("pf",      "f8"),
+])
+
+# Columns of the (first line, second line) values of each phasor entry
+_PHASOR_BRANCH_COLUMNS = (("v_real", "v_mag", "i_real", "i_mag", "p", "p_loss"),
+                          ("v_imag", "v_angle", "i_imag", "i_angle", "q", "q_loss"))
+_PHASOR_SOURCE_COLUMNS = (("v_real", "v_mag", "i_real", "i_mag", "p", "mva"),
+                          ("v_imag", "v_angle", "i_imag", "i_angle", "q", "pf"))
+_PHASOR_SWITCH_COLUMNS = ("i_real", "i_imag", "i_mag", "i_angle", "p", "q")
+
+_re_total_network_loss = re.compile("^     Total network loss .*= *(" + __RE_FLOAT_E + ")")
+_re_solution_frequency = re.compile("First solution frequency = *(" + __RE_FLOAT_E + ")")
+
+
+def _phasor_columns(name_end, widths):
+    """Value columns of a phasor line, after its node names, as record fields."""
+    fields = []
+    start = name_end
+    for k, width in enumerate(widths):
+        fields.append(("value{0}".format(k), start, start + width, float))
+        start += width
+    return fields
+
+
+# Phasor solution lines: node names, then a value per fixed-width column,
+# blank where not printed (e.g. the power loss of the bus M side). Entries
+# take two lines, the second one without node name.
+PHASOR_BRANCH_LINE = FixedWidthRecord("phasor_branch_line",
+    [("name", 0, 7, str)] + _phasor_columns(7, [16] * 6))
+PHASOR_SOURCE_LINE = FixedWidthRecord("phasor_source_line",
+    [("name", 0, 8, str)] + _phasor_columns(8, [16] * 6))
+PHASOR_SWITCH_LINE = FixedWidthRecord("phasor_switch_line",
+    [("node1", 0, 11, str), ("node2", 11, 21, str)]
+    + _phasor_columns(21, [17, 17, 17, 16, 16, 16]))
+
+
+def _phasor_values(record, line):
+    """
+    Returns the node names and the values of a phasor line, NaN for blank
+    columns and None for those not holding a number (e.g. "Open").
+    """
+    names = []
+    values = []
+    for field in record.fields:
+        text = line[field.start:field.end].strip()
+        if field.type is str:
+            names.append(text)
+        elif not text:
+            values.append(np.nan)
+        else:
+            try:
+                values.append(float(text))
+            except ValueError:
+                values.append(None)
+    return names, values
 
 
+def _phasor_entries(lines, record):
+    """
+    Yields (name, first line values, second line values) of each node entry
+    of a phasor solution section: a line with a node name followed by
+    numbers, and the line of numbers below it.
+    """
+    name, first = None, None
+    for line in lines:
+        if not line.strip():
+            continue
+        (node,), values = _phasor_values(record, line)
+        numbers = None not in values and not all(np.isnan(values))
+        if node and numbers:
+            if name is not None:
+                yield name, first, []
+            name, first = node, values
+        elif numbers and name is not None:
+            yield name, first, values
+            name, first = None, None
+        elif name is not None:
+            yield name, first, []
+            name, first = None, None
+    if name is not None:
+        yield name, first, []
+
+
+def _read_parts(lisfile, names, occurrence = 0):
+    """
+    Returns the lines of some parts of a LisFile and the line following each
+    one, as {name: (lines, following line)}, reading the file once from the
+    first part to the last one. Missing parts have no lines.
+    """
+    ranges = {}
+    for name in names:
+        sections = lisfile.sections.get(name, [])
+        if occurrence < len(sections):
+            ranges[name] = sections[occurrence]
+    parts = dict((name, ([], "")) for name in names)
+    if not ranges:
+        return parts
+
+    begin = min(start for start, end in ranges.values())
+    last = max(end for start, end in ranges.values())
+    with open_lis(lisfile.lisfile, "rb") as file:
+        file.seek(begin)
+        data = file.read(last - begin)
+        data += file.readline()
+    for name, (start, end) in ranges.items():
+        following = data.find(b"\n", end - begin)
+        following = len(data) if following < 0 else following + 1
+        parts[name] = (_decode_lines(data[start - begin:end - begin]),
+                       "".join(_decode_lines(data[end - begin:following])))
+    return parts
+
+
+class PhasorTable(object):
+    """
+    Rows of a steady-state phasor solution table (a structured array) with
+    their node names, looked up through a node id -> rows dict.
+    """
+    def __init__(self, nodes, rows, node_columns = ("node",)):
+        self.nodes = nodes
+        self.rows  = rows
+        self.node_columns = node_columns
+        self._index = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _node_index(self):
+        if self._index is None:
+            ids = np.concatenate([self.rows[column] for column in self.node_columns])
+            rows = np.tile(np.arange(len(self.rows)), len(self.node_columns))
+            order = np.argsort(ids, kind = "stable")
+            ids, rows = ids[order], rows[order]
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else []
+            ends = list(starts[1:]) + [len(ids)]
+            self._index = dict((int(ids[start]), np.unique(rows[start:end]))
+                               for start, end in zip(starts, ends))
+        return self._index
+
+    def lookup(self, name):
+        """Returns the rows of a node name (an empty array if not found)."""
+        node = self.nodes.id(name)
+        rows = self._node_index().get(node) if node is not None else None
+        if rows is None:
+            return self.rows[:0]
+        return self.rows[rows]
+
+    def names(self, column = None):
+        """Returns the node names of a node column (the first by default)."""
+        column = column or self.node_columns[0]
+        return [self.nodes[node] for node in self.rows[column].tolist()]
+
+
+class _NodeNames(list):
+    """Interned node names, with their ids by name."""
+    def __init__(self):
+        list.__init__(self)
+        self._ids = {}
+
+    def intern(self, name):
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[name] = len(self)
+            self.append(name)
+        return node
+
+    def id(self, name):
+        return self._ids.get(name.strip())
+
+
+class PhasorSolution(object):
+    """
+    Steady-state phasor solution of an ATP .lis file (see LIS_PARTS), from a
+    file name or a loaded LisFile, whose parts are located in a single scan:
+      "branches": branch by branch solution (PHASOR_BRANCH_DTYPE)
+      "switches": switch currents (PHASOR_SWITCH_DTYPE), NaN for open ones
+      "sources":  solution at nodes with known voltage (PHASOR_SOURCE_DTYPE)
+    Node names are shared by the tables in "nodes". "total_loss" is the total
+    network loss and "frequency" the first solution frequency (NaN if not
+    printed).
+    """
+    def __init__(self, lisfile = None, backend = BACKEND_TEXT, occurrence = 0):
+        self.nodes = _NodeNames()
+        self.branches = PhasorTable(self.nodes, np.zeros(0, dtype = PHASOR_BRANCH_DTYPE))
+        self.switches = PhasorTable(self.nodes, np.zeros(0, dtype = PHASOR_SWITCH_DTYPE),
+                                    ("node1", "node2"))
+        self.sources  = PhasorTable(self.nodes, np.zeros(0, dtype = PHASOR_SOURCE_DTYPE))
+        self.total_loss = np.nan
+        self.frequency  = np.nan
+
+        if lisfile is not None:
+            self.read(lisfile, backend, occurrence)
+
+    def read(self, lisfile, backend = BACKEND_TEXT, occurrence = 0):
+        if not isinstance(lisfile, LisFile):
+            lisfile = LisFile(lisfile, backend)
+
+        parts = _read_parts(lisfile, ("PHASOR_SOLUTION_UNKNOWN_VOLT", "PHASOR_SOLUTION_SWITCH",
+                                      "PHASOR_SOLUTION_KNOWN_VOLT"), occurrence)
+        lines, after = parts["PHASOR_SOLUTION_UNKNOWN_VOLT"]
+        self._read_branches(lines)
+        # the total network loss follows the part
+        m = _re_total_network_loss.match(after)
+        if m:
+            self.total_loss = float(m.group(1))
+
+        self._read_switches(parts["PHASOR_SOLUTION_SWITCH"][0])
+        self._read_sources(parts["PHASOR_SOLUTION_KNOWN_VOLT"][0])
+
+    def _read_branches(self, lines):
+        for line in lines[:2]:
+            m = _re_solution_frequency.search(line)
+            if m:
+                self.frequency = float(m.group(1))
+
+        entries = list(_phasor_entries(lines, PHASOR_BRANCH_LINE))
+        rows = _phasor_rows(len(entries), PHASOR_BRANCH_DTYPE)
+        rows["node"] = [self.nodes.intern(name) for name, first, second in entries]
+        rows["branch"] = np.arange(len(entries)) // 2
+        rows["side"] = np.arange(len(entries)) % 2
+        _fill_phasor_rows(rows, entries, _PHASOR_BRANCH_COLUMNS)
+        self.branches = PhasorTable(self.nodes, rows)
+
+    def _read_sources(self, lines):
+        entries = list(_phasor_entries(lines, PHASOR_SOURCE_LINE))
+        rows = _phasor_rows(len(entries), PHASOR_SOURCE_DTYPE)
+        rows["node"] = [self.nodes.intern(name) for name, first, second in entries]
+        _fill_phasor_rows(rows, entries, _PHASOR_SOURCE_COLUMNS)
+        self.sources = PhasorTable(self.nodes, rows)
+
+    def _read_switches(self, lines):
+        switches = []
+        current = PHASOR_SWITCH_LINE.field("value0")
+        for line in lines[2:]:
+            (node1, node2), values = _phasor_values(PHASOR_SWITCH_LINE, line)
+            if not node1 or not node2:
+                continue
+            closed = None not in values and not any(np.isnan(values))
+            if not closed and line[current.start:current.end].strip().lower() != "open":
+                continue
+            switches.append((node1, node2, closed, values if closed else []))
+
+        rows = _phasor_rows(len(switches), PHASOR_SWITCH_DTYPE)
+        rows["node1"] = [self.nodes.intern(node1) for node1, node2, closed, values in switches]
+        rows["node2"] = [self.nodes.intern(node2) for node1, node2, closed, values in switches]
+        rows["closed"] = [closed for node1, node2, closed, values in switches]
+        for i, (node1, node2, closed, values) in enumerate(switches):
+            for column, value in zip(_PHASOR_SWITCH_COLUMNS, values):
+                rows[column][i] = value
+        self.switches = PhasorTable(self.nodes, rows, ("node1", "node2"))
+
+
+def _phasor_rows(n, dtype):
+    """Returns n phasor rows with every value column NaN."""
+    rows = np.zeros(n, dtype = dtype)
+    for name in dtype.names:
+        if dtype[name].kind == "f":
+            rows[name] = np.nan
+    return rows
+
+
+def _fill_phasor_rows(rows, entries, columns):
+    """Fills the value columns of phasor rows from their entries, at once."""
+    for line, names in enumerate(columns):
+        width = len(names)
+        values = np.full((len(entries), width), np.nan)
+        for i, entry in enumerate(entries):
+            data = entry[1 + line][:width]
+            values[i, :len(data)] = data
+        for k, name in enumerate(names):
+            rows[name] = values[:, k]
+
+
+# EMTP output variable of the OUTPUT_VARIABLES part: its column, output class
+# number and description (as in the "<#n> Next ... output variables are"
+# lines), and upper and lower node names (lower is "" for node voltages)
+OutputVariable = collections.namedtuple("OutputVariable",
+    ["index", "output_class", "description", "node1", "node2"])
+
+# Extrema of each output variable
+OUTPUT_EXTREMA_DTYPE = np.dtype([
+    ("max",    "f8"),
+    ("t_max",  "f8"),
+    ("min",    "f8"),
+    ("t_min",  "f8"),
+])
+
+_re_output_class = re.compile("^ *<#([0-9]+)> *Next +([0-9]+) +output variables are (.*?)[;.]? *$")
+_re_output_headings = re.compile("^ +Step +Time")
+# lines of numbers only, for the printed time steps
+_re_output_numbers = re.compile("^[ 0-9.EeDd+-]+$")
+# Fortran E format dropping the "E" of three digit exponents
+_re_output_exponent = re.compile("([0-9.])([-+][0-9]{3})$")
+
+
+def _output_floats(tokens):
+    try:
+        return np.array(tokens, dtype = np.float64)
+    except ValueError:
+        return np.array([_re_output_exponent.sub("\\1E\\2", token) for token in tokens],
+                        dtype = np.float64)
+
+
+class OutputVariables(object):
+    """
+    EMTP output variables of an ATP .lis file (the OUTPUT_VARIABLES part,
+    from a file name or a loaded LisFile): their catalogue, decoded from the
+    output classes and column headings, and their printed time steps, read
+    in chunks of rows so that long printouts take bounded memory.
+    """
+    def __init__(self, lisfile = None, backend = BACKEND_TEXT, occurrence = 0):
+        self.lisfile   = None
+        self.count     = 0
+        self.variables = []
+        # (begin, end) offsets of the part
+        self._range    = None
+        # offset of the first printed time step
+        self._data     = None
+
+        if lisfile is not None:
+            self.read(lisfile, backend, occurrence)
+
+    def read(self, lisfile, backend = BACKEND_TEXT, occurrence = 0):
+        """Reads the catalogue; the time steps are read on demand."""
+        if not isinstance(lisfile, LisFile):
+            lisfile = LisFile(lisfile, backend)
+        self.lisfile = lisfile.lisfile
+        ranges = lisfile.sections.get("OUTPUT_VARIABLES", [])
+        if occurrence >= len(ranges):
+            return
+        self._range = ranges[occurrence]
+
+        begin, end = self._range
+        classes = []
+        headings = []
+        with open_lis(self.lisfile, "rb") as file:
+            file.seek(begin)
+            pos = begin
+            line = file.readline()
+            m = RE_PART_OUTPUT_VARIABLES_BEGIN.match(line.decode("latin-1"))
+            self.count = int(m.group(1)) if m else 0
+            pos += len(line)
+            while pos < end:
+                line = file.readline()
+                if not line:
+                    break
+                text = line.decode("latin-1").rstrip("\r\n")
+                if _re_output_numbers.match(text) and text.strip():
+                    self._data = pos
+                    break
+                pos += len(line)
+                m = _re_output_class.match(text)
+                if m:
+                    classes.append((int(m.group(1)), int(m.group(2)), m.group(3)))
+                elif headings or _re_output_headings.match(text):
+                    headings.append(text)
+
+        self.variables = self._catalogue(classes, headings)
+
+    def _catalogue(self, classes, headings):
+        """Output variables from their classes and heading lines."""
+        while headings and not headings[-1].strip():
+            headings.pop()
+        names = []
+        if headings:
+            # names start after "Time" in the first heading line
+            start = _re_output_headings.match(headings[0]).end()
+            headings = [headings[0][:start].replace("Step", "    ").replace("Time", "    ")
+                        + headings[0][start:]] + headings[1:]
+            for i in range(0, len(headings), 2):
+                upper = [(m.start(), m.group()) for m in re.finditer("\\S+", headings[i])]
+                lower = []
+                if i + 1 < len(headings):
+                    lower = [(m.start(), m.group()) for m in re.finditer("\\S+", headings[i + 1])]
+                pairs = [[name, ""] for column, name in upper]
+                for column, name in lower:
+                    if upper:
+                        nearest = min(range(len(upper)), key = lambda k: abs(upper[k][0] - column))
+                        pairs[nearest][1] = name
+                names.extend(pairs)
+
+        variables = []
+        classes = classes or [(0, self.count, "")]
+        for output_class, count, description in classes:
+            for k in range(count):
+                index = len(variables)
+                node1, node2 = names[index] if index < len(names) else ("V{0}".format(index + 1), "")
+                variables.append(OutputVariable(index, output_class, description, node1, node2))
+        for index in range(len(variables), self.count):
+            node1, node2 = names[index] if index < len(names) else ("V{0}".format(index + 1), "")
+            variables.append(OutputVariable(index, 0, "", node1, node2))
+        return variables
+
+    def find(self, node1, node2 = None):
+        """
+        Returns the indices of the variables of upper node node1 (and lower
+        node node2, if given).
+        """
+        return [v.index for v in self.variables
+                if v.node1 == node1 and (node2 is None or v.node2 == node2)]
 
+    def iter_chunks(self, chunk_rows = 65536):
+        """
+        Yields the printed time steps in chunks of up to chunk_rows rows, as
+        (step numbers, times, values) arrays, values being (rows x
+        variables). Lines that are not numbers (e.g. switch operation
+        messages) are skipped. Each row starts at a line beginning with its
+        step number and is joined with the lines wrapping it until it holds
+        the step, time and every variable value; rows that do not fit (cut
+        short, or overflowing into the next row) are skipped.
+        """
+        if self._data is None:
+            return
+        width = len(self.variables) + 2
+        begin, end = self._data, self._range[1]
+        rows = []
+        row = []
+        with open_lis(self.lisfile, "rb") as file:
+            file.seek(begin)
+            pos = begin
+            while pos < end:
+                line = file.readline()
+                if not line:
+                    break
+                pos += len(line)
+                text = line.decode("latin-1")
+                if not _re_output_numbers.match(text.rstrip("\r\n")):
+                    continue
+                fields = text.split()
+                if not fields:
+                    continue
+                if row and len(row) + len(fields) > width:
+                    # the row was cut short
+                    row = []
+                if row:
+                    row.extend(fields)
+                elif fields[0].isdigit():
+                    row = fields
+                else:
+                    # wrapped values of a skipped row
+                    continue
+                if len(row) == width:
+                    rows.append(row)
+                    row = []
+                    if len(rows) == chunk_rows:
+                        yield self._chunk(rows, width)
+                        rows = []
+                elif len(row) > width:
+                    row = []
+
+        if rows:
+            yield self._chunk(rows, width)
+
+    @staticmethod
+    def _chunk(rows, width):
+        chunk = _output_floats([field for row in rows for field in row]).reshape(len(rows), width)
+        return chunk[:, 0].astype(np.int64), chunk[:, 1], chunk[:, 2:]
+
+    def series(self, variables = None, chunk_rows = 65536):
+        """
+        Returns the step numbers, times and (rows x variables) values of the
+        given variable indices (every variable by default), keeping only
+        those columns of each chunk.
+        """
+        steps, times, values = [], [], []
+        for chunk_steps, chunk_times, chunk_values in self.iter_chunks(chunk_rows):
+            steps.append(chunk_steps)
+            times.append(chunk_times)
+            values.append(chunk_values if variables is None else chunk_values[:, variables])
+        if not steps:
+            columns = len(self.variables) if variables is None else len(variables)
+            return np.zeros(0, np.int64), np.zeros(0), np.zeros((0, columns))
+        return np.concatenate(steps), np.concatenate(times), np.vstack(values)
+
+    def extrema(self, chunk_rows = 65536):
+        """
+        Returns the OUTPUT_EXTREMA_DTYPE record of each variable (maximum,
+        minimum and the times they first occur), computed chunk by chunk.
+        """
+        result = np.zeros(len(self.variables), dtype = OUTPUT_EXTREMA_DTYPE)
+        result["max"] = -np.inf
+        result["min"] = np.inf
+        result["t_max"] = np.nan
+        result["t_min"] = np.nan
+        columns = np.arange(len(self.variables))
+        for steps, times, values in self.iter_chunks(chunk_rows):
+            for name, time_name, arg, better in (("max", "t_max", np.argmax, np.greater),
+                                                 ("min", "t_min", np.argmin, np.less)):
+                rows = arg(values, axis = 0)
+                chunk = values[rows, columns]
+                improved = better(chunk, result[name])
+                result[name] = np.where(improved, chunk, result[name])
+                result[time_name] = np.where(improved, times[rows], result[time_name])
+        return result
+
+
+# Node connection graph. ATP names the ground node "TERRA"; it connects every
+# grounded element, so it is left out of phase groups.
+GROUND_NODE = "TERRA"
+
+
+@_instrumented("get_node_graph")
+def get_node_graph(lisfile, backend = BACKEND_TEXT, occurrence = 0):
+    """Returns the NodeGraph of a .lis file."""
+    return NodeGraph(lisfile, backend, occurrence)
+
+
+class NodeGraph(object):
+    """
+    Node connections of an ATP .lis file (the NODE_CONNECTIONS part, from a
+    file name or a loaded LisFile), in compressed sparse rows: the neighbours
+    of node id n are indices[indptr[n]:indptr[n + 1]], sorted, so lookups do
+    not depend on the network size. Node names are in "nodes".
+
+    "phase_groups" maps a bus name to its phase nodes, for nodes sharing the
+    name but its last character whose neighbours are phases of the same
+    buses too, so that, unlike _get_node_name_prefix alone, unrelated nodes
+    with similar names are not grouped.
+    """
+    def __init__(self, lisfile = None, backend = BACKEND_TEXT, occurrence = 0):
+        self.nodes   = _NodeNames()
+        self.indptr  = np.zeros(1, dtype = np.int32)
+        self.indices = np.zeros(0, dtype = np.int32)
+        self.phase_groups = {}
+        # name without its last character -> node ids
+        self._prefixes = {}
+
+        if lisfile is not None:
+            self.read(lisfile, backend, occurrence)
+
+    def read(self, lisfile, backend = BACKEND_TEXT, occurrence = 0):
+        if not isinstance(lisfile, LisFile):
+            lisfile = LisFile(lisfile, backend)
+        lines, after = _read_parts(lisfile, ("NODE_CONNECTIONS",), occurrence)["NODE_CONNECTIONS"]
+        self.build(self._adjacency(lines))
+
+    @staticmethod
+    def _adjacency(lines):
+        """Yields (node, adjacent node) names of the part lines."""
+        node = None
+        for line in lines:
+            if "|" not in line or line.startswith("-"):
+                continue
+            name, adjacent = line.split("|", 1)
+            name = name.strip()
+            if name.startswith("From bus name"):
+                continue
+            # long lists continue on lines without the bus name
+            if name:
+                node = name
+            if node is None:
+                continue
+            for other in adjacent.split("*"):
+                other = other.strip()
+                if other:
+                    yield node, other
+
+    def build(self, pairs):
+        """Builds the graph from (node, adjacent node) names."""
+        self.nodes = _NodeNames()
+        sources = array.array("i")
+        targets = array.array("i")
+        for node, other in pairs:
+            sources.append(self.nodes.intern(node))
+            targets.append(self.nodes.intern(other))
+
+        # both directions, without repeated or self connections
+        sources = np.frombuffer(sources, dtype = np.int32)
+        targets = np.frombuffer(targets, dtype = np.int32)
+        edges = np.concatenate([sources, targets]).astype(np.int64) * len(self.nodes) \
+            + np.concatenate([targets, sources])
+        edges = np.unique(edges)
+        sources = (edges // max(len(self.nodes), 1)).astype(np.int32)
+        targets = (edges % max(len(self.nodes), 1)).astype(np.int32)
+        keep = sources != targets
+        sources, self.indices = sources[keep], targets[keep]
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype = np.int32)
+        np.cumsum(np.bincount(sources, minlength = len(self.nodes)), out = self.indptr[1:])
+        self.phase_groups = self._phase_groups()
+
+    def _phase_groups(self):
+        self._prefixes = candidates = {}
+        for node, name in enumerate(self.nodes):
+            if name != GROUND_NODE and len(name) > 1:
+                candidates.setdefault(name[:-1], []).append(node)
+        prefixes = {}
+        for prefix, members in candidates.items():
+            if len(members) > 1:
+                for node in members:
+                    prefixes[node] = prefix
+
+        groups = {}
+        for prefix, members in candidates.items():
+            if len(members) < 2:
+                continue
+            # the phases connect to the phases of the same buses
+            buses = [frozenset(prefixes.get(other, self.nodes[other])
+                               for other in self.neighbour_ids(node)
+                               if self.nodes[other] != GROUND_NODE)
+                     for node in members]
+            if all(bus == buses[0] for bus in buses[1:]):
+                groups[prefix] = tuple(self.nodes[node] for node in members)
+        return groups
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, name):
+        return self.nodes.id(name) is not None
+
+    @property
+    def connections(self):
+        """Number of connections (each counted once)."""
+        return len(self.indices) // 2
+
+    def node_id(self, name):
+        node = self.nodes.id(name)
+        if node is None:
+            raise KeyError(name)
+        return node
+
+    def neighbour_ids(self, node):
+        """Ids of the nodes connected to node id "node"."""
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def neighbours(self, name):
+        """Names of the nodes connected to a node."""
+        return [self.nodes[other] for other in self.neighbour_ids(self.node_id(name))]
+
+    def degree(self, name):
+        node = self.node_id(name)
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    def branches(self, name):
+        """(node, neighbour) names of the elements connected to a node."""
+        name = name.strip()
+        return [(name, other) for other in self.neighbours(name)]
+
+    def phase_nodes(self, bus):
+        """
+        Phase nodes of a bus: its phase group, the nodes named after it plus
+        one character, or the node itself.
+        """
+        bus = bus.strip()
+        if bus in self.phase_groups:
+            return list(self.phase_groups[bus])
+        nodes = [self.nodes[node] for node in self._prefixes.get(bus, [])]
+        if not nodes and bus in self:
+            nodes = [bus]
+        return nodes
+
+    def expand(self, bus):
+        """Returns the phase nodes of a bus and their connected branches."""
+        nodes = self.phase_nodes(bus)
+        branches = []
+        for name in nodes:
+            branches.extend(self.branches(name))
+        return nodes, branches
+
+
+def compare_backends(lisfile, repeat = 3):
+    """
+    Times the extractors with each reading backend over a .lis file. Returns
+    their best throughput in MB/s as {extractor name: {backend: MB/s}}.
+    """
+    extractors = [
+        ("get_statistical_variable_names", get_statistical_variable_names),
+        ("get_shots_information", get_shots_information),
+        ("ThreePhaseSwitchingTimes", ThreePhaseSwitchingTimes),
+    ]
+    size = os.path.getsize(lisfile) / 1.0e6
+    results = {}
+    for name, extractor in extractors:
+        results[name] = {}
+        for backend in (BACKEND_TEXT, BACKEND_MMAP):
+            best = None
+            for i in range(repeat):
+                start = time.perf_counter()
+                extractor(lisfile, backend = backend)
+                elapsed = time.perf_counter() - start
+                if best is None or elapsed < best:
+                    best = elapsed
+            results[name][backend] = size / max(best, 1.0e-9)
+    return results
 
 
 if __name__ == "__main__":
@@ -704,11 +4132,23 @@ if __name__ == "__main__":
     x = VoltageStatTable(file, "TRPYDB", True)
     print( "  Ungrouped mean:", x.umean)
 
+    print( "Testing indexed tables")
+    index = LisIndex(file)
+    x = VoltageStatTable(file, "TRPYDB", True, index)
+    print( "  Ungrouped mean:", x.umean)
+    x = CurrentStatTable(file, "XGU50A", "TRPYDA", True, index)
+    print( "  Ungrouped mean:", x.umean)
+
     print (get_statistical_variable_names(file))
     print (get_shots_information(file))
 
     # test overall file reading
-    l = LisFile()
-    l.load(file)
+    l = LisFile(file)
+    for name in l.sections:
+        print( " ", name, len(l.lines(name)), "lines")
+
+    print( "Testing reading backends throughput (MB/s)")
+    for name, speeds in compare_backends(file).items():
+        print( " ", name, speeds)
 
 
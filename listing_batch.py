@@ -0,0 +1,567 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+ATP LIS FILES BATCH PROCESSING
+"""
+import argparse
+import collections
+import concurrent.futures
+import copy
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+
+import listing
+import listing_cache
+import listing_stats
+
+
+class LisResult(object):
+    """
+    Data extracted from a single .lis file by a batch run and how long it
+    took. When the extraction fails, "error" holds its traceback.
+    """
+    def __init__(self, lisfile):
+        self.lisfile = lisfile
+        self.size    = 0
+        self.elapsed = 0.0
+        self.error   = None
+
+        # header dates (see listing.get_file_dates)
+        self.source_date = None
+        self.simulation_datetime = None
+
+        self.variable_names = []
+        self.shots  = []
+        # A, B, and C phases switching times
+        self.sw_a   = []
+        self.sw_b   = []
+        self.sw_c   = []
+        # StatTable keyed as listing.LisIndex.tables
+        self.tables = {}
+        # listing.ParseStats.as_dict, when instrumented
+        self.stats  = None
+        # listing_stats.DistributionSummary of the shot peaks, when asked for
+        self.distributions = None
+        # listing.CaseFingerprint digest and, for a duplicate case, the file
+        # whose results it shares (when deduplicated)
+        self.fingerprint = None
+        self.alias_of    = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# File name endings of plain and compressed listings
+LIS_EXTENSIONS = (".lis", ".lis.gz", ".lis.xz")
+
+
+def find_lis_files(paths):
+    """
+    Given directories, glob patterns or file names, returns the sorted list of
+    .lis files they refer to. Directories are searched for *.lis files and
+    their compressed *.lis.gz and *.lis.xz versions.
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                if name.lower().endswith(LIS_EXTENSIONS):
+                    files.add(os.path.join(path, name))
+        elif glob.has_magic(path):
+            files.update(glob.glob(path))
+        else:
+            files.add(path)
+
+    return sorted(files)
+
+
+def extract_file(lisfile, tables = True, backend = listing.BACKEND_MMAP,
+                 cache = None, stats = False, distributions = None):
+    """
+    Extracts the header dates, statistical variable names, shots, switching
+    times and (optionally) every statistical distribution table of a .lis
+    file, through a listing_cache.ParseCache if given. Errors are kept in the result
+    instead of raised. With stats set, the extraction is instrumented (see
+    listing.instrument) and its statistics kept in the result. distributions,
+    a (low, width, bins) grid, summarizes the shot peaks in a
+    listing_stats.DistributionSummary (in per unit when tables are read).
+    """
+    if stats:
+        with listing.instrument() as parse_stats:
+            result = extract_file(lisfile, tables, backend, cache, False, distributions)
+        result.stats = parse_stats.as_dict()
+        return result
+
+    result = LisResult(lisfile)
+    start = time.perf_counter()
+    try:
+        result.size = os.path.getsize(lisfile)
+        result.source_date, result.simulation_datetime = listing.get_file_dates(lisfile)
+        if cache is None:
+            result.variable_names = listing.get_statistical_variable_names(lisfile, backend = backend)
+            result.shots = listing.get_shots_information(lisfile, backend = backend)
+            sw = listing.ThreePhaseSwitchingTimes(lisfile, backend = backend)
+        else:
+            result.variable_names = cache.get_statistical_variable_names(lisfile)
+            result.shots = cache.get_shots_information(lisfile)
+            sw = cache.switching_times(lisfile)
+        result.sw_a = sw.sw_a
+        result.sw_b = sw.sw_b
+        result.sw_c = sw.sw_c
+
+        if tables and cache is None:
+            result.tables = listing.read_stat_tables(lisfile)
+        elif tables:
+            result.tables = cache.read_stat_tables(lisfile)
+
+        if distributions is not None:
+            peaks = listing_stats.ShotPeaks.from_shot_table(
+                listing.ShotTable.from_rows(result.shots), result.tables)
+            result.distributions = listing_stats.DistributionSummary(*distributions)
+            result.distributions.add_peaks(peaks.with_phase_max(), per_unit = tables)
+    except Exception:
+        result.error = traceback.format_exc()
+    result.elapsed = time.perf_counter() - start
+
+    return result
+
+
+def _extract_chunk(files, tables, backend, cache, stats, distributions):
+    return [extract_file(lisfile, tables, backend, cache, stats, distributions)
+            for lisfile in files]
+
+
+def _failed_result(lisfile, error):
+    result = LisResult(lisfile)
+    result.error = error
+    return result
+
+
+def _extract_isolated(lisfile, *args):
+    """
+    Extracts a file alone in a new worker process, after a worker process
+    died with the file in flight: the file is failed only if its own worker
+    dies too.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers = 1) as executor:
+        try:
+            return executor.submit(_extract_chunk, [lisfile], *args).result()[0]
+        except concurrent.futures.process.BrokenProcessPool:
+            return _failed_result(lisfile, "Worker process died extracting the file\n"
+                                  + traceback.format_exc())
+        except Exception:
+            return _failed_result(lisfile, traceback.format_exc())
+
+
+def _run_pool(chunks, workers, done, args):
+    """
+    Extracts the chunks of files of a deque in a pool of worker processes,
+    with at most two chunks per worker in flight, calling done with each
+    result. When a worker process dies the pool is broken: no more chunks
+    are taken and the files of the chunks in flight (the dead one among them)
+    are returned, to be extracted again.
+    """
+    running = {}
+    suspects = []
+    broken = False
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+        while running or (chunks and not broken):
+            while chunks and not broken and len(running) < 2 * workers:
+                chunk = chunks.popleft()
+                try:
+                    future = executor.submit(_extract_chunk, chunk, *args)
+                except concurrent.futures.process.BrokenProcessPool:
+                    chunks.appendleft(chunk)
+                    broken = True
+                    break
+                running[future] = chunk
+            if not running:
+                break
+
+            finished, _ = concurrent.futures.wait(
+                list(running), return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                chunk = running.pop(future)
+                try:
+                    chunk_results = future.result()
+                except concurrent.futures.process.BrokenProcessPool:
+                    broken = True
+                    suspects.extend(chunk)
+                    continue
+                except Exception:
+                    error = traceback.format_exc()
+                    chunk_results = [_failed_result(lisfile, error) for lisfile in chunk]
+                for result in chunk_results:
+                    done(result)
+    return suspects
+
+
+def _case_digest(lisfile):
+    """
+    Case fingerprint digest of a complete listing, None for listings still
+    being written, without fingerprint or which cannot be read.
+    """
+    try:
+        if not listing.is_complete(lisfile):
+            return None
+        fingerprint = listing.get_case_fingerprint(lisfile)
+    except Exception:
+        return None
+    return None if fingerprint is None else fingerprint.digest
+
+
+def _file_version(lisfile):
+    """(size, modification time) of a file, None if it cannot be read."""
+    try:
+        stat = os.stat(lisfile)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _case_identity(lisfile):
+    """The version (see _file_version) and case digest of a file."""
+    return _file_version(lisfile), _case_digest(lisfile)
+
+
+def case_identities(files, workers = 1):
+    """
+    Returns the {lisfile: (version, case digest)} of files (see
+    find_duplicate_cases), read in a pool of "workers" processes. Finding
+    out whether compressed files are complete decompresses them, so each
+    file is read once. If a worker process dies, the files are left without
+    digest.
+    """
+    if not files:
+        return {}
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+            chunksize = max(1, len(files) // (4 * workers))
+            return dict(zip(files, executor.map(_case_identity, files, chunksize = chunksize)))
+    except concurrent.futures.process.BrokenProcessPool:
+        return dict((lisfile, (_file_version(lisfile), None)) for lisfile in files)
+
+
+def find_duplicate_cases(files, identities = None):
+    """
+    Groups complete files (see listing.is_complete) by their case
+    fingerprint (see listing.get_case_fingerprint). Returns the files of
+    distinct cases, in the given order, a dict of the duplicates of each of
+    them (identical cases, found later) and a dict of the fingerprint digest
+    of each file. Files still being written, without fingerprint or which
+    cannot be read are kept as distinct cases. The identities of the files,
+    as case_identities, are read unless given.
+    """
+    if identities is None:
+        identities = case_identities(files)
+    unique = []
+    duplicates = {}
+    fingerprints = {}
+    first = {}
+    for lisfile in files:
+        version, digest = identities[lisfile]
+        if digest is None:
+            unique.append(lisfile)
+            continue
+        fingerprints[lisfile] = digest
+        original = first.setdefault(digest, lisfile)
+        if original == lisfile:
+            unique.append(lisfile)
+        else:
+            duplicates.setdefault(original, []).append(lisfile)
+    return unique, duplicates, fingerprints
+
+
+def _alias_result(result, lisfile):
+    """
+    Result of a duplicate case of result's file, sharing its extracted data,
+    with its own size and header dates.
+    """
+    alias = copy.copy(result)
+    alias.lisfile  = lisfile
+    alias.alias_of = result.lisfile
+    alias.elapsed  = 0.0
+    alias.stats    = None
+    try:
+        alias.size = os.path.getsize(lisfile)
+        alias.source_date, alias.simulation_datetime = listing.get_file_dates(lisfile)
+    except Exception:
+        alias.error = traceback.format_exc()
+    return alias
+
+
+def run_batch(paths, workers = None, chunksize = 1, tables = True,
+              backend = listing.BACKEND_MMAP, callback = None, cache = None,
+              stats = False, distributions = None, dedupe = False):
+    """
+    Extracts the data of every .lis file given by paths (see find_lis_files)
+    in a pool of worker processes, each one receiving chunks of "chunksize"
+    files. The number of workers defaults to the number of CPUs. "callback"
+    is called with each LisResult as
+    soon as it is ready. Workers share the directory of the optional
+    listing_cache.ParseCache. With stats set, each result holds the
+    statistics of its instrumented extraction (see merge_stats), and with a
+    distributions grid, the summary of its shot peaks (see
+    merge_distributions).
+
+    With dedupe set, identical cases (see find_duplicate_cases, whose case
+    identities are read by the workers too) are extracted once: the results
+    of their duplicates are aliases of the first file results (see
+    LisResult.alias_of), ready along with it. Duplicates of files changed
+    since they were fingerprinted, or changed themselves, are extracted on
+    their own, without fingerprint.
+
+    Returns the LisResult list in the same (sorted) order of the files. A file
+    failing, or even a worker process dying, does not stop the batch: the
+    pool is replaced and the files in flight are extracted again one by one,
+    each in its own process, so only the file killing its worker is failed.
+    """
+    files = find_lis_files(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunksize = max(1, chunksize)
+
+    cases, duplicates, fingerprints, identities = files, {}, {}, {}
+    if dedupe:
+        identities = case_identities(files, workers)
+        cases, duplicates, fingerprints = find_duplicate_cases(files, identities)
+
+    results = {}
+    args = (tables, backend, cache, stats, distributions)
+    chunks = collections.deque(cases[i:i + chunksize] for i in range(0, len(cases), chunksize))
+
+    def changed(lisfile):
+        return _file_version(lisfile) != identities[lisfile][0]
+
+    def done(result):
+        result.fingerprint = fingerprints.get(result.lisfile)
+        ready = [result]
+        if result.lisfile in duplicates:
+            # either file may have been rewritten since fingerprinted
+            rewritten = changed(result.lisfile)
+            if rewritten:
+                result.fingerprint = None
+            for lisfile in duplicates[result.lisfile]:
+                if rewritten or changed(lisfile):
+                    fingerprints.pop(lisfile, None)
+                    chunks.append([lisfile])
+                else:
+                    ready.append(_alias_result(result, lisfile))
+        for item in ready:
+            results[item.lisfile] = item
+            if callback is not None:
+                callback(item)
+
+    while chunks:
+        for lisfile in _run_pool(chunks, workers, done, args):
+            done(_extract_isolated(lisfile, *args))
+
+    return [results[lisfile] for lisfile in files]
+
+
+def merge_results(results, aliases = True):
+    """
+    Merges the data of successful batch results into rows tagged by file:
+      "variable_names":  [lisfile, type, node1, node2]
+      "shots":           [lisfile, type, node1, node2, peak, shot]
+      "switching_times": [lisfile, shot, sw_a, sw_b, sw_c]
+      "tables":          {(lisfile, type, node1, node2, phase): StatTable}
+      "failed":          {lisfile: error}
+      "aliases":         {lisfile: lisfile of the same case}
+    Without aliases set, the rows of duplicate cases are skipped, so each
+    case is merged once, under its first file.
+    """
+    merged = {
+        "variable_names":  [],
+        "shots":           [],
+        "switching_times": [],
+        "tables":          {},
+        "failed":          {},
+        "aliases":         {},
+    }
+    for result in results:
+        if not result.ok:
+            merged["failed"][result.lisfile] = result.error
+            continue
+        if result.alias_of is not None:
+            merged["aliases"][result.lisfile] = result.alias_of
+            if not aliases:
+                continue
+
+        for row in result.variable_names:
+            merged["variable_names"].append([result.lisfile] + row)
+        for row in result.shots:
+            merged["shots"].append([result.lisfile] + row)
+        for shot, times in enumerate(zip(result.sw_a, result.sw_b, result.sw_c)):
+            merged["switching_times"].append([result.lisfile, shot + 1] + list(times))
+        for key, table in result.tables.items():
+            merged["tables"][(result.lisfile,) + key] = table
+
+    return merged
+
+
+def merge_stats(results):
+    """Returns the listing.ParseStats of every instrumented batch result."""
+    stats = listing.ParseStats()
+    for result in results:
+        if result.stats is not None:
+            stats.merge(result.stats)
+    return stats
+
+
+def merge_distributions(results, key = None):
+    """
+    Merges the distribution summaries of batch results into one
+    listing_stats.DistributionSummary. key, if given, maps each variable key
+    to its merged key, e.g. dropping the node names to combine every voltage.
+    Returns None if no result has a summary.
+    """
+    merged = None
+    for result in results:
+        if result.distributions is None:
+            continue
+        summary = result.distributions
+        if key is not None:
+            summary = summary.rename(key)
+        merged = summary.copy() if merged is None else merged.merge(summary)
+    return merged
+
+
+def iso_date(value):
+    """A file date of a LisResult as an ISO 8601 string, None if unknown."""
+    return None if value is None else value.isoformat()
+
+
+def json_merged(merged):
+    """The merged results of merge_results as JSON serializable data."""
+    tables = []
+    for key, table in merged["tables"].items():
+        moments = table.moments()
+        tables.append({
+            "lisfile": key[0],
+            "type":    key[1],
+            "node1":   key[2],
+            "node2":   key[3],
+            "phase":   key[4],
+            "moments": dict((name, float(moments[name])) for name in moments.dtype.names),
+            "rows":    table.table_rows(),
+        })
+
+    return {
+        "variable_names":  merged["variable_names"],
+        "shots":           merged["shots"],
+        "switching_times": merged["switching_times"],
+        "tables":          tables,
+        "failed":          merged["failed"],
+        "aliases":         merged["aliases"],
+    }
+
+
+def format_result(result):
+    """One line report of a batch result."""
+    if not result.ok:
+        error = result.error.strip().splitlines()[-1]
+        return "{0:9.3f} s  FAILED  {1}: {2}".format(result.elapsed, result.lisfile, error)
+    if result.alias_of is not None:
+        return "{0:9.3f} s  {1:9.1f} MB  same case as {2}  {3}".format(
+            result.elapsed, result.size / 1.0e6, result.alias_of, result.lisfile)
+    return "{0:9.3f} s  {1:9.1f} MB  {2:7d} shots  {3:5d} tables  {4}".format(
+        result.elapsed, result.size / 1.0e6, len(result.shots), len(result.tables),
+        result.lisfile)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        description = "Extract shots, switching times and statistical tables "
+                      "from many ATP .lis files in parallel.")
+    parser.add_argument("paths", nargs = "+",
+                        help = "directories, glob patterns or .lis files")
+    parser.add_argument("-j", "--workers", type = int, default = None,
+                        help = "worker processes (default: number of CPUs)")
+    parser.add_argument("-c", "--chunksize", type = int, default = 1,
+                        help = "files sent to a worker at once")
+    parser.add_argument("--no-tables", action = "store_true",
+                        help = "skip the statistical distribution tables")
+    parser.add_argument("--backend", default = listing.BACKEND_MMAP,
+                        choices = [listing.BACKEND_TEXT, listing.BACKEND_MMAP])
+    parser.add_argument("-o", "--json", help = "write the merged results to a JSON file")
+    parser.add_argument("--cache", help = "parse cache directory")
+    parser.add_argument("--cache-size", type = float, default = 1024.0,
+                        help = "parse cache size bound, in MB")
+    parser.add_argument("--cache-hash", action = "store_true",
+                        help = "also key the parse cache by the files contents")
+    parser.add_argument("--cache-by-case", action = "store_true",
+                        help = "key the parse cache by case fingerprint, sharing "
+                               "the results of identical cases")
+    parser.add_argument("--dedupe", choices = ["alias", "skip"], default = None,
+                        help = "extract identical cases once, and either alias or "
+                               "skip the duplicates in the JSON results")
+    parser.add_argument("--clear-cache", action = "store_true",
+                        help = "remove every parse cache entry before running")
+    parser.add_argument("--stats", action = "store_true",
+                        help = "report time, rows and pattern matches per extractor")
+    args = parser.parse_args(argv)
+
+    cache = None
+    if args.cache:
+        cache = listing_cache.ParseCache(args.cache, int(args.cache_size * 1024 * 1024),
+                                         args.cache_hash, args.backend,
+                                         args.cache_by_case)
+        if args.clear_cache:
+            cache.clear()
+
+    start = time.perf_counter()
+    results = run_batch(args.paths, args.workers, args.chunksize,
+                        not args.no_tables, args.backend,
+                        callback = lambda result: print(format_result(result)),
+                        cache = cache, stats = args.stats,
+                        dedupe = args.dedupe is not None)
+    elapsed = time.perf_counter() - start
+
+    size = sum(result.size for result in results) / 1.0e6
+    failed = sum(1 for result in results if not result.ok)
+    print("{0} files ({1} failed), {2:.1f} MB in {3:.3f} s ({4:.1f} MB/s)".format(
+        len(results), failed, size, elapsed, size / max(elapsed, 1.0e-9)))
+
+    if args.stats:
+        stats = merge_stats(results)
+        print(stats.report())
+        print("Slowest files:")
+        for lisfile, speed in stats.slowest_files(5):
+            print("{0:9.1f} MB/s  {1}".format(speed, lisfile))
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(json_merged(merge_results(results, args.dedupe != "skip")), file)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+ATP LIS FILES PARSING BENCHMARK
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import listing
+import listing_synth
+
+
+# name -> function(lisfile, backend), timed extractors
+EXTRACTORS = {
+    "get_statistical_variable_names":
+        lambda lisfile, backend: listing.get_statistical_variable_names(lisfile, backend = backend),
+    "get_shots_information":
+        lambda lisfile, backend: listing.get_shots_information(lisfile, backend = backend),
+    "get_shot_table":
+        lambda lisfile, backend: listing.get_shot_table(lisfile, backend = backend),
+    "ThreePhaseSwitchingTimes":
+        lambda lisfile, backend: listing.ThreePhaseSwitchingTimes(lisfile, backend = backend),
+    "get_statistical_simulations":
+        lambda lisfile, backend: listing.get_statistical_simulations(lisfile, backend = backend),
+    "find_lis_parts":
+        lambda lisfile, backend: listing.find_lis_parts(lisfile, backend = backend),
+    "LisIndex":
+        lambda lisfile, backend: listing.LisIndex(lisfile),
+    "read_stat_tables":
+        lambda lisfile, backend: listing.read_stat_tables(lisfile),
+    "extract_all":
+        lambda lisfile, backend: listing.extract_all(lisfile),
+}
+
+# Extractors without a backend argument, run once
+_SINGLE_BACKEND = ("LisIndex", "read_stat_tables", "extract_all")
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def peak_rss():
+    """Returns the peak resident set size of this process in MB, or None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        return rss / 1.0e6
+    return rss * 1024 / 1.0e6
+
+
+def count_lines(lisfile, chunk_size = 1024 * 1024):
+    lines = 0
+    with open(lisfile, "rb") as file:
+        chunk = file.read(chunk_size)
+        while chunk:
+            lines += chunk.count(b"\n")
+            chunk = file.read(chunk_size)
+    return lines
+
+
+def synthetic_file(directory, size):
+    """
+    Returns the path of a synthetic listing of about "size" MB in directory,
+    writing it when missing.
+    """
+    path = os.path.join(directory, "synthetic-{0:g}MB.lis".format(size))
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok = True)
+        temp = path + ".tmp"
+        listing_synth.SyntheticListing.of_size(int(size * 1.0e6)).write(temp)
+        os.replace(temp, path)
+    return path
+
+
+def _run_child(name, backend, lisfile):
+    """Times an extractor in a fresh process, so its peak RSS is its own."""
+    command = [sys.executable, os.path.abspath(__file__), "--child", name, backend, lisfile]
+    output = subprocess.run(command, check = True, stdout = subprocess.PIPE,
+                            universal_newlines = True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _child(name, backend, lisfile):
+    idle = peak_rss()
+    start = time.perf_counter()
+    EXTRACTORS[name](lisfile, backend)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_rss(), "idle_rss_mb": idle}))
+
+
+def run_benchmark(files, extractors = None, backends = None, repeat = 3,
+                  callback = None):
+    """
+    Times each extractor with each backend over every file, in a new process
+    per run. Returns a list of result dicts with the best time of "repeat"
+    runs, lines/s, MB/s and peak RSS (MB, None where unavailable).
+    """
+    if extractors is None:
+        extractors = list(EXTRACTORS)
+    if backends is None:
+        backends = [listing.BACKEND_TEXT, listing.BACKEND_MMAP]
+
+    results = []
+    for lisfile in files:
+        size = os.path.getsize(lisfile) / 1.0e6
+        lines = count_lines(lisfile)
+        for name in extractors:
+            for backend in backends:
+                if name in _SINGLE_BACKEND and backend != backends[0]:
+                    continue
+                runs = [_run_child(name, backend, lisfile) for i in range(repeat)]
+                best = min(run["seconds"] for run in runs)
+                rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+                idle = [run["idle_rss_mb"] for run in runs if run["idle_rss_mb"] is not None]
+                result = {
+                    "extractor":   name,
+                    "backend":     backend if name not in _SINGLE_BACKEND else None,
+                    "file":        os.path.basename(lisfile),
+                    "size_mb":     size,
+                    "lines":       lines,
+                    "seconds":     best,
+                    "mb_s":        size / max(best, 1.0e-9),
+                    "lines_s":     lines / max(best, 1.0e-9),
+                    "peak_rss_mb": max(rss) if rss else None,
+                    "idle_rss_mb": min(idle) if idle else None,
+                }
+                results.append(result)
+                if callback is not None:
+                    callback(result)
+
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], check = True,
+                              cwd = os.path.dirname(os.path.abspath(__file__)),
+                              stdout = subprocess.PIPE, stderr = subprocess.DEVNULL,
+                              universal_newlines = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Versions and machine the benchmark ran on."""
+    return {
+        "created":  datetime.datetime.now().isoformat(timespec = "seconds"),
+        "commit":   _git_commit(),
+        "python":   platform.python_version(),
+        "numpy":    np.__version__,
+        "platform": platform.platform(),
+        "machine":  platform.machine(),
+        "cpus":     os.cpu_count(),
+    }
+
+
+def _result_key(result):
+    return (result["extractor"], result["backend"], result["file"])
+
+
+def compare(previous, results):
+    """
+    Returns (extractor, backend, file, previous MB/s, MB/s, ratio) of the
+    results also found in a previous benchmark.
+    """
+    before = dict((_result_key(result), result) for result in previous["results"])
+    rows = []
+    for result in results:
+        old = before.get(_result_key(result))
+        if old is not None:
+            rows.append(_result_key(result) + (old["mb_s"], result["mb_s"],
+                                               result["mb_s"] / max(old["mb_s"], 1.0e-9)))
+    return rows
+
+
+def format_result(result):
+    rss = result["peak_rss_mb"]
+    return "{0:32s} {1:5s} {2:>22s} {3:9.1f} MB/s {4:12.0f} lines/s {5:>9s} MB RSS".format(
+        result["extractor"], result["backend"] or "-", result["file"], result["mb_s"],
+        result["lines_s"], "{0:.1f}".format(rss) if rss is not None else "?")
+
+
+def main(argv = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        _child(*argv[1:4])
+        return 0
+
+    parser = argparse.ArgumentParser(
+        description = "Time the .lis extractors over synthetic listings of "
+                      "several sizes, saving the results as JSON.")
+    parser.add_argument("--sizes", type = float, nargs = "+", default = DEFAULT_SIZES,
+                        help = "synthetic listing sizes, in MB")
+    parser.add_argument("--files", nargs = "+", default = [],
+                        help = "also time these .lis files")
+    parser.add_argument("-d", "--dir", default = "bench",
+                        help = "directory of the synthetic listings, kept between runs")
+    parser.add_argument("-e", "--extractors", nargs = "+", choices = list(EXTRACTORS))
+    parser.add_argument("-b", "--backends", nargs = "+",
+                        choices = [listing.BACKEND_TEXT, listing.BACKEND_MMAP])
+    parser.add_argument("-r", "--repeat", type = int, default = 3)
+    parser.add_argument("-o", "--output", help = "write the results to a JSON file")
+    parser.add_argument("--compare", help = "JSON results of a previous run to compare to")
+    args = parser.parse_args(argv)
+
+    files = [synthetic_file(args.dir, size) for size in args.sizes] + args.files
+    results = run_benchmark(files, args.extractors, args.backends, args.repeat,
+                            callback = lambda result: print(format_result(result)))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent = 1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        print("Compared to", args.compare, previous["environment"].get("commit") or "")
+        for name, backend, lisfile, before, after, ratio in compare(previous, results):
+            print("{0:32s} {1:5s} {2:>22s} {3:9.1f} -> {4:9.1f} MB/s  x{5:.2f}".format(
+                name, backend or "-", lisfile, before, after, ratio))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
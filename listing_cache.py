@@ -0,0 +1,293 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+ATP LIS FILES PERSISTENT PARSE CACHE
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+
+import listing
+
+
+# Default cache size bound, in bytes
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Cache entry file name extension (zlib compressed pickle)
+_ENTRY_EXT = ".pkz"
+
+# Bound of the file identities remembered by a cache
+_MAX_IDENTITIES = 10000
+
+# Version of the cached results format, part of every entry key: increase it
+# when the pickled classes change, so older entries are not loaded
+CACHE_FORMAT = 3
+
+
+def file_digest(lisfile, chunk_size = 1024 * 1024):
+    """Returns the hexadecimal BLAKE2b digest of a file contents."""
+    digest = hashlib.blake2b(digest_size = 20)
+    with open(lisfile, "rb") as file:
+        chunk = file.read(chunk_size)
+        while chunk:
+            digest.update(chunk)
+            chunk = file.read(chunk_size)
+    return digest.hexdigest()
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ParseCache(object):
+    """
+    Persistent on-disk cache of .lis files parsing results, stored as zlib
+    compressed pickles.
+
+    Entries are keyed by the file path, size and modification time (plus its
+    contents digest when hash_content is set) and by the extractor and its
+    arguments, so changed files are parsed again. Entries of a previous
+    version of a file are removed when the new version is stored. The cache
+    is kept under max_bytes by evicting the least recently used entries.
+
+    With by_case set, entries of complete listings (see listing.is_complete)
+    are keyed by their case fingerprint (see listing.get_case_fingerprint)
+    instead, so identical cases under different file names share their
+    results: each case is parsed once. Listings still being written keep the
+    file identity keys, so they never share results with a complete case.
+
+    Several processes may share the same cache directory.
+    """
+    def __init__(self, directory, max_bytes = DEFAULT_MAX_BYTES,
+                 hash_content = False, backend = listing.BACKEND_MMAP,
+                 by_case = False):
+        self.directory    = directory
+        self.max_bytes    = max_bytes
+        self.hash_content = hash_content
+        self.backend      = backend
+        self.by_case      = by_case
+        # (path, size, mtime_ns) -> (entries path, identity) of the files seen
+        self._identities  = {}
+        self.hits   = 0
+        self.misses = 0
+        # cache size estimate, computed at the first store
+        self._size  = None
+
+        os.makedirs(directory, exist_ok = True)
+
+    def _identity(self, lisfile):
+        """
+        Returns the path and identity keying the entries of a file, computed
+        once per version of the file.
+        """
+        path = os.path.abspath(lisfile)
+        stat = os.stat(path)
+        version = (path, stat.st_size, stat.st_mtime_ns)
+        identity = self._identities.get(version)
+        if identity is None:
+            if len(self._identities) >= _MAX_IDENTITIES:
+                self._identities.clear()
+            identity = self._identities[version] = self._file_identity(path, stat)
+        return identity
+
+    def _file_identity(self, path, stat):
+        if self.by_case and listing.is_complete(path):
+            fingerprint = listing.get_case_fingerprint(path)
+            if fingerprint is not None:
+                case = "case:" + fingerprint.digest
+                return case, repr([case])
+        identity = [path, stat.st_size, stat.st_mtime_ns]
+        if self.hash_content:
+            identity.append(file_digest(path))
+        return path, repr(identity)
+
+    def _entry_path(self, path, identity, name, args):
+        path_hash = _sha1(path)
+        entry_name = "-".join([path_hash, _sha1(identity)[:16],
+                               _sha1(repr((CACHE_FORMAT, name, args)))[:16]])
+        return os.path.join(self.directory, path_hash[:2], entry_name + _ENTRY_EXT)
+
+    def _entries(self):
+        """Yields os.DirEntry of every cache entry."""
+        if not os.path.isdir(self.directory):
+            return
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.endswith(_ENTRY_EXT):
+                    yield entry
+
+    def get(self, lisfile, name, compute, *args):
+        """
+        Returns the cached result of compute(lisfile, *args), identified by
+        "name" and args, computing and storing it when not cached. Entries
+        that cannot be loaded (e.g. pickled by another version of the
+        classes) are removed and computed again.
+        """
+        path, identity = self._identity(lisfile)
+        entry = self._entry_path(path, identity, name, args)
+        try:
+            with open(entry, "rb") as file:
+                value = pickle.loads(zlib.decompress(file.read()))
+            # mark it as recently used
+            os.utime(entry)
+            self.hits += 1
+            return value
+        except OSError:
+            pass
+        except (EOFError, pickle.UnpicklingError, zlib.error, AttributeError,
+                ImportError, TypeError, ValueError, LookupError):
+            self._remove(entry)
+
+        self.misses += 1
+        value = compute(lisfile, *args)
+        self._store(entry, value)
+        return value
+
+    def _store(self, entry, value):
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), 1)
+        folder = os.path.dirname(entry)
+        os.makedirs(folder, exist_ok = True)
+
+        # remove entries of previous versions of the same file
+        path_hash, identity_hash = os.path.basename(entry).split("-")[:2]
+        for old in os.scandir(folder):
+            old_hashes = old.name.split("-")
+            if len(old_hashes) == 3 and old_hashes[0] == path_hash and \
+                    old_hashes[1] != identity_hash:
+                self._remove(old.path)
+
+        # write and rename, so readers never see partial entries
+        handle, temp = tempfile.mkstemp(dir = folder, suffix = ".tmp")
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        os.replace(temp, entry)
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _remove(self, entry):
+        try:
+            size = os.path.getsize(entry)
+            os.remove(entry)
+        except OSError:
+            return
+        if self._size is not None:
+            self._size -= size
+
+    def size(self):
+        """Returns the cache size, in bytes."""
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self, max_bytes = None):
+        """
+        Removes the least recently used entries until the cache is not larger
+        than max_bytes (90% of the cache bound by default).
+        """
+        if max_bytes is None:
+            max_bytes = int(0.9 * self.max_bytes)
+        entries = sorted(self._entries(), key = lambda entry: entry.stat().st_mtime)
+        size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if size <= max_bytes:
+                break
+            size -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        self._size = size
+
+    def invalidate(self, lisfile):
+        """
+        Removes every cached result of a .lis file (of its case, when keyed by
+        case).
+        """
+        try:
+            path = self._identity(lisfile)[0]
+        except OSError:
+            path = os.path.abspath(lisfile)
+        path_hash = _sha1(path)
+        folder = os.path.join(self.directory, path_hash[:2])
+        if not os.path.isdir(folder):
+            return
+        for entry in os.scandir(folder):
+            if entry.name.startswith(path_hash):
+                self._remove(entry.path)
+
+    def clear(self):
+        """Removes every cached result."""
+        for entry in list(self._entries()):
+            self._remove(entry.path)
+        self._size = 0
+
+    # Cached extractors. The backend does not change their results, so it is
+    # left out of the keys.
+    def get_shots_information(self, lisfile):
+        return self.get(lisfile, "shots", lambda lisfile:
+            listing.get_shots_information(lisfile, backend = self.backend))
+
+    def get_shot_table(self, lisfile):
+        """Cached listing.ShotTable of a .lis file."""
+        return self.get(lisfile, "shot_table", lambda lisfile:
+            listing.get_shot_table(lisfile, backend = self.backend))
+
+    def get_statistical_variable_names(self, lisfile):
+        return self.get(lisfile, "variable_names", lambda lisfile:
+            listing.get_statistical_variable_names(lisfile, backend = self.backend))
+
+    def switching_times(self, lisfile):
+        """Cached ThreePhaseSwitchingTimes of a .lis file."""
+        return self.get(lisfile, "switching_times", lambda lisfile:
+            listing.ThreePhaseSwitchingTimes(lisfile, backend = self.backend))
+
+    def get_statistical_simulations(self, lisfile):
+        """Cached listing.get_statistical_simulations of a .lis file."""
+        return self.get(lisfile, "statistical_simulations", lambda lisfile:
+            listing.get_statistical_simulations(lisfile, backend = self.backend))
+
+    def node_graph(self, lisfile):
+        """Cached listing.NodeGraph of a .lis file."""
+        return self.get(lisfile, "node_graph", lambda lisfile:
+            listing.get_node_graph(lisfile, backend = self.backend))
+
+    def voltage_stat_table(self, lisfile, node, summary = False):
+        """Cached VoltageStatTable of a .lis file."""
+        return self.get(lisfile, "voltage_table", listing.VoltageStatTable, node, summary)
+
+    def current_stat_table(self, lisfile, node1, node2, summary = False):
+        """Cached CurrentStatTable of a .lis file."""
+        return self.get(lisfile, "current_table", listing.CurrentStatTable,
+                        node1, node2, summary)
+
+    def read_stat_tables(self, lisfile):
+        """Cached listing.read_stat_tables of a .lis file."""
+        return self.get(lisfile, "stat_tables", listing.read_stat_tables)
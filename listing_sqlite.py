@@ -0,0 +1,304 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+ATP LIS FILES SQLITE EXPORT
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import traceback
+
+import listing
+import listing_batch
+
+
+# Files are the cases; the other tables refer to them by file_id. Shots are
+# keyed by (case, variable, shot), so per-variable queries across cases only
+# read the index.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id                  INTEGER PRIMARY KEY,
+    path                TEXT UNIQUE NOT NULL,
+    size                INTEGER,
+    mtime_ns            INTEGER,
+    source_date         TEXT,
+    simulation_datetime TEXT,
+    shots               INTEGER,
+    elapsed             REAL,
+    error               TEXT
+);
+CREATE TABLE IF NOT EXISTS variables (
+    file_id  INTEGER NOT NULL,
+    variable INTEGER NOT NULL,
+    type     TEXT NOT NULL,
+    node1    TEXT NOT NULL,
+    node2    TEXT NOT NULL,
+    PRIMARY KEY (file_id, variable)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS variables_nodes ON variables (type, node1, node2);
+CREATE TABLE IF NOT EXISTS shots (
+    file_id  INTEGER NOT NULL,
+    variable INTEGER NOT NULL,
+    shot     INTEGER NOT NULL,
+    peak     REAL,
+    PRIMARY KEY (file_id, variable, shot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS switching_times (
+    file_id INTEGER NOT NULL,
+    shot    INTEGER NOT NULL,
+    sw_a    REAL,
+    sw_b    REAL,
+    sw_c    REAL,
+    PRIMARY KEY (file_id, shot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stat_tables (
+    id      INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    type    TEXT NOT NULL,
+    node1   TEXT NOT NULL,
+    node2   TEXT NOT NULL,
+    phase   TEXT,
+    base    REAL,
+    gmean   REAL,
+    gvar    REAL,
+    gstd    REAL,
+    umean   REAL,
+    uvar    REAL,
+    ustd    REAL
+);
+CREATE INDEX IF NOT EXISTS stat_tables_file ON stat_tables (file_id, type, node1, node2);
+CREATE INDEX IF NOT EXISTS stat_tables_nodes ON stat_tables (type, node1, node2);
+CREATE TABLE IF NOT EXISTS stat_rows (
+    table_id   INTEGER NOT NULL,
+    row        INTEGER NOT NULL,
+    interval   INTEGER,
+    pu         REAL,
+    value      REAL,
+    density    INTEGER,
+    cumulative INTEGER,
+    ge         REAL,
+    PRIMARY KEY (table_id, row)
+) WITHOUT ROWID;
+CREATE VIEW IF NOT EXISTS peaks AS
+    SELECT files.path, files.id AS file_id, variables.type, variables.node1,
+           variables.node2, shots.shot, shots.peak
+    FROM shots
+    JOIN variables ON variables.file_id = shots.file_id AND
+                      variables.variable = shots.variable
+    JOIN files ON files.id = shots.file_id;
+"""
+
+# Tables holding the rows of a file, and their file id column
+_FILE_TABLES = [("variables", "file_id"), ("shots", "file_id"),
+                ("switching_times", "file_id"), ("stat_tables", "file_id")]
+
+
+class SQLiteExporter(object):
+    """
+    Writes listing_batch.LisResult data into a SQLite database, one
+    transaction per file, with its rows inserted by executemany.
+
+    Files already exported, with the same size and modification time, are
+    skipped, so a campaign may be exported again as new files are added.
+    Changed files have their previous rows replaced. The database is in WAL
+    mode and waits up to "timeout" seconds for other writers, but a single
+    writer (as in export, where workers only parse) avoids lock contention.
+    """
+    def __init__(self, database, timeout = 60.0):
+        self.database = database
+        self.connection = sqlite3.connect(database, timeout = timeout)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def exported(self, lisfile):
+        """Whether the current version of a file is in the database."""
+        path = os.path.abspath(lisfile)
+        row = self.connection.execute(
+            "SELECT size, mtime_ns FROM files WHERE path = ? AND error IS NULL",
+            (path,)).fetchone()
+        if row is None:
+            return False
+        stat = os.stat(path)
+        return tuple(row) == (stat.st_size, stat.st_mtime_ns)
+
+    def _remove(self, file_id):
+        self.connection.execute(
+            "DELETE FROM stat_rows WHERE table_id IN "
+            "(SELECT id FROM stat_tables WHERE file_id = ?)", (file_id,))
+        for table, column in _FILE_TABLES:
+            self.connection.execute(
+                "DELETE FROM {0} WHERE {1} = ?".format(table, column), (file_id,))
+
+    def add_result(self, result):
+        """
+        Stores a LisResult, replacing the previous rows of its file. Results
+        whose rows break the database keys (e.g. a variable peak repeated in
+        a shot) are failed: their error is set and only the file is stored.
+        """
+        try:
+            return self._add_result(result)
+        except sqlite3.IntegrityError:
+            if not result.ok:
+                raise
+            result.error = traceback.format_exc()
+            return self._add_result(result)
+
+    def _add_result(self, result):
+        path = os.path.abspath(result.lisfile)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        with self.connection:
+            cursor = self.connection.cursor()
+            row = cursor.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+            values = (result.size, mtime_ns, listing_batch.iso_date(result.source_date),
+                      listing_batch.iso_date(result.simulation_datetime),
+                      len(set(row[4] for row in result.shots)),
+                      result.elapsed, result.error)
+            if row is None:
+                cursor.execute(
+                    "INSERT INTO files (size, mtime_ns, source_date, simulation_datetime, "
+                    "shots, elapsed, error, path) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    values + (path,))
+                file_id = cursor.lastrowid
+            else:
+                file_id = row[0]
+                self._remove(file_id)
+                cursor.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ?, source_date = ?, "
+                    "simulation_datetime = ?, shots = ?, elapsed = ?, error = ? "
+                    "WHERE id = ?", values + (file_id,))
+            if result.ok:
+                self._insert_rows(cursor, file_id, result)
+        return file_id
+
+    def _insert_rows(self, cursor, file_id, result):
+        variables = {}
+        for row in result.variable_names:
+            variables.setdefault(tuple(row[:3]), len(variables))
+        shots = []
+        for ttype, node1, node2, peak, shot in result.shots:
+            variable = variables.setdefault((ttype, node1, node2), len(variables))
+            shots.append((file_id, variable, shot, peak))
+
+        cursor.executemany(
+            "INSERT INTO variables (file_id, variable, type, node1, node2) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(file_id, variable) + key for key, variable in variables.items()])
+        cursor.executemany(
+            "INSERT INTO shots (file_id, variable, shot, peak) "
+            "VALUES (?, ?, ?, ?)", shots)
+        cursor.executemany(
+            "INSERT INTO switching_times (file_id, shot, sw_a, sw_b, sw_c) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(file_id, shot + 1) + tuple(times) for shot, times in
+             enumerate(zip(result.sw_a, result.sw_b, result.sw_c))])
+
+        rows = []
+        for (ttype, node1, node2, phase), table in result.tables.items():
+            cursor.execute(
+                "INSERT INTO stat_tables (file_id, type, node1, node2, phase, base, "
+                "gmean, gvar, gstd, umean, uvar, ustd) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_id, ttype, node1, node2, phase) + tuple(table.moments().tolist()))
+            table_id = cursor.lastrowid
+            rows.extend((table_id, number) + tuple(row)
+                        for number, row in enumerate(table.array.tolist()))
+        cursor.executemany(
+            "INSERT INTO stat_rows (table_id, row, interval, pu, value, density, "
+            "cumulative, ge) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def export(paths, database, workers = None, chunksize = 1, tables = True,
+           backend = listing.BACKEND_MMAP, callback = None, cache = None):
+    """
+    Exports the .lis files given by paths (see listing_batch.find_lis_files)
+    into a SQLite database, skipping files already exported. The files are
+    parsed by listing_batch.run_batch worker processes and written by this
+    process as their results arrive. "callback" is called with each
+    LisResult after it is stored.
+
+    Returns the LisResult list of the exported files.
+    """
+    with SQLiteExporter(database) as exporter:
+        files = [lisfile for lisfile in listing_batch.find_lis_files(paths)
+                 if not exporter.exported(lisfile)]
+
+        def store(result):
+            exporter.add_result(result)
+            if callback is not None:
+                callback(result)
+
+        if not files:
+            return []
+        return listing_batch.run_batch(files, workers, chunksize, tables, backend,
+                                       callback = store, cache = cache)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        description = "Export shots, switching times and statistical tables "
+                      "of ATP .lis files into a SQLite database.")
+    parser.add_argument("database", help = "SQLite database file")
+    parser.add_argument("paths", nargs = "+",
+                        help = "directories, glob patterns or .lis files")
+    parser.add_argument("-j", "--workers", type = int, default = None,
+                        help = "worker processes (default: number of CPUs)")
+    parser.add_argument("-c", "--chunksize", type = int, default = 1,
+                        help = "files sent to a worker at once")
+    parser.add_argument("--no-tables", action = "store_true",
+                        help = "skip the statistical distribution tables")
+    parser.add_argument("--backend", default = listing.BACKEND_MMAP,
+                        choices = [listing.BACKEND_TEXT, listing.BACKEND_MMAP])
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = export(args.paths, args.database, args.workers, args.chunksize,
+                     not args.no_tables, args.backend,
+                     callback = lambda result: print(listing_batch.format_result(result)))
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if not result.ok)
+    print("{0} files exported ({1} failed) in {2:.3f} s".format(
+        len(results), failed, elapsed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
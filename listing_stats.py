@@ -0,0 +1,783 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+ATP LIS FILES STATISTICS OF SHOT PEAKS
+"""
+import statistics
+
+import numpy as np
+
+import listing
+
+
+# Probabilities of exceeding the statistical overvoltages, in per cent
+OVERVOLTAGE_PROBABILITIES = (2.0, 10.0, 50.0)
+
+# Moments of each variable, as computed from its shot peaks
+MOMENTS_DTYPE = np.dtype([
+    ("count", "i8"),
+    ("mean",  "f8"),
+    ("var",   "f8"),
+    ("std",   "f8"),
+    ("min",   "f8"),
+    ("max",   "f8"),
+])
+
+# Summary of each variable by summarize
+SUMMARY_DTYPE = np.dtype(MOMENTS_DTYPE.descr + [
+    ("u2",       "f8"),
+    ("u10",      "f8"),
+    ("u50",      "f8"),
+    ("u2_gauss", "f8"),
+    ("mean_low", "f8"),
+    ("mean_high", "f8"),
+    ("u2_low",   "f8"),
+    ("u2_high",  "f8"),
+])
+
+# Overvoltage distribution models fitted by fit_overvoltages
+MODEL_GAUSS     = "gauss"
+MODEL_TRUNCATED = "truncated"
+MODEL_WEIBULL   = "weibull"
+MODELS = (MODEL_GAUSS, MODEL_TRUNCATED, MODEL_WEIBULL)
+
+# Insulation strength models of InsulationStrength
+STRENGTH_GAUSS   = "gauss"
+STRENGTH_WEIBULL = "weibull"
+
+# Fitted overvoltage distributions of each variable, with the
+# Kolmogorov-Smirnov statistic and p-value of each model
+FIT_DTYPE = np.dtype([
+    ("count",         "i8"),
+    ("mean",          "f8"),
+    ("std",           "f8"),
+    ("truncation",    "f8"),
+    ("weibull_shape", "f8"),
+    ("weibull_scale", "f8"),
+] + [("ks_" + model, "f8") for model in MODELS]
+  + [("p_" + model, "f8") for model in MODELS])
+
+# Risk of failure of each variable, from its peaks and from each model
+RISK_DTYPE = np.dtype(FIT_DTYPE.descr + [("risk", "f8")]
+                      + [("risk_" + model, "f8") for model in MODELS])
+
+
+class ShotPeaks(object):
+    """
+    Peaks of many statistical variables, as a (shots x variables) array with
+    NaN where a variable has no peak in a shot. Variables are identified by
+    their distribution table keys (see listing.LisIndex.tables) and hold the
+    base of their table (NaN if unknown) for per unit conversion.
+    """
+    def __init__(self, keys, shots, peaks, bases = None):
+        self.keys  = list(keys)
+        self.shots = np.asarray(shots)
+        self.peaks = np.asarray(peaks, dtype = np.float64)
+        if bases is None:
+            bases = np.full(len(self.keys), np.nan)
+        self.bases = np.asarray(bases, dtype = np.float64)
+
+    @classmethod
+    def from_shot_table(cls, table, tables = None):
+        """
+        Builds the peaks of a listing.ShotTable, taking the bases from the
+        StatTable dict of read_stat_tables if given.
+        """
+        keys = [table.table_key(v) for v in range(len(table.variables))]
+        shots, peaks = table.matrix()
+        bases = [tables[key].base if tables is not None and key in tables else np.nan
+                 for key in keys]
+        return cls(keys, shots, peaks, bases)
+
+    @classmethod
+    def from_lis(cls, lisfile, backend = listing.BACKEND_MMAP):
+        """Reads the shot peaks and table bases of a .lis file."""
+        return cls.from_shot_table(listing.get_shot_table(lisfile, backend),
+                                   listing.read_stat_tables(lisfile))
+
+    @classmethod
+    def from_stat_tables(cls, tables, types = (listing.TABLE_VOLTAGE,)):
+        """
+        Builds the peaks of the distribution tables of the given types, a
+        StatTable dict of read_stat_tables, when the shot peaks were not
+        printed: each interval contributes its frequency of peaks at its mid
+        point. Shots are numbered from 1 in increasing peak order, so only the
+        per variable distributions are meaningful.
+        """
+        keys = [key for key, table in tables.items()
+                if key[0] in types and len(table.table)]
+        columns = []
+        for key in keys:
+            table = tables[key].array
+            interval = table["interval"][-1]
+            width = table["pu"][-1] / interval if interval else np.nan
+            columns.append(np.repeat(table["pu"] + 0.5 * width, table["density"]))
+        shots = max([len(column) for column in columns], default = 0)
+        peaks = np.full((shots, len(keys)), np.nan)
+        for column, values in enumerate(columns):
+            peaks[:len(values), column] = values
+        bases = np.array([tables[key].base for key in keys], dtype = np.float64)
+        return cls(keys, np.arange(1, shots + 1), peaks * bases, bases)
+
+    @classmethod
+    def stack(cls, items, labels = None):
+        """
+        Stacks the variables of many ShotPeaks (e.g. one per listing of a
+        campaign) side by side, keyed as (label, key) with labels defaulting
+        to the item positions. Shots are numbered from 1 by row and shorter
+        items are padded with NaN. Apply phase_max before stacking.
+        """
+        items = list(items)
+        if labels is None:
+            labels = range(len(items))
+        keys = [(label, key) for label, item in zip(labels, items) for key in item.keys]
+        shots = max([len(item.shots) for item in items], default = 0)
+        peaks = np.full((shots, len(keys)), np.nan)
+        column = 0
+        for item in items:
+            peaks[:len(item.shots), column:column + len(item)] = item.peaks
+            column += len(item)
+        bases = np.concatenate([item.bases for item in items] + [np.zeros(0)])
+        return cls(keys, np.arange(1, shots + 1), peaks, bases)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def column(self, key):
+        """Returns the peaks of a variable, by table key."""
+        return self.peaks[:, self.keys.index(key)]
+
+    def per_unit(self):
+        """Returns the peaks divided by their table bases."""
+        return ShotPeaks(self.keys, self.shots, self.peaks / self.bases,
+                         np.ones(len(self.keys)))
+
+    def phase_max(self):
+        """
+        Returns the maximum peak of each shot over each three-phase group of
+        variables, keyed as their summary tables, with the base of the last
+        phase table of the group (as ATP does).
+        """
+        groups = {}
+        for column, (ttype, node1, node2, phase) in enumerate(self.keys):
+            group = (ttype, node1[:-1], node2[:-1], listing.TABLE_SUMMARY)
+            groups.setdefault(group, []).append(column)
+
+        order = np.array([column for columns in groups.values() for column in columns],
+                         dtype = np.intp)
+        sizes = [len(columns) for columns in groups.values()]
+        starts = np.cumsum([0] + sizes[:-1]).astype(np.intp)
+        if len(order):
+            peaks = np.fmax.reduceat(self.peaks[:, order], starts, axis = 1)
+        else:
+            peaks = np.zeros((len(self.shots), 0))
+        bases = [self.bases[columns[-1]] for columns in groups.values()]
+        return ShotPeaks(list(groups), self.shots, peaks, bases)
+
+    def with_phase_max(self):
+        """Returns the per phase peaks followed by the phase-max peaks."""
+        summary = self.phase_max()
+        return ShotPeaks(self.keys + summary.keys, self.shots,
+                         np.hstack([self.peaks, summary.peaks]),
+                         np.concatenate([self.bases, summary.bases]))
+
+
+def _count(peaks):
+    return np.count_nonzero(~np.isnan(peaks), axis = 0)
+
+
+def moments(peaks, ddof = 0):
+    """
+    Returns the MOMENTS_DTYPE record of each column of a (shots x variables)
+    array of peaks, ignoring NaN. Variances are divided by count - ddof.
+    """
+    peaks = np.atleast_2d(np.asarray(peaks, dtype = np.float64).T).T
+    result = np.zeros(peaks.shape[1], dtype = MOMENTS_DTYPE)
+    count = _count(peaks)
+    result["count"] = count
+    valid = count > 0
+    sums = np.where(np.isnan(peaks), 0.0, peaks).sum(axis = 0)
+    mean = np.divide(sums, count, out = np.full(len(count), np.nan), where = valid)
+    deviations = np.where(np.isnan(peaks), 0.0, peaks - mean)
+    squares = (deviations * deviations).sum(axis = 0)
+    var = np.divide(squares, count - ddof, out = np.full(len(count), np.nan),
+                    where = count > ddof)
+    result["mean"] = mean
+    result["var"]  = var
+    result["std"]  = np.sqrt(var)
+    filled = np.where(np.isnan(peaks), np.inf, peaks)
+    result["min"] = np.where(valid, filled.min(axis = 0, initial = np.inf), np.nan)
+    filled = np.where(np.isnan(peaks), -np.inf, peaks)
+    result["max"] = np.where(valid, filled.max(axis = 0, initial = -np.inf), np.nan)
+    return result
+
+
+def grouped_moments(peaks, aincr):
+    """
+    Returns the mean, variance and standard deviation of each column of peaks
+    grouped in intervals of width aincr (as ATP distribution tables, taking
+    each interval mid point), as three arrays.
+    """
+    peaks = np.asarray(peaks, dtype = np.float64)
+    centres = (np.floor(peaks / aincr) + 0.5) * aincr
+    result = moments(centres)
+    return result["mean"], result["var"], result["std"]
+
+
+def statistical_overvoltages(peaks, probabilities = OVERVOLTAGE_PROBABILITIES):
+    """
+    Returns the empirical values exceeded with each probability (per cent)
+    by each column of peaks, as a (probabilities x variables) array: U2%,
+    U10% and U50% by default.
+    """
+    percentiles = 100.0 - np.asarray(probabilities, dtype = np.float64)
+    return np.atleast_2d(np.nanpercentile(peaks, percentiles, axis = 0))
+
+
+def gaussian_overvoltages(peaks, probabilities = OVERVOLTAGE_PROBABILITIES, ddof = 0):
+    """
+    Same as statistical_overvoltages, from a Gaussian distribution of the
+    peaks mean and standard deviation.
+    """
+    result = moments(peaks, ddof)
+    z = np.array([statistics.NormalDist().inv_cdf(1.0 - p / 100.0) for p in probabilities])
+    return result["mean"] + z[:, None] * result["std"]
+
+
+def mean_confidence(peaks, confidence = 0.95, ddof = 1):
+    """
+    Returns the lower and upper confidence bounds of each column mean (normal
+    approximation), as two arrays.
+    """
+    result = moments(peaks, ddof)
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    half = z * result["std"] / np.sqrt(np.maximum(result["count"], 1))
+    return result["mean"] - half, result["mean"] + half
+
+
+def overvoltage_confidence(peaks, probability = 2.0, confidence = 0.95):
+    """
+    Returns distribution-free lower and upper confidence bounds of the value
+    exceeded with "probability" per cent by each column of peaks, from the
+    order statistics around its rank (normal approximation of the binomial
+    distribution), as two arrays.
+    """
+    peaks = np.asarray(peaks, dtype = np.float64)
+    count = _count(peaks)
+    # NaN are sorted last
+    ordered = np.sort(peaks, axis = 0)
+    q = 1.0 - probability / 100.0
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    spread = z * np.sqrt(count * q * (1.0 - q))
+    last = np.maximum(count - 1, 0)
+    low  = np.clip(np.floor(count * q - spread) - 1, 0, last).astype(np.intp)
+    high = np.clip(np.ceil(count * q + spread) - 1, 0, last).astype(np.intp)
+    empty = count == 0
+    lower = np.take_along_axis(ordered, low[None, :], axis = 0)[0]
+    upper = np.take_along_axis(ordered, high[None, :], axis = 0)[0]
+    return np.where(empty, np.nan, lower), np.where(empty, np.nan, upper)
+
+
+def exceedance(peaks, levels):
+    """
+    Returns the fraction of shots whose peak is not lower than each level,
+    for each column of peaks, as a (levels x variables) array.
+    """
+    peaks = np.asarray(peaks, dtype = np.float64)
+    levels = np.asarray(levels, dtype = np.float64)
+    count = _count(peaks)
+    ordered = np.sort(peaks, axis = 0)
+    result = np.full((len(levels), peaks.shape[1]), np.nan)
+    for column in range(peaks.shape[1]):
+        n = count[column]
+        if n:
+            below = np.searchsorted(ordered[:n, column], levels, side = "left")
+            result[:, column] = (n - below) / float(n)
+    return result
+
+
+def summarize(shot_peaks, per_unit = True, confidence = 0.95, ddof = 0):
+    """
+    Returns the SUMMARY_DTYPE record of every variable of a ShotPeaks (in per
+    unit of their table bases if per_unit is set): moments, empirical and
+    Gaussian statistical overvoltages, and confidence bounds of the mean and
+    of U2%.
+    """
+    if per_unit:
+        shot_peaks = shot_peaks.per_unit()
+    peaks = shot_peaks.peaks
+    result = np.zeros(len(shot_peaks), dtype = SUMMARY_DTYPE)
+    values = moments(peaks, ddof)
+    for name in MOMENTS_DTYPE.names:
+        result[name] = values[name]
+    if len(shot_peaks) == 0 or len(shot_peaks.shots) == 0:
+        return result
+
+    result["u2"], result["u10"], result["u50"] = statistical_overvoltages(peaks)
+    result["u2_gauss"] = gaussian_overvoltages(peaks, (2.0,), ddof)[0]
+    result["mean_low"], result["mean_high"] = mean_confidence(peaks, confidence)
+    result["u2_low"], result["u2_high"] = overvoltage_confidence(peaks, 2.0, confidence)
+    return result
+
+
+def check_moments(shot_peaks, tables, rtol = 1.0e-5, atol = 1.0e-7):
+    """
+    Compares the ungrouped moments computed from the shot peaks (per phase
+    and phase-max, in per unit) with those ATP printed in the distribution
+    tables, a StatTable dict of read_stat_tables. Returns the list of
+    (key, name, computed, printed) that differ.
+    """
+    peaks = shot_peaks.with_phase_max()
+    bases = np.array([tables[key].base if key in tables else np.nan for key in peaks.keys])
+    values = moments(peaks.peaks / bases)
+
+    mismatches = []
+    for column, key in enumerate(peaks.keys):
+        table = tables.get(key)
+        if table is None:
+            continue
+        for name, printed in (("mean", table.umean), ("var", table.uvar), ("std", table.ustd)):
+            computed = float(values[name][column])
+            if not np.isclose(computed, printed, rtol = rtol, atol = atol):
+                mismatches.append((key, name, computed, printed))
+    return mismatches
+
+
+def _erfc(x):
+    """
+    Complementary error function of an array, by its Chebyshev approximation
+    (relative error below 1.2e-7 everywhere, tails included).
+    """
+    x = np.asarray(x, dtype = np.float64)
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 +
+           t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 +
+           t * (-0.82215223 + t * 0.17087277))))))))
+    result = t * np.exp(poly - z * z)
+    return np.where(x >= 0.0, result, 2.0 - result)
+
+
+def normal_cdf(x):
+    """Standard normal cumulative distribution function of an array."""
+    return 0.5 * _erfc(-np.asarray(x, dtype = np.float64) / np.sqrt(2.0))
+
+
+def truncation_values(u2, case_peak = False):
+    """
+    Returns the IEC 60071-2 estimates of the overvoltages truncation values
+    from their per unit values exceeded with 2% probability: 1.25 U2% - 0.25
+    by the phase-peak method and 1.13 U2% - 0.13 by the case-peak method
+    (case_peak set, or an array of flags, one per variable).
+    """
+    u2 = np.asarray(u2, dtype = np.float64)
+    return np.where(case_peak, 1.13 * u2 - 0.13, 1.25 * u2 - 0.25)
+
+
+def _ordered_quantile(ordered, count, q):
+    """
+    Quantile q of each column of sorted peaks holding count values (linear
+    interpolation, as np.percentile), NaN for empty columns.
+    """
+    position = np.maximum(count - 1, 0) * q
+    low = np.floor(position).astype(np.intp)
+    high = np.minimum(low + 1, np.maximum(count - 1, 0))
+    lower = np.take_along_axis(ordered, low[None, :], axis = 0)[0]
+    upper = np.take_along_axis(ordered, high[None, :], axis = 0)[0]
+    return np.where(count > 0, lower + (upper - lower) * (position - low), np.nan)
+
+
+def _kolmogorov_pvalue(d, count):
+    """
+    Asymptotic p-value of the Kolmogorov-Smirnov statistics d of samples of
+    count values (with Stephens' small sample correction).
+    """
+    root = np.sqrt(np.maximum(count, 1))
+    lam = (root + 0.12 + 0.11 / root) * d
+    k = np.arange(1, 101)[:, None]
+    series = (2.0 * (-1.0) ** (k - 1) * np.exp(-2.0 * k * k * lam * lam)).sum(axis = 0)
+    return np.where(lam < 0.2, 1.0, np.clip(series, 0.0, 1.0))
+
+
+def _model_cdf(fits, model, values):
+    """
+    Cumulative distribution of a fitted model (FIT_DTYPE records) at values,
+    a (... x variables) array.
+    """
+    if model == MODEL_WEIBULL:
+        ratio = np.maximum(values, 0.0) / fits["weibull_scale"]
+        return -np.expm1(-ratio ** fits["weibull_shape"])
+    cdf = normal_cdf((values - fits["mean"]) / fits["std"])
+    if model == MODEL_TRUNCATED:
+        top = normal_cdf((fits["truncation"] - fits["mean"]) / fits["std"])
+        cdf = np.where(values < fits["truncation"], cdf / top, 1.0)
+    return cdf
+
+
+def fit_overvoltages(peaks, truncation = None, case_peak = False):
+    """
+    Fits overvoltage distributions to each column of a (shots x variables)
+    array of peaks, ignoring NaN, returning its FIT_DTYPE record:
+
+    - Gaussian: the peaks mean and standard deviation;
+    - truncated Gaussian: the same, truncated above at "truncation" (the
+      truncation_values of the per unit peaks by default), never below the
+      largest peak;
+    - Weibull: shape and scale of the two parameter distribution, by least
+      squares over the Weibull plot of the peaks median ranks.
+
+    The goodness of fit of each model is given by its Kolmogorov-Smirnov
+    statistic and p-value. The parameters being estimated from the same
+    peaks, p-values are optimistic. Variables of less than two distinct
+    peaks are not fitted (NaN).
+    """
+    peaks = np.atleast_2d(np.asarray(peaks, dtype = np.float64).T).T
+    result = np.zeros(peaks.shape[1], dtype = FIT_DTYPE)
+    values = moments(peaks)
+    count = values["count"]
+    result["count"] = count
+    result["mean"] = values["mean"]
+    result["std"] = values["std"]
+
+    # NaN are sorted last
+    ordered = np.sort(peaks, axis = 0)
+    rank = np.arange(1, len(ordered) + 1)[:, None]
+    valid = rank <= count
+    if truncation is None:
+        truncation = truncation_values(_ordered_quantile(ordered, count, 0.98), case_peak)
+    result["truncation"] = np.fmax(truncation, values["max"])
+
+    n = count.astype(np.float64)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        # Weibull plot of the positive peaks
+        usable = valid & (ordered > 0.0)
+        used = np.count_nonzero(usable, axis = 0)
+        x = np.where(usable, np.log(np.where(usable, ordered, 1.0)), 0.0)
+        y = np.where(usable, np.log(-np.log1p(-(rank - 0.3) / (n + 0.4))), 0.0)
+        x_mean = x.sum(axis = 0) / used
+        y_mean = y.sum(axis = 0) / used
+        dx = np.where(usable, x - x_mean, 0.0)
+        shape = (dx * y).sum(axis = 0) / (dx * dx).sum(axis = 0)
+        result["weibull_shape"] = shape
+        result["weibull_scale"] = np.exp(x_mean - y_mean / shape)
+
+        for model in MODELS:
+            cdf = _model_cdf(result, model, ordered)
+            above = np.where(valid, rank / n - cdf, -np.inf).max(axis = 0, initial = -np.inf)
+            below = np.where(valid, cdf - (rank - 1) / n, -np.inf).max(axis = 0, initial = -np.inf)
+            d = np.maximum(above, below)
+            result["ks_" + model] = d
+            result["p_" + model] = _kolmogorov_pvalue(d, count)
+
+    degenerate = (count < 2) | ~(values["std"] > 0.0) | (used < 2)
+    for name in ("weibull_shape", "weibull_scale") + tuple(
+            prefix + model for prefix in ("ks_", "p_") for model in MODELS):
+        result[name][degenerate] = np.nan
+    return result
+
+
+class InsulationStrength(object):
+    """
+    Flashover probability of an insulation as a function of the overvoltage
+    peak applied to it, by the Gaussian or the modified Weibull model of IEC
+    60071-2, given its 50% flashover voltage u50 and conventional deviation
+    z (6% of u50 by default, as for switching impulses on external
+    insulation) in the units of the peaks. Both models withstand below
+    u50 - truncation * z. The probability is that of any of "insulations"
+    identical insulations in parallel flashing over. u50 and z may be
+    arrays of one value per variable.
+    """
+    # Weibull model exponent, for its truncation at u50 - 4 z
+    WEIBULL_EXPONENT = 5.0
+
+    def __init__(self, u50, z = None, model = STRENGTH_WEIBULL, truncation = 4.0,
+                 insulations = 1):
+        if model not in (STRENGTH_GAUSS, STRENGTH_WEIBULL):
+            raise ValueError("Unknown insulation strength model: {0}".format(model))
+        self.u50 = np.asarray(u50, dtype = np.float64)
+        self.z = 0.06 * self.u50 if z is None else np.asarray(z, dtype = np.float64)
+        self.model = model
+        self.truncation = float(truncation)
+        self.insulations = insulations
+
+    def probability(self, voltages):
+        """
+        Returns the flashover probability at each voltage, a (... x
+        variables) array.
+        """
+        x = (np.asarray(voltages, dtype = np.float64) - self.u50) / self.z
+        if self.model == STRENGTH_WEIBULL:
+            ratio = np.maximum(1.0 + x / self.truncation, 0.0)
+            probability = -np.expm1(np.log(0.5) * ratio ** self.WEIBULL_EXPONENT)
+        else:
+            probability = np.where(x < -self.truncation, 0.0, normal_cdf(x))
+        if self.insulations != 1:
+            with np.errstate(divide = "ignore"):
+                probability = -np.expm1(self.insulations * np.log1p(-probability))
+        return probability
+
+
+def _is_case_peak(key):
+    """Whether a variable, keyed as ShotPeaks or ShotPeaks.stack, is phase-max."""
+    if isinstance(key[-1], tuple):
+        key = key[-1]
+    return key[-1] == listing.TABLE_SUMMARY
+
+
+def _model_ranges(fits):
+    """Overvoltage range of each fitted model, holding all but 1e-15 of it."""
+    return {
+        MODEL_GAUSS:     (fits["mean"] - 8.0 * fits["std"], fits["mean"] + 8.0 * fits["std"]),
+        MODEL_TRUNCATED: (fits["mean"] - 8.0 * fits["std"], fits["truncation"]),
+        MODEL_WEIBULL:   (fits["weibull_scale"] * 1.0e-15 ** (1.0 / fits["weibull_shape"]),
+                          fits["weibull_scale"] * 35.0 ** (1.0 / fits["weibull_shape"])),
+    }
+
+
+def risk_of_failure(shot_peaks, strength, per_unit = True, points = 1000):
+    """
+    Returns the RISK_DTYPE record of every variable of a ShotPeaks (in per
+    unit of their table bases if per_unit is set, the InsulationStrength
+    being given in the same units): its fit_overvoltages distributions and
+    its risk of failure, the flashover probability per energization
+
+        R = integral of f(u) P(u) du
+
+    of the overvoltages density f and the insulation flashover probability
+    P, from its shot peaks ("risk") and from each fitted model ("risk_gauss",
+    "risk_truncated" and "risk_weibull", integrated over "points" intervals).
+    Phase-max variables (summary keys) are truncated as by the case-peak
+    method; without per unit peaks, models are truncated at the largest peak.
+    """
+    if per_unit:
+        shot_peaks = shot_peaks.per_unit()
+    peaks = shot_peaks.peaks
+    case_peak = np.array([_is_case_peak(key) for key in shot_peaks.keys], dtype = bool)
+    fits = fit_overvoltages(peaks, None if per_unit else np.nan, case_peak)
+    result = np.zeros(len(fits), dtype = RISK_DTYPE)
+    for name in FIT_DTYPE.names:
+        result[name] = fits[name]
+
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        result["risk"] = np.nansum(strength.probability(peaks), axis = 0) / fits["count"]
+        steps = np.linspace(0.0, 1.0, points + 1)[:, None]
+        for model, (low, high) in _model_ranges(fits).items():
+            edges = low + (high - low) * steps
+            mass = np.diff(_model_cdf(fits, model, edges), axis = 0)
+            middle = 0.5 * (edges[1:] + edges[:-1])
+            result["risk_" + model] = (mass * strength.probability(middle)).sum(axis = 0)
+    return result
+
+
+class DistributionSummary(object):
+    """
+    Fixed-memory, mergeable summary of the distributions of many variables,
+    keyed as ShotPeaks: a histogram over a bin grid shared by every summary
+    (low, low + width, ..., low + bins * width, plus an underflow and an
+    overflow bin) and count, mean, sum of squared deviations, minimum and
+    maximum of each variable.
+
+    Summaries of different files or worker processes are combined by merge,
+    which is associative and commutative, so a campaign is summarized
+    without keeping its shots in memory. Moments are exact; quantiles and
+    exceedances come from the histogram, within a bin width.
+    """
+    def __init__(self, low = 0.0, width = 0.05, bins = 100):
+        self.low   = float(low)
+        self.width = float(width)
+        self.bins  = int(bins)
+        self.keys  = []
+        self._rows = {}
+        self.counts = np.zeros((0, self.bins + 2), dtype = np.int64)
+        self.count  = np.zeros(0, dtype = np.int64)
+        self.mean   = np.zeros(0)
+        self.m2     = np.zeros(0)
+        self.min    = np.zeros(0)
+        self.max    = np.zeros(0)
+
+    def _grid(self):
+        return (self.low, self.width, self.bins)
+
+    def _key_rows(self, keys):
+        """Returns the rows of keys, adding the missing ones."""
+        new = [key for key in dict.fromkeys(keys) if key not in self._rows]
+        if new:
+            for key in new:
+                self._rows[key] = len(self.keys)
+                self.keys.append(key)
+            n = len(new)
+            self.counts = np.vstack([self.counts, np.zeros((n, self.bins + 2), dtype = np.int64)])
+            self.count  = np.concatenate([self.count, np.zeros(n, dtype = np.int64)])
+            self.mean   = np.concatenate([self.mean, np.zeros(n)])
+            self.m2     = np.concatenate([self.m2, np.zeros(n)])
+            self.min    = np.concatenate([self.min, np.full(n, np.inf)])
+            self.max    = np.concatenate([self.max, np.full(n, -np.inf)])
+        return np.array([self._rows[key] for key in keys], dtype = np.intp)
+
+    def bin_index(self, values):
+        """Returns the histogram bin of values (0 and bins + 1 out of the grid)."""
+        index = np.floor((np.asarray(values, dtype = np.float64) - self.low) / self.width)
+        return (np.clip(index, -1, self.bins) + 1).astype(np.intp)
+
+    def edges(self):
+        """Returns the bin grid edges."""
+        return self.low + self.width * np.arange(self.bins + 1)
+
+    def _combine(self, rows, count, mean, m2, low, high, counts):
+        """Chan's parallel update of the accumulators of rows."""
+        n_a = self.count[rows].astype(np.float64)
+        n_b = count.astype(np.float64)
+        n = n_a + n_b
+        safe = np.where(n > 0, n, 1.0)
+        delta = mean - self.mean[rows]
+        self.mean[rows] = np.where(n > 0, self.mean[rows] + delta * n_b / safe, 0.0)
+        self.m2[rows] = self.m2[rows] + m2 + delta * delta * n_a * n_b / safe
+        self.count[rows] += count
+        self.min[rows] = np.minimum(self.min[rows], low)
+        self.max[rows] = np.maximum(self.max[rows], high)
+        self.counts[rows] += counts
+
+    def add_peaks(self, shot_peaks, per_unit = True):
+        """
+        Adds every variable of a ShotPeaks (in per unit of their table bases
+        if per_unit is set), ignoring NaN peaks.
+        """
+        if per_unit:
+            shot_peaks = shot_peaks.per_unit()
+        rows = self._key_rows(shot_peaks.keys)
+        peaks = shot_peaks.peaks
+        values = moments(peaks, 0)
+        m2 = np.where(values["count"] > 0, values["var"] * values["count"], 0.0)
+        mean = np.where(values["count"] > 0, values["mean"], 0.0)
+        low = np.where(values["count"] > 0, values["min"], np.inf)
+        high = np.where(values["count"] > 0, values["max"], -np.inf)
+
+        counts = np.zeros((len(rows), self.bins + 2), dtype = np.int64)
+        valid = ~np.isnan(peaks)
+        columns = np.nonzero(valid)[1]
+        np.add.at(counts, (columns, self.bin_index(peaks[valid])), 1)
+        self._combine(rows, values["count"], mean, m2, low, high, counts)
+        return self
+
+    def add_table(self, key, table):
+        """
+        Adds a StatTable distribution (in per unit), from its interval
+        frequencies and its printed ungrouped moments: each shot is counted
+        at the middle of its interval, and the minimum and maximum are
+        those of the intervals.
+        """
+        rows = self._key_rows([key])
+        array = table.array
+        density = array["density"]
+        count = int(density.sum())
+        if count == 0:
+            return self
+        used = density > 0
+        lows = array["pu"][used]
+        aincr = float(np.diff(array["pu"]).min()) if len(array) > 1 else self.width
+        counts = np.zeros((1, self.bins + 2), dtype = np.int64)
+        np.add.at(counts[0], self.bin_index(lows + aincr / 2.0), density[used])
+        self._combine(rows, np.array([count]), np.array([table.umean]),
+                      np.array([table.uvar * count]), np.array([lows.min()]),
+                      np.array([lows.max() + aincr]), counts)
+        return self
+
+    def merge(self, other):
+        """Adds the summaries of another DistributionSummary on the same grid."""
+        if other._grid() != self._grid():
+            raise ValueError("Cannot merge distribution summaries of different bin grids")
+        rows = self._key_rows(other.keys)
+        self._combine(rows, other.count, other.mean, other.m2, other.min,
+                      other.max, other.counts)
+        return self
+
+    def __add__(self, other):
+        return self.copy().merge(other)
+
+    def copy(self):
+        summary = DistributionSummary(self.low, self.width, self.bins)
+        return summary.merge(self)
+
+    def rename(self, function):
+        """
+        Returns a summary with each key replaced by function(key), merging
+        the variables given the same key (e.g. every scenario of a campaign).
+        """
+        summary = DistributionSummary(self.low, self.width, self.bins)
+        rows = summary._key_rows([function(key) for key in self.keys])
+        for row in range(len(self.keys)):
+            summary._combine(rows[row:row + 1], self.count[row:row + 1],
+                             self.mean[row:row + 1], self.m2[row:row + 1],
+                             self.min[row:row + 1], self.max[row:row + 1],
+                             self.counts[row:row + 1])
+        return summary
+
+    def moments(self, ddof = 0):
+        """Returns the MOMENTS_DTYPE record of each variable."""
+        result = np.zeros(len(self.keys), dtype = MOMENTS_DTYPE)
+        result["count"] = self.count
+        valid = self.count > 0
+        result["mean"] = np.where(valid, self.mean, np.nan)
+        var = np.divide(self.m2, self.count - ddof, out = np.full(len(self.keys), np.nan),
+                        where = self.count > ddof)
+        result["var"] = var
+        result["std"] = np.sqrt(var)
+        result["min"] = np.where(valid, self.min, np.nan)
+        result["max"] = np.where(valid, self.max, np.nan)
+        return result
+
+    def quantiles(self, q):
+        """
+        Returns the quantiles q (0 to 1) of each variable interpolated over
+        the histogram, as a (quantiles x variables) array. Out of grid bins
+        are bounded by the variables minimum and maximum.
+        """
+        q = np.atleast_1d(np.asarray(q, dtype = np.float64))
+        result = np.full((len(q), len(self.keys)), np.nan)
+        edges = self.edges()
+        for row in range(len(self.keys)):
+            n = self.count[row]
+            if n == 0:
+                continue
+            bounds = np.concatenate([[min(self.min[row], edges[0])], edges,
+                                     [max(self.max[row], edges[-1])]])
+            cumulative = np.concatenate([[0], np.cumsum(self.counts[row])]) / float(n)
+            # interpolate the cumulative distribution inverse within the bins
+            values = np.interp(q, cumulative, bounds)
+            result[:, row] = np.clip(values, self.min[row], self.max[row])
+        return result
+
+    def statistical_overvoltages(self, probabilities = OVERVOLTAGE_PROBABILITIES):
+        """Same as statistical_overvoltages, from the histograms."""
+        return self.quantiles(1.0 - np.asarray(probabilities) / 100.0)
+
+    def exceedance(self, levels):
+        """
+        Returns the fraction of shots not lower than each level, for each
+        variable, as a (levels x variables) array. Levels are taken at the
+        bin edges they fall in.
+        """
+        bins = self.bin_index(levels)
+        above = np.cumsum(self.counts[:, ::-1], axis = 1)[:, ::-1]
+        return (above[:, bins] / np.maximum(self.count, 1)[:, None]).T
@@ -0,0 +1,363 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+SYNTHETIC ATP LIS FILES GENERATOR
+"""
+import argparse
+import math
+import sys
+
+import numpy as np
+
+
+# Per unit bases of each variable type
+_BASES = {
+    "voltage": 408248.29,
+    "current": 1000.0,
+    "energy":  1.0E6,
+}
+
+_STAT_OUT_CAPTIONS = {
+    "voltage": "Statistical output of  node  voltage.\n",
+    "current": "Statistical output of branch current.\n",
+    "energy":  "Statistical output of branch energy .\n",
+}
+
+
+class SyntheticListing(object):
+    """
+    Synthetic ATP .lis file of a statistical switching study, written with
+    the fixed-width layouts read by listing.py: input cards, node
+    connections, phasor solutions, output variables, random switching times
+    (and type 183 closing instants), shot peaks, and per phase and summary
+    statistical distribution tables of every variable.
+
+    Variables are three-phase groups of node voltages, branch currents and
+    branch energies. Peaks and switching times are drawn from a seeded random
+    generator, so a given set of arguments always writes the same file.
+    """
+    def __init__(self, shots = 20, voltage_buses = 4, current_branches = 2,
+                 energy_branches = 1, switches = 3, t183_switches = 0,
+                 input_cards = 20, phasor_branches = 6, time_steps = 50,
+                 aincr = 0.05, seed = 1):
+        self.shots = shots
+        self.switches = switches
+        self.t183_switches = t183_switches
+        self.input_cards = input_cards
+        self.phasor_branches = phasor_branches
+        self.time_steps = time_steps
+        self.voltage_buses = voltage_buses
+        self.aincr = aincr
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+
+        # (type, node1, node2, base)
+        self.variables = []
+        for i in range(voltage_buses):
+            for phase in "ABC":
+                self.variables.append(("voltage", "B%04d%s" % (i + 1, phase), "", _BASES["voltage"]))
+        for i in range(current_branches):
+            for phase in "ABC":
+                self.variables.append(("current", "S%04d%s" % (i + 1, phase),
+                                       "B%04d%s" % (i + 1, phase), _BASES["current"]))
+        for i in range(energy_branches):
+            for phase in "ABC":
+                self.variables.append(("energy", "R%04d%s" % (i + 1, phase),
+                                       "T%04d%s" % (i + 1, phase), _BASES["energy"]))
+
+        # peaks in per unit, shots x variables
+        voltage = np.array([v[0] == "voltage" for v in self.variables])
+        self.peaks = np.where(voltage,
+                              rng.normal(1.6, 0.15, (shots, len(self.variables))),
+                              rng.uniform(0.2, 2.0, (shots, len(self.variables)))).round(6)
+        self.sw_times = rng.uniform(0.01, 0.02, (shots, switches)).round(8)
+        self.t183_times = rng.uniform(0.01, 0.02, (shots, 3 * t183_switches)).round(8)
+
+    def write(self, path):
+        with open(path, "w") as file:
+            self.write_file(file)
+
+    def write_file(self, file):
+        self._write_header(file)
+        self._write_input_cards(file)
+        self._write_node_connections(file)
+        self._write_phasors(file)
+        self._write_output_variables(file)
+        self._write_statistical_simulations(file)
+        self._write_statistical_results(file)
+        self._write_timing(file)
+
+    def _write_header(self, f):
+        f.write("Alternative Transients Program (ATP), GNU Linux or DOS. All rights reserved by Can/Am user group.\n")
+        f.write(" Date (dd-mth-yy) and time of day (hh.mm.ss) = 17-Oct-2018  12:34:56   Name of disk plot file (if any) is case.pl4\n")
+        f.write("Source code date is 30 June 2015.\n")
+        f.write("\n")
+
+    def _write_input_cards(self, f):
+        f.write("Descriptive interpretation of input data cards.  |  Input data card images are shown below, all 80 columns, character by character\n")
+        f.write("                                                 |  0        1         2         3         4         5         6         7         8\n")
+        f.write("                                                 |  012345678901234567890123456789012345678901234567890123456789012345678901234567890\n")
+        f.write("Marker card preceding new EMTP data case.        |BEGIN NEW DATA CASE\n")
+        f.write("Misc. data.  5.000E-06  5.000E-02  6.000E+01     |  5.E-6    .05    60.\n")
+        f.write("Statistics data.  NSTAT =%5d  ISEED =%10d    |%8d       1       1       1\n"
+                % (self.shots, 12345 + self.seed, self.shots))
+        for i in range(self.input_cards):
+            f.write("Series R-L-C.    1.000E+00  1.000E+01  0.000E+00 |  B%04dAS%04dA          1.    10.\n"
+                    % (i + 1, i + 1))
+        f.write("Blank card ending branch cards.                  |BLANK BRANCH\n")
+        f.write("\n")
+
+    def _write_node_connections(self, f):
+        f.write("List of input elements that are connected to each node.  Only the physical connections of multi-phase lines are shown.\n")
+        f.write("--------------+------------------------------\n")
+        f.write("From bus name | Names of all adjacent busses.\n")
+        f.write("--------------+------------------------------\n")
+        f.write("  TERRA       |B0001A*B0001B*B0001C*\n")
+        for i in range(self.voltage_buses):
+            for phase in "ABC":
+                f.write("  B%04d%s      |TERRA *S%04d%s*\n" % (i + 1, phase, i + 1, phase))
+        f.write("--------------+------------------------------\n")
+        f.write("\n")
+
+    def _write_phasors(self, f):
+        rng = np.random.default_rng(self.seed + 1)
+        f.write("Sinusoidal steady-state phasor solution, branch by branch.  All flows are away from bus, and real part, magnitude, or \"P\"\n")
+        f.write("is printed above the imaginary part, the angle, or \"Q\".  First solution frequency =    6.00000000E+01 Hertz.\n")
+        f.write(" Bus K     Phasor node voltage          Phasor branch current               Power flow                Power loss\n")
+        f.write(" Bus M     Rectangular       Polar       Rectangular       Polar         P and Q                   P and Q\n")
+        f.write("\n")
+        # bus K and bus M of each branch, the power loss only printed at K
+        for i in range(self.phasor_branches):
+            for side, name in enumerate(("S%04dA" % (i + 1), "B%04dA" % (i + 1))):
+                vr, vi = 4.0E5 * rng.random(), 1.0E4 * rng.random()
+                ir, ii = 1.0E2 * rng.random(), 1.0E1 * rng.random()
+                vm, va = math.hypot(vr, vi), math.degrees(math.atan2(vi, vr))
+                im, ia = math.hypot(ir, ii), math.degrees(math.atan2(ii, ir))
+                loss = ((" %15.8E" % (vr * ir / 20)), (" %15.8E" % (vi * ii / 20))) if side == 0 else ("", "")
+                f.write(" %-6s %15.8E %15.8E %15.8E %15.8E %15.8E%s\n"
+                        % (name, vr, vm, ir, im, vr * ir / 2, loss[0]))
+                f.write(" %-6s %15.8E %15.7f %15.8E %15.7f %15.8E%s\n"
+                        % ("", vi, va, ii, ia, vi * ii / 2, loss[1]))
+            f.write("\n")
+        f.write("\n")
+        f.write("     Total network loss  P-loss  by summing injections =   1.23456789E+03\n")
+        f.write("Output for steady-state phasor switch currents.\n")
+        f.write("     Node-K    Node-M            I-real            I-imag            I-magn            Degree        Power           Reactive\n")
+        f.write("     B0001A    L0001A   1.00000000E+00   2.00000000E+00   2.23606798E+00      63.4349488   1.0000000E+03   2.0000000E+03\n")
+        f.write("     B0002A    L0002A   Open             Open\n")
+        f.write("\n")
+        f.write("Solution at nodes with known voltage.   Nodes that are shorted together by switches are shown as a group of names.\n")
+        f.write("   Node        Source node voltage            Injected source current            Injected source power\n")
+        f.write("   name        Rectangular      Polar        Rectangular      Polar            P and Q         MVA and P.F.\n")
+        f.write("\n")
+        for phase, angle in (("A", 0.0), ("B", -120.0), ("C", 120.0)):
+            vr = _BASES["voltage"] * math.cos(math.radians(angle))
+            vi = _BASES["voltage"] * math.sin(math.radians(angle))
+            f.write("  %-6s %15.8E %15.8E %15.8E %15.8E %15.8E %15.8E\n"
+                    % ("SRC" + phase, vr, _BASES["voltage"], 10.0, 10.0, 1.0E6, 1.0E6))
+            f.write("  %-6s %15.8E %15.7f %15.8E %15.7f %15.8E %15.7f\n"
+                    % ("", vi, angle, 0.0, 0.0, 0.0, 1.0))
+        f.write("\n")
+        f.write("  ---- Initial flux of coil \"B0001A\" to \"TERRA \"  =   0.00000000E+00\n")
+
+    def _write_output_variables(self, f):
+        # node voltages, then branch currents with their lower node names
+        voltages = [v[1] for v in self.variables if v[0] == "voltage"][:4]
+        currents = [(v[1], v[2]) for v in self.variables if v[0] == "current"][:2]
+        upper = voltages + [n1 for n1, n2 in currents]
+        lower = ["" for name in voltages] + [n2 for n1, n2 in currents]
+        f.write("Column headings for the %3d EMTP output variables follow.  These are divided among the 5 possible classes as follows ....\n"
+                % len(upper))
+        f.write("   <#1> Next %3d output variables are electric-network voltage differences (upper voltage minus lower voltage);\n"
+                % len(voltages))
+        if currents:
+            f.write("   <#2> Next %3d output variables are branch currents (flowing from the upper node to the lower node);\n"
+                    % len(currents))
+        f.write(" Step      Time    " + "".join("   %-12s" % name for name in upper) + "\n")
+        f.write("                   " + "".join("   %-12s" % name for name in lower) + "\n")
+        for k in range(self.time_steps):
+            t = k * 5.0E-6
+            if k == self.time_steps // 2:
+                f.write("  *** Close switch \"B0001A\" to \"L0001A\" after  %13.8E sec.\n" % t)
+            f.write(" %5d %12.5E" % (k, t)
+                    + "".join(" %14.7E" % (1.0E5 * math.sin(377.0 * t + j)) for j in range(len(upper))) + "\n")
+        f.write("\n")
+        f.write("Blank card terminating all plot cards.\n")
+
+    def _write_statistical_simulations(self, f):
+        f.write("The data case now ready to be solved is a statistical overvoltage study of %d energizations.\n" % self.shots)
+        # caption, peak and shot lines of each variable, missing the peak and
+        # shot number
+        blocks = [(_STAT_OUT_CAPTIONS[vtype] + "      Peak extremum of subset has value %15.8E  at time  1.200000E-02\n"
+                   "      simulation %3d  for the variable having names  \"" + "%-6s\"  and  \"%-6s\".\n" % (n1, n2))
+                  for vtype, n1, n2, base in self.variables]
+        bases = np.array([v[3] for v in self.variables])
+        for s in range(self.shots):
+            f.write("             Random switching times for simulation number %5d :\n" % (s + 1))
+            f.write(" " * 31 + "".join("%5d  %13.6E" % (k + 1, t)
+                                       for k, t in enumerate(self.sw_times[s].tolist())) + "\n")
+            if self.t183_switches:
+                f.write("CLOSING INSTANTS [SECONDS]\n")
+                times = self.t183_times[s].tolist()
+                for k in range(self.t183_switches):
+                    f.write("  %-6s %15.8E %15.8E %15.8E\n"
+                            % ("T183%02d" % (k + 1), times[3 * k], times[3 * k + 1], times[3 * k + 2]))
+                f.write("\n")
+            peaks = (self.peaks[s] * bases).tolist()
+            f.write("".join(block % (peak, s + 1) for block, peak in zip(blocks, peaks)))
+        f.write(" MAIN20 dumps OVER12 dice seed   ISEED = %10d\n" % (12345 + self.seed))
+
+    def _write_statistical_results(self, f):
+        f.write("MODTAB, AINCR, XMAXMX =      1   %12.5E   3.00000E+00\n" % self.aincr)
+        for group in range(0, len(self.variables), 3):
+            for v in range(group, group + 3):
+                self._write_table(f, v)
+            self._write_summary(f, group)
+        f.write(" .... Questionable Kolmogorov-Smirnov test result\n")
+
+    def _write_timing(self, f):
+        f.write("\n")
+        f.write("  Timing figures characterizing central processor (CP) solution speed.\n")
+        f.write("  ---------------------------------------------------------------------\n")
+        f.write("  Seconds for overlays 1-5  :    0.016    0.000    0.016  --- (CP: Wait; Real)\n")
+        f.write("  Seconds for time-step loop:    1.234    0.000    1.234\n")
+        f.write("  Seconds after DELTAT-loop :    0.031    0.000    0.031\n")
+        f.write("                                --------------------------\n")
+        f.write("                  Totals    :    1.281    0.000    1.281\n")
+
+    def _caption(self, v):
+        vtype, n1, n2, base = self.variables[v]
+        if vtype == "voltage":
+            caption = "Statistical distribution of peak voltage at node  \"%-6s\"." % n1
+            return caption.ljust(114) + "%15.8E" % base
+        if vtype == "current":
+            caption = "Statistical distribution of peak current  for branch  \"%-6s\"  to  \"%-6s\"." % (n1, n2)
+        else:
+            caption = "Statistical distribution of peak energy   for branch  \"%-6s\"  to  \"%-6s\"." % (n1, n2)
+        return caption.ljust(116) + "%15.8E" % base
+
+    def _write_table(self, f, v):
+        f.write(self._caption(v) + "\n")
+        f.write("   Interval        Voltage          Voltage in      Frequency     Cumulative        Per cent\n")
+        f.write("    number       in per unit     physical units    (density)     frequency   .GE. current value\n")
+        self._write_rows(f, self.peaks[:, v], self.variables[v][3])
+
+    def _write_summary(self, f, group):
+        f.write("\n")
+        f.write("SUMMARY   SUMMARY   SUMMARY   SUMMARY   SUMMARY   SUMMARY   SUMMARY   SUMMARY   SUMMARY   SUMMARY\n")
+        f.write("The following is a distribution of the maximum over the preceding group of three output variables.\n")
+        f.write("Each shot contributes the largest of its three phase peaks.\n")
+        f.write("\n")
+        f.write("\n")
+        f.write("   Interval        Voltage          Voltage in      Frequency     Cumulative        Per cent\n")
+        f.write("    number       in per unit     physical units    (density)     frequency   .GE. current value\n")
+        self._write_rows(f, self.peaks[:, group:group + 3].max(axis = 1),
+                         self.variables[group + 2][3])
+
+    def _write_rows(self, f, peaks, base):
+        n = len(peaks)
+        if n == 0:
+            return
+        a = self.aincr
+        intervals = np.floor(peaks / a).astype(np.int64)
+        first = int(intervals.min())
+        density = np.bincount(intervals - first)
+        cumulative = np.cumsum(density)
+        lows = (np.arange(len(density)) + first) * a
+        rows = []
+        for k, (low, dens, cum) in enumerate(zip(lows.tolist(), density.tolist(), cumulative.tolist())):
+            ge = 100.0 * (n - cum + dens) / n
+            rows.append("%10d%20.8f%20.8E%14d%14d%20.6f\n" % (first + k, low, low * base, dens, cum, ge))
+        f.write("".join(rows))
+
+        centres = lows + a / 2.0
+        gmean = float((density * centres).sum()) / n
+        gvar = float((density * centres * centres).sum()) / n - gmean * gmean
+        umean = float(peaks.mean())
+        uvar = float(peaks.var())
+        f.write("Summary of preceding table follows:            Grouped data       Ungrouped data\n")
+        f.write("%40s%14.8f%5s%14.8f\n" % ("Mean = ", gmean, "", umean))
+        f.write("%40s%14.8f%5s%14.8f\n" % ("Variance = ", gvar, "", uvar))
+        f.write("%40s%14.8f%5s%14.8f\n" % ("Standard deviation = ", math.sqrt(max(gvar, 0.0)), "", math.sqrt(uvar)))
+
+    @classmethod
+    def of_size(cls, size, **kwargs):
+        """
+        Returns a listing of about "size" bytes, setting the number of shots
+        (the other arguments are as in the constructor).
+        """
+        kwargs.pop("shots", None)
+        # distribution tables stop growing with the number of shots once
+        # their intervals are filled, so the size is measured well past it
+        small_size = _written_size(cls(shots = 200, **kwargs))
+        per_shot = (_written_size(cls(shots = 400, **kwargs)) - small_size) / 200.0
+        shots = max(1, int(round(200 + (size - small_size) / per_shot)))
+        return cls(shots = shots, **kwargs)
+
+
+class _CountingFile(object):
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+
+def _written_size(listing):
+    counter = _CountingFile()
+    listing.write_file(counter)
+    return counter.size
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        description = "Write a synthetic ATP .lis file of a statistical switching study.")
+    parser.add_argument("output", help = ".lis file to write")
+    parser.add_argument("-s", "--shots", type = int, default = 20)
+    parser.add_argument("--size", type = float,
+                        help = "approximate file size in MB (sets the number of shots)")
+    parser.add_argument("--voltage-buses", type = int, default = 4)
+    parser.add_argument("--current-branches", type = int, default = 2)
+    parser.add_argument("--energy-branches", type = int, default = 1)
+    parser.add_argument("--switches", type = int, default = 3)
+    parser.add_argument("--t183-switches", type = int, default = 0)
+    parser.add_argument("--seed", type = int, default = 1)
+    args = parser.parse_args(argv)
+
+    kwargs = dict(voltage_buses = args.voltage_buses,
+                  current_branches = args.current_branches,
+                  energy_branches = args.energy_branches,
+                  switches = args.switches,
+                  t183_switches = args.t183_switches,
+                  seed = args.seed)
+    if args.size is not None:
+        listing = SyntheticListing.of_size(int(args.size * 1.0e6), **kwargs)
+    else:
+        listing = SyntheticListing(shots = args.shots, **kwargs)
+    listing.write(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+ATP LIS FILES WATCH FOLDER INGESTION
+"""
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+import listing
+import listing_batch
+import listing_sqlite
+
+
+class JSONLinesSink(object):
+    """Appends each result, as listing_batch writes them, to a JSON lines file."""
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def publish(self, result):
+        record = listing_batch.json_merged(listing_batch.merge_results([result]))
+        record.update({
+            "lisfile": result.lisfile,
+            "size":    result.size,
+            "elapsed": result.elapsed,
+            "error":   result.error,
+            "source_date": listing_batch.iso_date(result.source_date),
+            "simulation_datetime": listing_batch.iso_date(result.simulation_datetime),
+        })
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SQLiteSink(object):
+    """Stores each result in a SQLite database (see listing_sqlite)."""
+    def __init__(self, database):
+        self.exporter = listing_sqlite.SQLiteExporter(database)
+
+    def publish(self, result):
+        self.exporter.add_result(result)
+
+    def close(self):
+        self.exporter.close()
+
+
+class WatchStats(object):
+    """Queue depth and throughput of a Watcher."""
+    def __init__(self):
+        self.start   = time.perf_counter()
+        self.queued  = 0
+        self.running = 0
+        self.done    = 0
+        self.failed  = 0
+        self.bytes   = 0
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1.0e-9)
+        return ("queued {0}  running {1}  done {2} ({3} failed)  "
+                "{4:.2f} files/s  {5:.1f} MB/s".format(
+                    self.queued, self.running, self.done, self.failed,
+                    self.done / elapsed, self.bytes / 1.0e6 / elapsed))
+
+
+class Watcher(object):
+    """
+    Watches a directory for .lis files (see listing_batch.find_lis_files),
+    polling it every "interval" seconds, and parses new or changed files
+    with listing_batch.extract_file in a pool of worker processes, publishing
+    each result to "sink" (JSONLinesSink or SQLiteSink).
+
+    A file is complete once ATP finished writing it (see listing.is_complete)
+    or, for runs which stopped without their end of run figures, once its
+    size and modification time stayed the same for "settle" seconds. At most
+    "queue_size" complete files wait for a worker and twice the workers are
+    being parsed at once; files beyond that are left for later polls, so a
+    burst of files does not grow the queue without bound.
+
+    The size and modification time of the parsed files are kept in
+    "state_file", so unchanged files are never parsed again, even after a
+    restart. Failed files are only skipped until they change or the watcher
+    restarts. When a worker process dies, the pool is replaced and the files
+    in flight are parsed again one by one, each in its own process, so only
+    the file killing its worker is failed.
+    """
+    def __init__(self, directory, sink, workers = None, queue_size = 100,
+                 interval = 5.0, settle = 10.0, state_file = None, tables = True,
+                 backend = listing.BACKEND_MMAP, callback = None):
+        self.directory  = directory
+        self.sink       = sink
+        self.workers    = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.interval   = interval
+        self.settle     = settle
+        self.state_file = state_file
+        self.tables     = tables
+        self.backend    = backend
+        # called with each published LisResult
+        self.callback   = callback
+        self.stats      = WatchStats()
+
+        # path -> [size, mtime_ns] of parsed files
+        self.state   = self._load_state()
+        # path -> [size, mtime_ns] of failed files, not kept in the state
+        self.failed  = {}
+        # path -> [size, mtime_ns, first seen, complete] of files not queued
+        self.seen    = {}
+        self.queue   = collections.deque()
+        # future -> (path, size, mtime_ns)
+        self.running = {}
+        self.executor = None
+
+    def _load_state(self):
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        if self.state_file is None:
+            return
+        folder = os.path.dirname(os.path.abspath(self.state_file))
+        handle, temp = tempfile.mkstemp(dir = folder, suffix = ".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(self.state, file)
+        os.replace(temp, self.state_file)
+
+    def _pending(self):
+        return set(item[0] for item in self.queue) | \
+            set(item[0] for item in self.running.values())
+
+    def scan(self):
+        """Queues the complete files not parsed yet."""
+        now = time.monotonic()
+        pending = self._pending()
+        found = set()
+        for lisfile in listing_batch.find_lis_files([self.directory]):
+            path = os.path.abspath(lisfile)
+            found.add(path)
+            if path in pending:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            version = [stat.st_size, stat.st_mtime_ns]
+            if self.state.get(path) == version or self.failed.get(path) == version:
+                continue
+
+            seen = self.seen.get(path)
+            if seen is None or seen[:2] != version:
+                seen = self.seen[path] = version + [now, self._is_complete(path)]
+                if not seen[3]:
+                    continue
+            if not seen[3] and now - seen[2] < self.settle:
+                continue
+            if len(self.queue) >= self.queue_size:
+                continue
+            del self.seen[path]
+            self.queue.append((path, stat.st_size, stat.st_mtime_ns))
+
+        # forget removed files
+        for path in list(self.seen):
+            if path not in found:
+                del self.seen[path]
+
+    @staticmethod
+    def _is_complete(path):
+        try:
+            return listing.is_complete(path)
+        except Exception:
+            # e.g. a compressed file cut short while being written
+            return False
+
+    def _submit(self):
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers = self.workers)
+        while self.queue and len(self.running) < 2 * self.workers:
+            item = self.queue.popleft()
+            try:
+                future = self.executor.submit(listing_batch._extract_chunk, [item[0]],
+                                              *self._extract_args())
+            except concurrent.futures.process.BrokenProcessPool:
+                self.queue.appendleft(item)
+                if not self.running:
+                    # nothing in flight to collect: replace the pool now
+                    self.executor.shutdown(wait = True)
+                    self.executor = None
+                break
+            self.running[future] = item
+
+    def _extract_args(self):
+        return (self.tables, self.backend, None, False, None)
+
+    def _result(self, future, item):
+        """
+        Publishes the result of a finished future, returning False if its
+        worker process died (the pool is broken).
+        """
+        path, size, mtime_ns = item
+        try:
+            result = future.result()[0]
+        except concurrent.futures.process.BrokenProcessPool:
+            return False
+        except Exception:
+            result = listing_batch._failed_result(path, traceback.format_exc())
+        self._publish(result, size, mtime_ns)
+        return True
+
+    def _collect(self, timeout = 0):
+        done, not_done = concurrent.futures.wait(
+            list(self.running), timeout = timeout,
+            return_when = concurrent.futures.FIRST_COMPLETED)
+        suspects = []
+        for future in done:
+            item = self.running.pop(future)
+            if not self._result(future, item):
+                suspects.append(item)
+
+        if suspects:
+            # every file in flight fails with the broken pool: those not
+            # parsed yet are parsed again alone, and the pool is replaced
+            self.executor.shutdown(wait = True)
+            self.executor = None
+            for future, item in self.running.items():
+                if not self._result(future, item):
+                    suspects.append(item)
+            self.running = {}
+            for path, size, mtime_ns in suspects:
+                result = listing_batch._extract_isolated(path, *self._extract_args())
+                self._publish(result, size, mtime_ns)
+        if done:
+            self._save_state()
+
+    def _publish(self, result, size, mtime_ns):
+        self.sink.publish(result)
+        path = os.path.abspath(result.lisfile)
+        if result.ok:
+            self.state[path] = [size, mtime_ns]
+            self.failed.pop(path, None)
+        else:
+            self.failed[path] = [size, mtime_ns]
+        self.stats.done += 1
+        self.stats.bytes += size
+        if not result.ok:
+            self.stats.failed += 1
+        if self.callback is not None:
+            self.callback(result)
+
+    def poll(self, timeout = 0):
+        """
+        One iteration: scans the directory, starts parsing queued files and
+        publishes those parsed, waiting for them up to timeout seconds.
+        """
+        self.scan()
+        self._submit()
+        if self.running:
+            self._collect(timeout)
+            self._submit()
+        self.stats.queued  = len(self.queue)
+        self.stats.running = len(self.running)
+
+    def run(self, report_interval = 60.0, report = print, iterations = None):
+        """
+        Polls the directory until interrupted (or for a number of
+        iterations), reporting the queue depth and throughput every
+        report_interval seconds.
+        """
+        last_report = time.monotonic()
+        count = 0
+        try:
+            while iterations is None or count < iterations:
+                self.poll(timeout = self.interval)
+                count += 1
+                if time.monotonic() - last_report >= report_interval:
+                    report(self.stats.report())
+                    last_report = time.monotonic()
+                if not self.running:
+                    time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        """Stops the workers, dropping the files not parsed yet."""
+        if self.executor is not None:
+            self.executor.shutdown(wait = True, cancel_futures = True)
+            self.executor = None
+        self.running = {}
+        self.queue.clear()
+        self._save_state()
+        self.sink.close()
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        description = "Watch a directory and parse the ATP .lis files written "
+                      "to it, publishing the results to a JSON lines file or a "
+                      "SQLite database.")
+    parser.add_argument("directory", help = "directory to watch")
+    sinks = parser.add_mutually_exclusive_group(required = True)
+    sinks.add_argument("--jsonl", help = "append the results to a JSON lines file")
+    sinks.add_argument("--sqlite", help = "store the results in a SQLite database")
+    parser.add_argument("-s", "--state", default = None,
+                        help = "state file (default: .listing-watch.json in the directory)")
+    parser.add_argument("-j", "--workers", type = int, default = None,
+                        help = "worker processes (default: number of CPUs)")
+    parser.add_argument("-q", "--queue-size", type = int, default = 100,
+                        help = "complete files waiting for a worker")
+    parser.add_argument("-i", "--interval", type = float, default = 5.0,
+                        help = "polling interval, in seconds")
+    parser.add_argument("--settle", type = float, default = 10.0,
+                        help = "seconds a file must stay unchanged to be complete")
+    parser.add_argument("--report", type = float, default = 60.0,
+                        help = "queue depth and throughput report interval, in seconds")
+    parser.add_argument("--no-tables", action = "store_true",
+                        help = "skip the statistical distribution tables")
+    parser.add_argument("--backend", default = listing.BACKEND_MMAP,
+                        choices = [listing.BACKEND_TEXT, listing.BACKEND_MMAP])
+    args = parser.parse_args(argv)
+
+    sink = JSONLinesSink(args.jsonl) if args.jsonl else SQLiteSink(args.sqlite)
+    state = args.state or os.path.join(args.directory, ".listing-watch.json")
+    watcher = Watcher(args.directory, sink, args.workers, args.queue_size,
+                      args.interval, args.settle, state, not args.no_tables,
+                      args.backend,
+                      callback = lambda result: print(listing_batch.format_result(result)))
+    watcher.run(args.report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
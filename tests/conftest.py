@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import listing_synth
+
+
+# Worker processes inherit the patched functions of the tests only if forked
+needs_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason = "worker processes are not forked")
+
+
+@pytest.fixture
+def write_listing(tmp_path):
+    """Writes a synthetic listing in the test directory, returning its path."""
+    def write(name, **kwargs):
+        path = str(tmp_path / name)
+        kwargs.setdefault("shots", 10)
+        listing_synth.SyntheticListing(**kwargs).write(path)
+        return path
+    return write
+
+
+def copy_case(source, path, size = None):
+    """
+    Copies a listing as another run of the same case (at another time of
+    day), truncated to size bytes if given, as a listing being written.
+    """
+    with open(source, "rb") as file:
+        data = file.read().replace(b"12:34:56", b"09:00:01")
+    with open(path, "wb") as file:
+        file.write(data[:size])
+    return path
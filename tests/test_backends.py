@@ -0,0 +1,64 @@
+import inspect
+
+import numpy as np
+import pytest
+
+import listing
+
+
+def _extract(lisfile, backend):
+    times = listing.ThreePhaseSwitchingTimes(lisfile, backend)
+    return {
+        "names": listing.get_statistical_variable_names(lisfile, backend),
+        "shots": listing.get_shots_information(lisfile, backend),
+        "times": (times.sw_a, times.sw_b, times.sw_c),
+        "parts": listing.find_lis_parts(lisfile, backend),
+    }
+
+
+def test_mmap_backend_equals_text_backend(tmp_path, write_listing):
+    lisfile = write_listing("case.lis", shots = 12, energy_branches = 2)
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    crlf = str(tmp_path / "crlf.lis")
+    with open(crlf, "wb") as file:
+        file.write(data.replace(b"\n", b"\r\n"))
+
+    for path in (lisfile, crlf):
+        text = _extract(path, listing.BACKEND_TEXT)
+        assert len(text["shots"]) == 12 * 24
+        assert len(text["times"][0]) == 12
+        assert _extract(path, listing.BACKEND_MMAP) == text
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / "empty.lis")
+    open(path, "wb").close()
+    assert _extract(path, listing.BACKEND_MMAP) == _extract(path, listing.BACKEND_TEXT)
+
+
+def test_unknown_backend(write_listing):
+    lisfile = write_listing("case.lis")
+    with pytest.raises(ValueError):
+        listing.get_shots_information(lisfile, "mapped")
+
+
+def test_text_backend_is_the_default(write_listing):
+    readers = [(name, value) for name, value in vars(listing).items()
+               if not name.startswith("_") and callable(value)
+               and "backend" in inspect.signature(value).parameters]
+    assert {"get_shot_table", "get_statistical_simulations", "get_node_graph",
+            "LisFile", "SwitchingTimes"} <= set(name for name, reader in readers)
+    for name, reader in readers:
+        assert inspect.signature(reader).parameters["backend"].default == \
+            listing.BACKEND_TEXT, name
+
+    lisfile = write_listing("case.lis", shots = 6)
+    table, sw = listing.get_statistical_simulations(lisfile)
+    mapped, mapped_sw = listing.get_statistical_simulations(lisfile, listing.BACKEND_MMAP)
+    assert table.rows() == mapped.rows() == listing.get_shot_table(lisfile).rows()
+    assert np.array_equal(sw.times, mapped_sw.times)
+    graph = listing.get_node_graph(lisfile)
+    mapped = listing.get_node_graph(lisfile, listing.BACKEND_MMAP)
+    assert list(graph.nodes) == list(mapped.nodes) and len(graph.nodes) > 0
+    assert np.array_equal(graph.indices, mapped.indices)
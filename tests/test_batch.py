@@ -0,0 +1,106 @@
+import os
+
+import listing_batch
+from conftest import copy_case, needs_fork
+
+
+def _crash_on(name):
+    """extract_file killing its worker process on the file named name."""
+    extract_file = listing_batch.extract_file
+
+    def extract(lisfile, *args, **kwargs):
+        if os.path.basename(lisfile) == name:
+            os._exit(1)
+        return extract_file(lisfile, *args, **kwargs)
+    return extract
+
+
+def test_failed_file_does_not_stop_batch(tmp_path, write_listing):
+    write_listing("f0.lis")
+    write_listing("f2.lis", seed = 2)
+    # a directory named as a listing cannot be read
+    os.mkdir(str(tmp_path / "f1.lis"))
+
+    results = listing_batch.run_batch([str(tmp_path)], workers = 1)
+
+    ok = [result.ok for result in results]
+    assert ok == [True, False, True]
+
+
+@needs_fork
+def test_worker_crash_fails_only_its_file(tmp_path, write_listing, monkeypatch):
+    paths = [write_listing("f%d.lis" % i, seed = i) for i in range(6)]
+    monkeypatch.setattr(listing_batch, "extract_file", _crash_on("f2.lis"))
+
+    results = listing_batch.run_batch(paths, workers = 2, chunksize = 2)
+
+    assert [result.lisfile for result in results] == sorted(paths)
+    failed = [os.path.basename(result.lisfile) for result in results if not result.ok]
+    assert failed == ["f2.lis"]
+    assert "Worker process died" in results[2].error
+    assert all(len(result.shots) > 0 for result in results if result.ok)
+
+
+def test_dedupe_aliases_complete_duplicates_only(tmp_path, write_listing):
+    lisfile = write_listing("a.lis", shots = 30)
+    duplicate = copy_case(lisfile, str(tmp_path / "b.lis"))
+    partial = copy_case(lisfile, str(tmp_path / "c.lis"), os.path.getsize(lisfile) // 2)
+
+    results = listing_batch.run_batch([str(tmp_path)], workers = 1, dedupe = True)
+
+    assert [result.lisfile for result in results] == [lisfile, duplicate, partial]
+    assert [result.alias_of for result in results] == [None, lisfile, None]
+    assert results[1].shots == results[0].shots
+    assert results[2].fingerprint is None
+    assert 0 < len(results[2].shots) < len(results[0].shots)
+
+
+@needs_fork
+def test_single_worker_crash_fails_only_its_file(tmp_path, write_listing, monkeypatch):
+    paths = [write_listing("f%d.lis" % i, seed = i) for i in range(3)]
+    monkeypatch.setattr(listing_batch, "extract_file", _crash_on("f1.lis"))
+
+    results = listing_batch.run_batch(paths, workers = 1)
+
+    assert [result.ok for result in results] == [True, False, True]
+
+
+@needs_fork
+def test_dedupe_reads_each_file_once(tmp_path, write_listing, monkeypatch):
+    lisfile = write_listing("a.lis")
+    copies = [copy_case(lisfile, str(tmp_path / name)) for name in ("b.lis", "c.lis")]
+    log = str(tmp_path / "digests.log")
+    case_digest = listing_batch._case_digest
+
+    def logged(path):
+        with open(log, "a") as file:
+            file.write(os.path.basename(path) + "\n")
+        return case_digest(path)
+    monkeypatch.setattr(listing_batch, "_case_digest", logged)
+
+    results = listing_batch.run_batch([str(tmp_path / "*.lis")], workers = 2, dedupe = True)
+
+    with open(log) as file:
+        assert sorted(file.read().split()) == ["a.lis", "b.lis", "c.lis"]
+    assert [result.alias_of for result in results] == [None, lisfile, lisfile]
+    assert len(set(result.fingerprint for result in results)) == 1
+
+
+def test_dedupe_extracts_changed_duplicates(tmp_path, write_listing, monkeypatch):
+    lisfile = write_listing("a.lis")
+    duplicate = copy_case(lisfile, str(tmp_path / "b.lis"))
+    case_identities = listing_batch.case_identities
+
+    def rewritten(files, workers = 1):
+        # b.lis changes after being fingerprinted
+        identities = case_identities(files, workers)
+        version, digest = identities[duplicate]
+        identities[duplicate] = ((0, 0), digest)
+        return identities
+    monkeypatch.setattr(listing_batch, "case_identities", rewritten)
+
+    results = listing_batch.run_batch([str(tmp_path)], workers = 1, dedupe = True)
+
+    assert [result.alias_of for result in results] == [None, None]
+    assert results[0].fingerprint is not None and results[1].fingerprint is None
+    assert results[1].ok and results[1].shots == results[0].shots
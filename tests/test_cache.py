@@ -0,0 +1,95 @@
+import os
+import zlib
+
+import listing
+import listing_cache
+from conftest import copy_case
+
+
+def _counting(function):
+    """Wraps function, counting its calls in its "calls" attribute."""
+    def counted(*args):
+        counted.calls += 1
+        return function(*args)
+    counted.calls = 0
+    return counted
+
+
+def _entries(cache):
+    return [entry.path for entry in cache._entries()]
+
+
+def test_hit_and_invalidation_on_change(tmp_path, write_listing):
+    lisfile = write_listing("case.lis")
+    cache = listing_cache.ParseCache(str(tmp_path / "cache"))
+    compute = _counting(lambda lisfile: os.path.getsize(lisfile))
+
+    size = cache.get(lisfile, "size", compute)
+    assert cache.get(lisfile, "size", compute) == size
+    assert compute.calls == 1
+
+    # a new version of the file is computed again and replaces the old entry
+    write_listing("case.lis", shots = 12)
+    assert cache.get(lisfile, "size", compute) == os.path.getsize(lisfile) != size
+    assert compute.calls == 2
+    assert len(_entries(cache)) == 1
+
+    cache.invalidate(lisfile)
+    assert _entries(cache) == []
+    cache.get(lisfile, "size", compute)
+    assert compute.calls == 3
+
+
+def test_unloadable_entry_is_a_miss(tmp_path, write_listing):
+    lisfile = write_listing("case.lis")
+    cache = listing_cache.ParseCache(str(tmp_path / "cache"))
+    cache.get(lisfile, "value", lambda lisfile: 1)
+    entry, = _entries(cache)
+
+    # a pickle of a class no longer defined
+    with open(entry, "wb") as file:
+        file.write(zlib.compress(b"clisting\nNoSuchClass\n)R."))
+    assert cache.get(lisfile, "value", lambda lisfile: 2) == 2
+
+    with open(entry, "wb") as file:
+        file.write(b"not a cache entry")
+    assert cache.get(lisfile, "value", lambda lisfile: 3) == 3
+    assert cache.get(lisfile, "value", lambda lisfile: 4) == 3
+    assert cache.misses == 3 and cache.hits == 1
+
+
+def test_format_version_is_part_of_keys(tmp_path, write_listing, monkeypatch):
+    lisfile = write_listing("case.lis")
+    cache = listing_cache.ParseCache(str(tmp_path / "cache"))
+    cache.get(lisfile, "value", lambda lisfile: 1)
+    monkeypatch.setattr(listing_cache, "CACHE_FORMAT", listing_cache.CACHE_FORMAT + 1)
+    assert cache.get(lisfile, "value", lambda lisfile: 2) == 2
+
+
+def test_by_case_shares_complete_cases_only(tmp_path, write_listing, monkeypatch):
+    lisfile = write_listing("a.lis", shots = 30)
+    size = os.path.getsize(lisfile)
+    duplicate = copy_case(lisfile, str(tmp_path / "b.lis"))
+    partial = copy_case(lisfile, str(tmp_path / "c.lis"), size // 2)
+    cache = listing_cache.ParseCache(str(tmp_path / "cache"), by_case = True)
+    fingerprints = _counting(listing.get_case_fingerprint)
+    monkeypatch.setattr(listing, "get_case_fingerprint", fingerprints)
+
+    # a listing being written does not share the entry of its case
+    shots = cache.get_shots_information(partial)
+    assert len(shots) < 30 * 21
+    assert len(cache.get_shots_information(lisfile)) == 30 * 21
+    assert cache.get_shots_information(duplicate) == cache.get_shots_information(lisfile)
+    assert cache.get_shots_information(partial) == shots
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    # identities are computed once per file version
+    for extractor in ("get_statistical_variable_names", "switching_times",
+                      "read_stat_tables"):
+        getattr(cache, extractor)(duplicate)
+    assert fingerprints.calls == 2
+
+    # once complete, the listing shares the entries of its case
+    copy_case(lisfile, partial)
+    assert len(cache.get_shots_information(partial)) == 30 * 21
+    assert cache.misses == 5
@@ -0,0 +1,52 @@
+import gzip
+import io
+import lzma
+
+import listing
+
+
+def _extract(lisfile):
+    times = listing.ThreePhaseSwitchingTimes(lisfile)
+    tables = listing.read_stat_tables(lisfile)
+    return {
+        "names": listing.get_statistical_variable_names(lisfile),
+        "shots": listing.get_shots_information(lisfile),
+        "times": (times.sw_a, times.sw_b, times.sw_c),
+        "parts": listing.find_lis_parts(lisfile),
+        "tables": dict((key, table.table_rows()) for key, table in tables.items()),
+    }
+
+
+def test_compressed_listings_equal_plain_ones(tmp_path, write_listing):
+    lisfile = write_listing("case.lis", shots = 6)
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    packed = []
+    for name, compress in (("case.lis.gz", gzip.compress), ("case.lis.xz", lzma.compress),
+                           # compressed files are detected by content, not name
+                           ("gzip.lis", gzip.compress)):
+        path = str(tmp_path / name)
+        with open(path, "wb") as file:
+            file.write(compress(data))
+        packed.append(path)
+
+    plain = _extract(lisfile)
+    assert len(plain["shots"]) == 6 * 21
+    for path in packed:
+        assert _extract(path) == plain
+
+
+def test_file_objects(write_listing):
+    lisfile = write_listing("case.lis", shots = 6)
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    plain = _extract(lisfile)
+
+    for source in (io.BytesIO(data), io.BytesIO(gzip.compress(data)),
+                   io.TextIOWrapper(io.BytesIO(data), "latin-1")):
+        # file objects are read from their beginning, and left open
+        assert _extract(source) == plain
+        assert not source.closed
+
+    lis = listing.LisFile(io.BytesIO(gzip.compress(data)))
+    assert lis.input_cards == listing.LisFile(lisfile).input_cards
@@ -0,0 +1,98 @@
+import gzip
+
+import listing
+
+
+def _moments(table):
+    return (table.base, table.gmean, table.gvar, table.gstd, table.umean, table.uvar, table.ustd)
+
+
+def _check_extract_all(lisfile, reference):
+    result = listing.extract_all(lisfile)
+    assert result["sections"] == listing.find_lis_parts(reference)
+    assert result["input_cards"] == listing.LisFile(reference).input_cards
+    assert result["variable_names"] == listing.get_statistical_variable_names(reference)
+    assert result["shots"] == listing.get_shots_information(reference)
+    times = listing.ThreePhaseSwitchingTimes(reference)
+    sw = result["switching_times"]
+    assert (sw.sw_a, sw.sw_b, sw.sw_c) == (times.sw_a, times.sw_b, times.sw_c)
+
+    tables = listing.read_stat_tables(reference)
+    assert list(result["stat_tables"]) == list(tables)
+    for key, table in tables.items():
+        assert result["stat_tables"][key].table_rows() == table.table_rows()
+        assert _moments(result["stat_tables"][key]) == _moments(table)
+    return result
+
+
+def test_extract_all_equals_extractors(tmp_path, write_listing):
+    lisfile = write_listing("case.lis", shots = 12, energy_branches = 2)
+    result = _check_extract_all(lisfile, lisfile)
+    assert len(result["shots"]) == 12 * 24 and len(result["switching_times"].sw_a) == 12
+    assert len(result["input_cards"]) > 20
+
+    # as the baseline table readers read the first phase tables
+    for key, table in result["stat_tables"].items():
+        if key[0] == listing.TABLE_VOLTAGE and key[3] == "A":
+            baseline = listing.VoltageStatTable(lisfile, key[1])
+            assert table.table == baseline.table and _moments(table) == _moments(baseline)
+
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    crlf = str(tmp_path / "crlf.lis")
+    with open(crlf, "wb") as file:
+        file.write(data.replace(b"\n", b"\r\n"))
+    _check_extract_all(crlf, crlf)
+    packed = str(tmp_path / "case.lis.gz")
+    with open(packed, "wb") as file:
+        file.write(gzip.compress(data))
+    _check_extract_all(packed, lisfile)
+
+
+def test_events_of_some_kinds(write_listing):
+    lisfile = write_listing("case.lis", shots = 5, t183_switches = 1)
+    events = list(listing.iter_events(lisfile))
+    assert [event.pos for event in events] == sorted(event.pos for event in events)
+
+    for kind in set(event.kind for event in events):
+        assert list(listing.iter_events(lisfile, {kind})) == \
+            [event for event in events if event.kind == kind]
+    kinds = {listing.EVENT_SHOT_PEAK, listing.EVENT_SWITCHING_TIMES}
+    some = list(listing.iter_events(lisfile, kinds))
+    assert some == [event for event in events if event.kind in kinds]
+    times = listing.ThreePhaseSwitchingTimes(lisfile)
+    assert [event.data for event in some if event.kind == listing.EVENT_SWITCHING_TIMES] == \
+        [(k + 1, a, b, c) for k, (a, b, c) in enumerate(zip(times.sw_a, times.sw_b, times.sw_c))]
+
+    # every event is at the line it was read from
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    for event in events:
+        assert event.pos == 0 or data[event.pos - 1:event.pos] == b"\n"
+        if event.kind == listing.EVENT_SHOT_PEAK:
+            assert b"simulation" in data[event.pos:event.pos + 40].lower()
+
+
+def test_consumers_share_one_reading(write_listing, monkeypatch):
+    lisfile = write_listing("case.lis")
+    opened = []
+    open_lis = listing.open_lis
+    monkeypatch.setattr(listing, "open_lis", lambda *args: opened.append(args) or open_lis(*args))
+
+    class Counter(listing.EventConsumer):
+        kinds = (listing.EVENT_SHOT_PEAK,)
+
+        def __init__(self):
+            self.count = 0
+
+        def feed(self, event):
+            self.count += 1
+
+        def result(self):
+            return self.count
+
+    count, shots = listing.run_consumers(lisfile, [Counter(), listing.ShotsConsumer()])
+    assert len(opened) == 1
+    assert count == len(shots) == 10 * 21
+    monkeypatch.undo()
+    assert shots == listing.get_shots_information(lisfile)
@@ -0,0 +1,72 @@
+import gzip
+
+import listing
+
+
+def _crlf(path, lisfile):
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(data.replace(b"\n", b"\r\n"))
+    return path
+
+
+def _read(table_class, lisfile, nodes, summary, index = None):
+    table = table_class(lisfile, *nodes, summary = summary, index = index)
+    return table.base, table.table_rows(), table.moments().tolist()
+
+
+def test_indexed_tables_equal_scanned_ones(tmp_path, write_listing):
+    lisfile = write_listing("case.lis")
+    crlf = _crlf(str(tmp_path / "crlf.lis"), lisfile)
+
+    for path in (lisfile, crlf):
+        index = listing.LisIndex(path)
+        for table_class, nodes in ((listing.VoltageStatTable, ("B0002A",)),
+                                   (listing.CurrentStatTable, ("S0001B", "B0001B"))):
+            for summary in (False, True):
+                scanned = _read(table_class, path, nodes, summary)
+                assert len(scanned[1]) > 0
+                assert _read(table_class, path, nodes, summary, index) == scanned
+                # as the original StatTable readers
+                table = listing.StatTable()
+                if table_class is listing.VoltageStatTable:
+                    table.read_v_table(path, *nodes, summary = summary, index = index)
+                else:
+                    table.read_c_table(path, *nodes, summary = summary, index = index)
+                assert table.table_rows() == scanned[1]
+
+
+def test_index_offsets(write_listing):
+    lisfile = write_listing("case.lis", shots = 5)
+    index = listing.LisIndex(lisfile)
+
+    assert index.variable_names() == listing.get_statistical_variable_names(lisfile)
+    assert len(index.shots) == len(listing.get_shots_information(lisfile))
+    assert len(index.sw_times) == 5
+    assert index.sections == listing.find_lis_parts(lisfile)
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    assert index.size == len(data)
+    for entry in index.captions:
+        assert data[entry.caption:].startswith(b"Statistical distribution of peak")
+    for pos in index.endings:
+        assert data[pos:].startswith(b"Summary of preceding table follows:")
+    assert index.get(listing.TABLE_VOLTAGE, "B0001C").phase == "C"
+    assert index.find(listing.TABLE_CURRENT, "S0001A", "B0001A", True).phase == \
+        listing.TABLE_SUMMARY
+    assert index.get(listing.TABLE_VOLTAGE, "NONODE") is None
+
+
+def test_read_stat_tables_of_compressed_files(tmp_path, write_listing):
+    lisfile = write_listing("case.lis")
+    packed = str(tmp_path / "case.lis.gz")
+    with open(lisfile, "rb") as file, gzip.open(packed, "wb") as out:
+        out.write(file.read())
+
+    tables = listing.read_stat_tables(lisfile)
+    streamed = listing.read_stat_tables(packed)
+    assert list(streamed) == list(tables)
+    for key, table in tables.items():
+        assert streamed[key].table_rows() == table.table_rows()
+        assert streamed[key].moments().tolist() == table.moments().tolist()
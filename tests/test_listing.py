@@ -0,0 +1,169 @@
+import os
+import re
+import threading
+
+import pytest
+
+import listing
+
+
+def test_view_mapping_is_closed(write_listing):
+    path = write_listing("case.lis")
+    with listing.LisFile(path, listing.BACKEND_MMAP) as lisfile:
+        view = lisfile.view("INPUT_CARDS")
+        again = lisfile.view("STATISTICAL_RESULTS")
+        data = bytes(view)
+        mapping = lisfile._mmap
+        view.release()
+        again.release()
+    assert mapping.closed
+    assert lisfile._mmap is None
+    assert data == lisfile.read_section("INPUT_CARDS")
+    assert data.startswith(b"Descriptive interpretation of input data cards")
+
+
+def test_view_released_by_viewing(write_listing):
+    lisfile = listing.LisFile(write_listing("case.lis"))
+    with lisfile.viewing("NODE_CONNECTIONS") as view:
+        assert bytes(view[:12]) == b"List of inpu"
+    lisfile.close()
+
+    view = lisfile.view("INPUT_CARDS")
+    with pytest.raises(BufferError):
+        lisfile.close()
+    view.release()
+    lisfile.close()
+
+
+def _scanned_part(path, begin, end):
+    """Lines from a line matching begin up to one matching end, excluded."""
+    lines = []
+    with open(path) as file:
+        for line in file:
+            if lines and end.match(line):
+                break
+            if lines or begin.match(line):
+                lines.append(line)
+    return lines
+
+
+def test_parts_of_each_instance(write_listing, monkeypatch):
+    first = listing.LisFile(write_listing("a.lis", input_cards = 3))
+    second = listing.LisFile(write_listing("b.lis", input_cards = 5))
+
+    lines = _scanned_part(first.lisfile, listing.RE_PART_INPUT_CARDS_BEGIN,
+                          listing.RE_PART_INPUT_CARDS_END)
+    assert first.input_cards_lines == lines
+    assert first.input_cards == [line[line.index("|") + 1:] for line in lines]
+    assert len(second.input_cards) == len(first.input_cards) + 2
+    assert first.stat_result_lines == _scanned_part(
+        first.lisfile, listing.RE_PART_STATISTICAL_RESULTS_BEGIN,
+        listing.RE_PART_STATISTICAL_RESULTS_END)
+
+    # the cards are read once
+    monkeypatch.setattr(listing.LisFile, "_process_input_cards", None)
+    assert first.input_cards is first.input_cards
+
+
+def _pattern_globals():
+    return dict((name, value) for name, value in vars(listing).items()
+                if isinstance(value, re.Pattern))
+
+
+def test_instrument_leaves_module_patterns(write_listing):
+    path = write_listing("case.lis")
+    patterns = _pattern_globals()
+    with pytest.raises(RuntimeError):
+        with listing.instrument() as stats:
+            shots = listing.get_shots_information(path)
+            assert _pattern_globals() == patterns
+            raise RuntimeError
+    assert _pattern_globals() == patterns
+    counters = stats.extractors["get_shots_information"]
+    assert counters["calls"] == 1 and counters["rows"] == len(shots) > 0
+    assert counters["bytes"] == os.path.getsize(path)
+
+
+def test_instrument_counts_its_own_thread(write_listing):
+    path = write_listing("case.lis")
+    entered = threading.Event()
+    release = threading.Event()
+    other = {}
+
+    def instrumented():
+        with listing.instrument() as stats:
+            entered.set()
+            release.wait(10)
+            other["stats"] = stats
+
+    thread = threading.Thread(target = instrumented)
+    thread.start()
+    entered.wait(10)
+    # not instrumented: nothing recorded while the other thread is
+    listing.get_shots_information(path)
+    with listing.instrument() as stats:
+        with listing.instrument() as nested:
+            listing.get_statistical_variable_names(path)
+        listing.get_shots_information(path)
+    release.set()
+    thread.join()
+
+    assert other["stats"].extractors == {} and other["stats"].patterns == {}
+    assert set(nested.extractors) == {"get_statistical_variable_names"}
+    assert set(stats.extractors) == {"get_shots_information"}
+    assert sum(c["evaluations"] for c in stats.patterns.values()) > 0
+
+
+def test_instrument_counts_concurrent_threads(write_listing):
+    paths = [write_listing("a.lis", shots = 3), write_listing("b.lis", shots = 7)]
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def instrumented(path):
+        with listing.instrument() as stats:
+            barrier.wait(10)
+            for i in range(5):
+                listing.get_shots_information(path)
+        results[path] = stats
+
+    threads = [threading.Thread(target = instrumented, args = (path,)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for path in paths:
+        shots = len(listing.get_shots_information(path))
+        assert results[path].patterns["__re_stat_out_shot"]["matches"] == 5 * shots
+        assert results[path].extractors["get_shots_information"]["rows"] == 5 * shots
+
+
+def test_instrument_counts_lines_while_parsing(write_listing, monkeypatch):
+    path = write_listing("case.lis")
+    with open(path, "rb") as file:
+        lines = file.read().count(b"\n")
+    shots = len(listing.get_shots_information(path))
+
+    # the file is read once, by the extractor
+    opened = []
+    open_lis = listing.open_lis
+    monkeypatch.setattr(listing, "open_lis", lambda *args: opened.append(args) or open_lis(*args))
+    with listing.instrument() as stats:
+        listing.get_shots_information(path)
+        listing.get_shots_information(path, listing.BACKEND_MMAP)
+        listing.extract_all(path)
+    assert len(opened) == 2
+    assert stats.files[path]["lines"] == 3 * lines
+    assert stats.extractors["extract_all"]["lines"] == lines
+    assert stats.patterns["__re_stat_out_shot"]["matches"] == 2 * shots
+    assert stats.patterns["_rebn_stat_out_block"] == {"evaluations": 1, "matches": shots}
+    assert "RE_PART_INPUT_CARDS_BEGIN" in stats.patterns
+
+
+def test_pattern_names(monkeypatch):
+    # the names are looked up from the first call on
+    monkeypatch.setattr(listing, "_pattern_names", {})
+    assert listing._pattern_name(listing._re_sw_times_line) == "_re_sw_times_line"
+    assert listing._pattern_name(listing._statistical_lines_b) == "_statistical_lines_b"
+    assert listing._pattern_name(listing._rebn_stat_out_block) == "_rebn_stat_out_block"
+    assert listing._pattern_name(re.compile("^unnamed$")) == "'^unnamed$'"
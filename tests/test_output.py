@@ -0,0 +1,72 @@
+import re
+
+import numpy as np
+
+import listing
+
+
+_ROW = re.compile(r"^ +\d+  \d\.\d{5}E[-+]\d\d ")
+
+
+def _rewrite(lisfile, rewrite_row):
+    """Rewrites the time step lines of a listing, returning their values."""
+    with open(lisfile) as file:
+        lines = file.readlines()
+    rows = []
+    with open(lisfile, "w") as file:
+        for line in lines:
+            if _ROW.match(line):
+                rows.append([float(field) for field in line.split()])
+                line = rewrite_row(len(rows) - 1, line)
+            file.write(line)
+    return np.array(rows)
+
+
+def _wrapped(line, values = 3):
+    """A row printed over several lines, "values" values per line."""
+    fields = line.split()
+    lines = [line[:19 + 15 * values]]
+    for start in range(2 + values, len(fields), values):
+        lines.append(" " * 19 + "".join(" %14s" % field for field in fields[start:start + values]))
+    return "\n".join(lines) + "\n"
+
+
+def test_rows_as_printed(write_listing):
+    lisfile = write_listing("case.lis", time_steps = 40)
+    rows = _rewrite(lisfile, lambda row, line: line)
+    output = listing.OutputVariables(lisfile)
+    assert len(output.variables) == 6 and len(rows) == 40
+
+    chunks = list(output.iter_chunks(chunk_rows = 7))
+    assert [len(chunk[0]) for chunk in chunks] == [7] * 5 + [5]
+    steps, times, values = output.series()
+    assert np.array_equal(steps, rows[:, 0]) and np.array_equal(times, rows[:, 1])
+    assert np.array_equal(values, rows[:, 2:])
+
+
+def test_wrapped_rows_are_joined(write_listing):
+    lisfile = write_listing("case.lis", time_steps = 40)
+    rows = _rewrite(lisfile, lambda row, line: _wrapped(line))
+    steps, times, values = listing.OutputVariables(lisfile).series(chunk_rows = 5)
+    assert np.array_equal(steps, rows[:, 0]) and np.array_equal(values, rows[:, 2:])
+
+
+def test_rows_that_do_not_fit_are_skipped(write_listing):
+    lisfile = write_listing("case.lis", time_steps = 40)
+
+    def rewrite(row, line):
+        if row == 10:
+            # cut short
+            return _wrapped(line).rsplit("\n", 2)[0] + "\n"
+        if row == 20:
+            # one value too many
+            return line.rstrip("\n") + "  1.0000000E+00\n"
+        if row == 30:
+            return _wrapped(line)
+        return line
+
+    rows = _rewrite(lisfile, rewrite)
+    steps, times, values = listing.OutputVariables(lisfile).series()
+    kept = [row for row in range(len(rows)) if row not in (10, 20)]
+    assert np.array_equal(steps, rows[kept, 0])
+    assert np.array_equal(values, rows[kept, 2:])
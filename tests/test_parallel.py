@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import listing
+
+
+def test_parallel_equals_serial_extractors(write_listing):
+    lisfile = write_listing("case.lis", shots = 30, t183_switches = 2)
+    shots = listing.get_shots_information(lisfile)
+
+    result, sw = listing.read_simulations_parallel(lisfile, workers = 3, min_bytes = 0)
+    three_phase = listing.ThreePhaseSwitchingTimes(lisfile)
+    assert type(sw) is listing.ThreePhaseSwitchingTimes and result == shots
+    assert (sw.sw_a, sw.sw_b, sw.sw_c) == (three_phase.sw_a, three_phase.sw_b, three_phase.sw_c)
+
+    result, sw = listing.read_simulations_parallel(
+        lisfile, workers = 3, min_bytes = 0, switching_times = listing.SwitchingTimes)
+    general = listing.SwitchingTimes(lisfile)
+    assert type(sw) is listing.SwitchingTimes and result == shots
+    assert sw.switches == general.switches and len(sw.switches) == 9
+    assert np.array_equal(sw.simulations, general.simulations)
+    assert np.array_equal(sw.times, general.times, equal_nan = True)
+    assert (sw.sw_a, sw.sw_b, sw.sw_c) == (general.sw_a, general.sw_b, general.sw_c)
+
+
+def test_ranges_split_the_statistical_simulations(write_listing):
+    lisfile = write_listing("case.lis", shots = 30)
+    sections = listing.find_lis_parts(lisfile)["STATISTICAL_SIMULATIONS"]
+    with listing._mapped(lisfile) as buf:
+        assert listing._statistical_simulations_parts(buf) == sections
+        begin, end = sections[0]
+        ranges = listing._simulation_ranges(buf, 6, begin, end)
+        assert len(ranges) == 6 and ranges[0][0] == begin and ranges[-1][1] == end
+        for (first, last), (following, after) in zip(ranges, ranges[1:]):
+            assert last == following
+            line = buf[following:listing._line_end(buf, following)].decode("latin-1")
+            assert line.lstrip().startswith("Random switching times for simulation number")
+
+
+def test_serial_without_statistical_simulations(tmp_path):
+    lisfile = str(tmp_path / "case.lis")
+    with open(lisfile, "w") as file:
+        file.write("Not a statistical study\n" * 100)
+    shots, sw = listing.read_simulations_parallel(lisfile, workers = 3, min_bytes = 0)
+    assert shots == [] and type(sw) is listing.ThreePhaseSwitchingTimes and sw.sw_a == []
+
+    with pytest.raises(ValueError):
+        listing.read_simulations_parallel(lisfile, switching_times = listing.LisSwitchingTimes)
@@ -0,0 +1,51 @@
+import math
+
+import listing
+
+
+def _values(line, starts, width = 16):
+    return [float(line[start:start + width]) for start in starts]
+
+
+def test_phasor_columns(write_listing):
+    lisfile = write_listing("case.lis", phasor_branches = 3)
+    with open(lisfile) as file:
+        lines = file.read().replace(" S0002A ", " 1E2    ").splitlines(True)
+    with open(lisfile, "w") as file:
+        file.writelines(lines)
+
+    solution = listing.PhasorSolution(lisfile)
+    branches = solution.branches
+    assert branches.names() == ["S0001A", "B0001A", "1E2", "B0002A", "S0003A", "B0003A"]
+    assert solution.frequency == 60.0 and solution.total_loss == 1234.56789
+
+    first = [i for i, line in enumerate(lines) if line.startswith(" 1E2 ")][0]
+    row = branches.lookup("1E2")[0]
+    assert [row[name] for name in listing._PHASOR_BRANCH_COLUMNS[0]] == \
+        _values(lines[first], range(7, 103, 16))
+    assert [row[name] for name in listing._PHASOR_BRANCH_COLUMNS[1]] == \
+        _values(lines[first + 1], range(7, 103, 16))
+    # the power loss is printed for the bus K side only
+    assert math.isnan(branches.lookup("B0002A")[0]["p_loss"])
+
+    closed, opened = solution.switches.rows
+    assert closed["closed"] and closed["i_mag"] == 2.23606798 and closed["q"] == 2000.0
+    assert not opened["closed"] and math.isnan(opened["i_real"])
+    assert solution.switches.names("node2") == ["L0001A", "L0002A"]
+    assert solution.sources.names() == ["SRCA", "SRCB", "SRCC"]
+    assert solution.sources.lookup("SRCB")[0]["v_angle"] == -120.0
+
+
+def test_parts_read_at_once(write_listing, monkeypatch):
+    lisfile = listing.LisFile(write_listing("case.lis"))
+    text = listing.PhasorSolution(lisfile.lisfile)
+
+    opened = []
+    open_lis = listing.open_lis
+    monkeypatch.setattr(listing, "open_lis", lambda *args: opened.append(args) or open_lis(*args))
+    solution = listing.PhasorSolution(lisfile)
+    assert len(opened) == 1
+    for name in ("branches", "switches", "sources"):
+        # NaN compare equal through their repr
+        assert repr(getattr(solution, name).rows.tolist()) == \
+            repr(getattr(text, name).rows.tolist())
@@ -0,0 +1,125 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import listing
+
+
+# The slices of the baseline readers, before the records declared them
+def _baseline_table_row(line):
+    return [int(line[0:10]), float(line[10:30]), float(line[30:50]),
+            int(line[50:64]), int(line[64:78]), float(line[78:98])]
+
+
+def _baseline_summary(line):
+    return (float(line[40:54]), float(line[59:73]))
+
+
+def _baseline_times(line):
+    return (float(line[38:51]), float(line[58:71]), float(line[78:91]))
+
+
+_BASELINE = [
+    (listing.STAT_TABLE_ROW, _baseline_table_row),
+    (listing.STAT_TABLE_SUMMARY, _baseline_summary),
+    (listing.VOLTAGE_TABLE_CAPTION, lambda line: float(line[114:].strip())),
+    (listing.STAT_OUT_PEAK, lambda line: float(line[40:55].strip())),
+    (listing.THREE_PHASE_SWITCHING_TIMES, _baseline_times),
+]
+
+
+def _record_lines(lisfile):
+    """(line start offset, line) of a listing, by record, as bytes."""
+    lines = dict((record.name, []) for record, baseline in _BASELINE)
+    in_rows = False
+    times = False
+    pos = 0
+    with open(lisfile, "rb") as file:
+        data = file.read()
+    for line in data.splitlines(True):
+        if times:
+            lines["three_phase_switching_times"].append((pos, line))
+        times = b"Random switching times for simulation number" in line
+        if listing.is_table_ending(line.decode("latin-1")):
+            in_rows = False
+        elif in_rows:
+            lines["stat_table_row"].append((pos, line))
+        elif line.startswith(b"    number"):
+            in_rows = True
+        if line.strip().startswith((b"Mean =", b"Variance =", b"Standard deviation =")):
+            lines["stat_table_summary"].append((pos, line))
+        elif line.startswith(b"Statistical distribution of peak voltage"):
+            lines["voltage_table_caption"].append((pos, line))
+        elif line.startswith(b"      Peak extremum of subset"):
+            lines["stat_out_peak"].append((pos, line))
+        pos += len(line)
+    return data, lines
+
+
+def test_records_equal_baseline_slices(write_listing):
+    lisfile = write_listing("case.lis", shots = 8)
+    data, lines = _record_lines(lisfile)
+    for record, baseline in _BASELINE:
+        assert len(lines[record.name]) >= 8, record.name
+        for pos, line in lines[record.name]:
+            expected = baseline(line.decode("latin-1"))
+            expected = tuple(expected) if isinstance(expected, list) else expected
+            assert record.parse(line.decode("latin-1")) == expected
+            assert record.parse(line) == expected
+            end = pos + len(line.rstrip(b"\r\n"))
+            assert record.parse_at(data, pos, end) == expected
+
+        if record is listing.VOLTAGE_TABLE_CAPTION:
+            continue
+        array = record.parse_lines([line for pos, line in lines[record.name]])
+        assert array.dtype == record.dtype
+        rows = [baseline(line.decode("latin-1")) for pos, line in lines[record.name]]
+        if not isinstance(rows[0], (list, tuple)):
+            rows = [(row,) for row in rows]
+        assert array.tolist() == [tuple(row) for row in rows]
+
+
+def test_stat_table_read_line_equals_baseline(write_listing):
+    lisfile = write_listing("case.lis", shots = 20)
+    data, lines = _record_lines(lisfile)
+    rows = [line.decode("latin-1") for pos, line in lines["stat_table_row"]]
+    for line in rows:
+        assert listing.stat_table_read_line(line) == _baseline_table_row(line)
+    assert listing.stat_table_read_lines(rows).tolist() == \
+        [tuple(_baseline_table_row(line)) for line in rows]
+
+
+def test_variant_and_width():
+    line = " " * 41 + "1.50000000E+05" + " " * 10
+    shifted = listing.STAT_OUT_PEAK.variant(peak = (41, 56))
+    assert shifted.parse(line) == 1.5e5
+    assert shifted.name == "stat_out_peak" and shifted.width == 56
+    # the record itself is left as it was
+    assert listing.STAT_OUT_PEAK.field("peak") == ("peak", 40, 55, float)
+    assert listing.STAT_OUT_PEAK.variant("other", peak = (41, 56)).name == "other"
+
+    with pytest.raises(ValueError):
+        listing.VOLTAGE_TABLE_CAPTION.width
+    with pytest.raises(ValueError):
+        listing.VOLTAGE_TABLE_CAPTION.parse_lines(["x" * 120])
+    with pytest.raises(KeyError):
+        listing.STAT_OUT_PEAK.field("base")
+
+    names = listing.FixedWidthRecord("names", [("node", 0, 6, str), ("shot", 6, 10, int)])
+    assert names.parse("  B01A  12") == ("B01A", 12)
+    array = names.parse_lines([b"  B01A  12\r\n", b"B02   3"])
+    assert array["node"].tolist() == ["B01A", "B02"] and array["shot"].tolist() == [12, 3]
+    assert len(names.parse_lines([])) == 0
+
+
+def test_records_are_picklable():
+    for record, baseline in _BASELINE:
+        copy = pickle.loads(pickle.dumps(record))
+        assert repr(copy) == repr(record) and copy.dtype == record.dtype
+    line = " " * 38 + "1.000000E-02" + " " * 8 + "2.000000E-02" + " " * 8 + "3.000000E-02"
+    copy = pickle.loads(pickle.dumps(listing.THREE_PHASE_SWITCHING_TIMES))
+    assert copy.parse(line) == listing.THREE_PHASE_SWITCHING_TIMES.parse(line) == \
+        (0.01, 0.02, 0.03)
+    assert np.array_equal(copy.parse_lines([line]),
+                          listing.THREE_PHASE_SWITCHING_TIMES.parse_lines([line]))
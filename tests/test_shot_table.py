@@ -0,0 +1,66 @@
+import math
+
+import listing
+
+
+def _by_variable(rows):
+    variables = {}
+    for ttype, node1, node2, peak, shot in rows:
+        variables.setdefault((ttype, node1, node2), []).append((peak, shot))
+    return variables
+
+
+def test_shot_table_equals_shots_information(write_listing):
+    lisfile = write_listing("case.lis", shots = 8, energy_branches = 2)
+    rows = listing.get_shots_information(lisfile)
+
+    for backend in (listing.BACKEND_TEXT, listing.BACKEND_MMAP):
+        table = listing.get_shot_table(lisfile, backend)
+        assert len(table) == len(rows)
+        assert table.rows() == rows
+    assert listing.ShotTable.from_rows(rows).rows() == rows
+    assert listing.ShotTable.from_rows([]).rows() == []
+
+
+def test_shot_table_queries(write_listing):
+    lisfile = write_listing("case.lis", shots = 8)
+    rows = listing.get_shots_information(lisfile)
+    table = listing.ShotTable.from_rows(rows)
+    variables = _by_variable(rows)
+    names = [tuple(table.variable_name(v)) for v in range(len(table.variables))]
+    assert sorted(names) == sorted(variables)
+
+    top = table.top(2).rows()
+    expected = []
+    for name in names:
+        peaks = sorted(variables[name], key = lambda row: -row[0])[:2]
+        expected += [list(name) + [peak, shot] for peak, shot in peaks]
+    assert [row[:4] for row in top] == [row[:4] for row in expected]
+    assert [row[3] for row in table.worst_shots().rows()] == \
+        [max(variables[name])[0] for name in names]
+
+    shots, peaks = table.matrix()
+    assert shots.tolist() == sorted(set(row[4] for row in rows))
+    for v, name in enumerate(names):
+        for peak, shot in variables[name]:
+            assert peaks[shots.tolist().index(shot), v] == peak
+
+    voltages = table.filter_quantity(listing.QUANTITY_VOLTAGE).rows()
+    assert voltages == [row for row in rows if row[0] == "Tensão"]
+    shots, maximum = table.shot_maximum()
+    for shot, peak in zip(shots.tolist(), maximum.tolist()):
+        assert peak == max(row[3] for row in rows if row[4] == shot)
+
+
+def test_shot_table_prefix_filters(write_listing):
+    lisfile = write_listing("case.lis", shots = 3)
+    rows = listing.get_shots_information(lisfile)
+    table = listing.ShotTable.from_rows(rows)
+
+    assert table.filter_prefix("S0").rows() == \
+        [row for row in rows if row[1].startswith("S0")]
+    assert table.filter_prefix("B0001", node2 = True).rows() == \
+        [row for row in rows if row[1].startswith("B0001") or row[2].startswith("B0001")]
+    shots, maximum = table.shot_maximum(table.variables_with_prefix("NONE"))
+    assert len(shots) == 0 and len(maximum) == 0
+    assert not any(math.isnan(peak) for peak in table.peak.tolist())
@@ -0,0 +1,73 @@
+import re
+
+import numpy as np
+
+import listing
+
+
+def _without_first_peak(path):
+    """Removes the peak value line of the first statistical output."""
+    with open(path, "rb") as file:
+        data = file.read()
+    peak = re.search(b"(?m)^      Peak extremum of subset.*\n", data)
+    with open(path, "wb") as file:
+        file.write(data[:peak.start()] + data[peak.end():])
+
+
+def test_readers_parse_alike(write_listing):
+    lisfile = write_listing("case.lis", shots = 6, switches = 2, t183_switches = 1)
+    shots = listing.get_shots_information(lisfile)
+    _without_first_peak(lisfile)
+
+    # the output without its peak value is skipped by every reader
+    expected = listing.get_shots_information(lisfile)
+    assert expected == shots[1:]
+    assert listing.get_shots_information(lisfile, listing.BACKEND_MMAP) == expected
+    assert listing.extract_all(lisfile)["shots"] == expected
+    tail = listing.LisTail(lisfile)
+    tail_shots, tail_times = tail.poll()
+    assert tail_shots == expected and tail.finished
+    for backend in (listing.BACKEND_TEXT, listing.BACKEND_MMAP):
+        table, sw = listing.get_statistical_simulations(lisfile, backend)
+        assert table.rows() == expected
+        assert sw.switches == ["1", "2", "T183-1", "T183-2", "T183-3"]
+
+    # two switches: the C phase times are NaN
+    times = [row[1:] for row in tail_times]
+    assert len(times) == 6 and all(np.isnan(row[2]) for row in times)
+    events = [list(event.data[1:]) for event in
+              listing.iter_events(lisfile, {listing.EVENT_SWITCHING_TIMES})]
+    assert repr(events) == repr(times)
+    for backend in (listing.BACKEND_TEXT, listing.BACKEND_MMAP):
+        three_phase = listing.ThreePhaseSwitchingTimes(lisfile, backend)
+        assert repr([list(row) for row in zip(three_phase.sw_a, three_phase.sw_b,
+                                              three_phase.sw_c)]) == repr(times)
+
+
+def test_parser_events(write_listing):
+    lisfile = write_listing("case.lis", shots = 4)
+    parser = listing._SimulationsParser(listing._tail_lines_b)
+    events = []
+    with open(lisfile, "rb") as file:
+        for line in file:
+            event = parser.feed(line)
+            if event is not None:
+                events.append(event)
+
+    times = listing.ThreePhaseSwitchingTimes(lisfile)
+    assert [data for kind, data in events if kind == listing.EVENT_SHOT_PEAK] == \
+        listing.get_shots_information(lisfile)
+    assert [data for kind, data in events if kind == listing.EVENT_SWITCHING_TIMES] == \
+        [(k + 1, a, b, c) for k, (a, b, c) in enumerate(zip(times.sw_a, times.sw_b, times.sw_c))]
+    assert events[-1] == ("stat_sim_end", ())
+
+
+def test_parser_patterns_are_counted(write_listing):
+    lisfile = write_listing("case.lis", shots = 4)
+    with listing.instrument() as stats:
+        shots = listing.get_shots_information(lisfile)
+        listing.SwitchingTimes(lisfile)
+    assert stats.patterns["_stat_out_lines"]["matches"] == len(shots)
+    assert stats.patterns["__re_stat_out_shot"]["matches"] == len(shots)
+    assert stats.patterns["_sw_times_lines"]["matches"] == 4
+    assert stats.patterns["_re_sw_times_line"]["matches"] == 4
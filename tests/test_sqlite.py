@@ -0,0 +1,55 @@
+import sqlite3
+
+import listing
+import listing_batch
+import listing_sqlite
+
+
+def _count(database, table):
+    with sqlite3.connect(database) as connection:
+        return connection.execute("SELECT COUNT(*) FROM " + table).fetchone()[0]
+
+
+def test_export_and_skip_unchanged(tmp_path, write_listing):
+    write_listing("a.lis")
+    write_listing("b.lis", seed = 2)
+    database = str(tmp_path / "results.db")
+
+    results = listing_sqlite.export([str(tmp_path)], database, workers = 1)
+    assert [result.ok for result in results] == [True, True]
+    assert _count(database, "shots") == sum(len(result.shots) for result in results)
+
+    assert listing_sqlite.export([str(tmp_path)], database, workers = 1) == []
+
+
+def test_repeated_shot_fails_the_file(tmp_path, write_listing):
+    lisfile = write_listing("a.lis")
+    database = str(tmp_path / "results.db")
+    result = listing_batch.extract_file(lisfile)
+    ttype, node1, node2, peak, shot = result.shots[0]
+    result.shots.append([ttype, node1, node2, peak + 1.0, shot])
+
+    with listing_sqlite.SQLiteExporter(database) as exporter:
+        exporter.add_result(result)
+        assert not exporter.exported(lisfile)
+
+    assert not result.ok and "IntegrityError" in result.error
+    assert _count(database, "files") == 1
+    assert _count(database, "shots") == 0
+    assert _count(database, "variables") == 0
+
+
+def test_shot_count_of_the_shots(tmp_path, write_listing):
+    lisfile = write_listing("a.lis", shots = 7)
+    database = str(tmp_path / "results.db")
+    result = listing_batch.extract_file(lisfile)
+    # a file shots are those of its peaks, whatever its switching times
+    result.sw_a, result.sw_b, result.sw_c = result.sw_a[:2], result.sw_b[:2], result.sw_c[:2]
+
+    with listing_sqlite.SQLiteExporter(database) as exporter:
+        exporter.add_result(result)
+
+    with sqlite3.connect(database) as connection:
+        shots = connection.execute("SELECT shots FROM files").fetchone()[0]
+    assert shots == len(set(row[4] for row in listing.get_shots_information(lisfile))) == 7
+    assert _count(database, "switching_times") == 2
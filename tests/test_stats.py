@@ -0,0 +1,182 @@
+import statistics
+
+import numpy as np
+import pytest
+
+import listing
+import listing_stats
+
+
+_TYPES = {"Tensão": listing.TABLE_VOLTAGE, "Corrente": listing.TABLE_CURRENT,
+          "Energia": listing.TABLE_ENERGY}
+
+
+def _baseline_peaks(lisfile):
+    """Per unit peaks of each voltage, by table key, from the baseline readers."""
+    peaks = {}
+    for ttype, node1, node2, peak, shot in listing.get_shots_information(lisfile):
+        if ttype == "Tensão":
+            key = (_TYPES[ttype], node1.strip(), node2.strip(), node1.strip()[-1])
+            peaks.setdefault(key, []).append(peak)
+    for key, values in peaks.items():
+        base = listing.VoltageStatTable(lisfile, key[1]).base
+        peaks[key] = [peak / base for peak in values]
+    return peaks
+
+
+def _percentile(values, q):
+    """Linearly interpolated percentile of a list, as numpy's default one."""
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def test_summary_equals_baseline_peaks(write_listing):
+    lisfile = write_listing("case.lis", shots = 40)
+    baseline = _baseline_peaks(lisfile)
+    shot_peaks = listing_stats.ShotPeaks.from_lis(lisfile)
+    voltages = [column for column, key in enumerate(shot_peaks.keys)
+                if key[0] == listing.TABLE_VOLTAGE]
+    assert [shot_peaks.keys[column] for column in voltages] == list(baseline)
+
+    summary = listing_stats.summarize(shot_peaks)[voltages]
+    levels = [1.2, 1.5, 1.8]
+    exceeded = listing_stats.exceedance(shot_peaks.per_unit().peaks, levels)[:, voltages]
+    for row, values in enumerate(baseline.values()):
+        assert summary["count"][row] == len(values)
+        assert summary["mean"][row] == pytest.approx(statistics.fmean(values))
+        assert summary["var"][row] == pytest.approx(statistics.pvariance(values))
+        assert summary["max"][row] == max(values)
+        for name, probability in (("u2", 2), ("u10", 10), ("u50", 50)):
+            assert summary[name][row] == pytest.approx(_percentile(values, 100 - probability))
+        assert summary["mean_low"][row] < summary["mean"][row] < summary["mean_high"][row]
+        assert summary["u2_low"][row] <= summary["u2"][row] <= summary["u2_high"][row]
+        for level, fraction in zip(levels, exceeded[:, row]):
+            assert fraction == sum(value >= level for value in values) / len(values)
+
+
+def test_moments_equal_printed_ones(write_listing):
+    lisfile = write_listing("case.lis", shots = 40)
+    shot_peaks = listing_stats.ShotPeaks.from_lis(lisfile)
+    tables = listing.read_stat_tables(lisfile)
+    assert listing_stats.check_moments(shot_peaks, tables) == []
+
+    # as the baseline table readers print them, of the first phase tables
+    for key, values in _baseline_peaks(lisfile).items():
+        if key[3] != "A":
+            continue
+        table = listing.VoltageStatTable(lisfile, key[1])
+        assert statistics.fmean(values) == pytest.approx(table.umean, abs = 1.0e-6)
+        assert statistics.pstdev(values) == pytest.approx(table.ustd, abs = 1.0e-6)
+
+    # a wrong base is found out
+    tables = dict(tables)
+    key = next(iter(tables))
+    tables[key] = listing.VoltageStatTable(lisfile, key[1])
+    tables[key].base *= 2.0
+    assert [mismatch[0] for mismatch in listing_stats.check_moments(shot_peaks, tables)] == \
+        [key] * 3
+
+
+def test_phase_max(write_listing):
+    lisfile = write_listing("case.lis", shots = 10)
+    shot_peaks = listing_stats.ShotPeaks.from_lis(lisfile)
+    summary = shot_peaks.phase_max()
+    for column, key in enumerate(summary.keys):
+        phases = [shot_peaks.column(key[:1] + (key[1] + phase, key[2] + phase if key[2] else "",
+                                              phase)) for phase in "ABC"]
+        assert np.array_equal(summary.peaks[:, column], np.fmax.reduce(phases))
+
+
+def test_merged_summaries_equal_all_peaks(write_listing):
+    lisfiles = [write_listing("case%d.lis" % seed, shots = 15 + seed, seed = seed)
+                for seed in (1, 2, 3)]
+    summaries = [listing_stats.DistributionSummary(0.5, 0.05, 60).add_peaks(
+        listing_stats.ShotPeaks.from_lis(lisfile)) for lisfile in lisfiles]
+    merged = (summaries[0] + summaries[1]) + summaries[2]
+    assert np.array_equal((summaries[0] + (summaries[1] + summaries[2])).counts, merged.counts)
+
+    # against every per unit peak of the baseline readers at once
+    peaks = {}
+    for lisfile in lisfiles:
+        for key, values in _baseline_peaks(lisfile).items():
+            peaks.setdefault(key, []).extend(values)
+    rows = [merged.keys.index(key) for key in peaks]
+    result = merged.moments()[rows]
+    quantiles = merged.quantiles([0.5, 0.98])[:, rows]
+    for row, (key, values) in enumerate(peaks.items()):
+        assert result["count"][row] == len(values)
+        assert result["mean"][row] == pytest.approx(statistics.fmean(values))
+        assert result["var"][row] == pytest.approx(statistics.pvariance(values))
+        assert (result["min"][row], result["max"][row]) == (min(values), max(values))
+        counts, edges = np.histogram(values, merged.edges())
+        assert np.array_equal(merged.counts[rows[row], 1:-1], counts)
+        for q, quantile in zip((50, 98), quantiles[:, row]):
+            assert abs(quantile - _percentile(values, q)) <= merged.width
+
+    with pytest.raises(ValueError):
+        merged.merge(listing_stats.DistributionSummary(0.5, 0.1, 30))
+
+
+def test_summary_of_tables(write_listing):
+    lisfile = write_listing("case.lis", shots = 30)
+    summary = listing_stats.DistributionSummary(0.5, 0.05, 60)
+    tables = {}
+    for key, values in _baseline_peaks(lisfile).items():
+        if key[3] == "A":
+            tables[key] = listing.VoltageStatTable(lisfile, key[1])
+            summary.add_table(key, tables[key])
+
+    result = summary.moments()
+    for row, (key, table) in enumerate(tables.items()):
+        assert result["count"][row] == sum(line[3] for line in table.table)
+        assert result["mean"][row] == pytest.approx(table.umean)
+        assert result["var"][row] == pytest.approx(table.uvar)
+
+
+def test_insulation_strength():
+    strength = listing_stats.InsulationStrength(2.0, 0.1)
+    probability = strength.probability([1.55, 2.0, 2.5])
+    assert probability[0] == 0.0 and probability[1] == pytest.approx(0.5)
+    assert probability[2] == pytest.approx(1.0)
+    gauss = listing_stats.InsulationStrength(2.0, 0.1, listing_stats.STRENGTH_GAUSS)
+    assert gauss.probability(1.9) == pytest.approx(statistics.NormalDist(2.0, 0.1).cdf(1.9),
+                                                   abs = 1.0e-7)
+    assert gauss.probability(1.55) == 0.0
+    parallel = listing_stats.InsulationStrength(2.0, 0.1, insulations = 3)
+    assert parallel.probability(1.9) == pytest.approx(1.0 - (1.0 - strength.probability(1.9)) ** 3)
+    with pytest.raises(ValueError):
+        listing_stats.InsulationStrength(2.0, model = "lognormal")
+
+
+def test_fitted_models():
+    rng = np.random.default_rng(3)
+    peaks = np.column_stack([rng.normal(1.6, 0.1, 4000), 1.8 * rng.weibull(12.0, 4000),
+                             np.full(4000, 1.5)])
+    fits = listing_stats.fit_overvoltages(peaks)
+    assert fits["mean"][0] == pytest.approx(1.6, abs = 0.01)
+    assert fits["std"][0] == pytest.approx(0.1, abs = 0.01)
+    assert fits["p_gauss"][0] > 0.01 and fits["ks_gauss"][0] < fits["ks_weibull"][0]
+    assert fits["weibull_shape"][1] == pytest.approx(12.0, rel = 0.05)
+    assert fits["weibull_scale"][1] == pytest.approx(1.8, rel = 0.01)
+    assert fits["ks_weibull"][1] < fits["ks_gauss"][1]
+    # constant peaks are not fitted
+    assert np.isnan(fits["weibull_shape"][2]) and np.isnan(fits["p_gauss"][2])
+
+
+def test_risk_of_failure_equals_baseline_peaks(write_listing):
+    lisfile = write_listing("case.lis", shots = 200)
+    shot_peaks = listing_stats.ShotPeaks.from_lis(lisfile)
+    strength = listing_stats.InsulationStrength(1.75, 0.06)
+    risks = listing_stats.risk_of_failure(shot_peaks, strength)
+
+    for key, values in _baseline_peaks(lisfile).items():
+        risk = risks[shot_peaks.keys.index(key)]
+        assert risk["count"] == len(values)
+        expected = statistics.fmean(float(strength.probability(value)) for value in values)
+        assert risk["risk"] == pytest.approx(expected)
+        # the fitted models risks are close to that of the peaks
+        assert risk["risk_gauss"] == pytest.approx(expected, abs = 0.03)
+        assert risk["truncation"] >= max(values)
@@ -0,0 +1,33 @@
+import listing
+
+
+def _renamed(path, names):
+    """Renames the type 183 switches of a listing, returning their times."""
+    with open(path, "rb") as file:
+        data = file.read()
+    for k, name in enumerate(names):
+        data = data.replace(b"  T183%02d " % (k + 1), b"  %-6s " % name)
+    with open(path, "wb") as file:
+        file.write(data)
+
+    times = []
+    for line in data.splitlines():
+        if line[:8].strip() in names:
+            if line.startswith(b"  " + names[0]):
+                times.append([])
+            times[-1] += [float(time) for time in line[8:].split()]
+    return times
+
+
+def test_type_183_names_are_not_times(write_listing):
+    lisfile = write_listing("case.lis", shots = 4, t183_switches = 2)
+    t183 = _renamed(lisfile, [b"1E2", b"2E-3"])
+    three_phase = listing.ThreePhaseSwitchingTimes(lisfile)
+
+    for backend in (listing.BACKEND_TEXT, listing.BACKEND_MMAP):
+        sw = listing.SwitchingTimes(lisfile, backend)
+        assert sw.switches == ["1", "2", "3"] + ["T183-%d" % (k + 1) for k in range(6)]
+        assert sw.simulations.tolist() == [1, 2, 3, 4]
+        assert sw.times[:, 3:].tolist() == t183
+        assert (sw.sw_a, sw.sw_b, sw.sw_c) == \
+            (three_phase.sw_a, three_phase.sw_b, three_phase.sw_c)
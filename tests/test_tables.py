@@ -0,0 +1,64 @@
+import numpy as np
+
+import listing
+
+
+def _scanned_rows(lisfile, caption):
+    """Rows of the first table of a caption, read line by line."""
+    rows = []
+    with open(lisfile) as file:
+        lines = iter(file.readlines())
+    for line in lines:
+        if line.startswith(caption):
+            next(lines)
+            next(lines)
+            for line in lines:
+                if listing.is_table_ending(line):
+                    return rows
+                rows.append(listing.stat_table_read_line(line))
+    return rows
+
+
+def test_table_rows_and_array(write_listing):
+    lisfile = write_listing("case.lis", shots = 40)
+    table = listing.VoltageStatTable(lisfile, "B0003A")
+    rows = _scanned_rows(lisfile, "Statistical distribution of peak voltage at node  \"B0003A\"")
+
+    assert len(rows) > 1
+    assert table.table == rows
+    assert table.table_rows() == rows
+    assert table.array.dtype == listing.STAT_TABLE_DTYPE
+    assert table.array.tolist() == [tuple(row) for row in rows]
+    assert int(table.array["density"].sum()) == 40
+    assert table.array["cumulative"][-1] == 40
+
+
+def test_rows_changed_through_table(write_listing):
+    lisfile = write_listing("case.lis")
+    table = listing.VoltageStatTable(lisfile, "B0001A")
+    last = list(table.table[-1])
+    table.table.append([last[0] + 1, last[1] + 0.05, last[2], 0, last[4], 0.0])
+
+    assert len(table.array) == len(table.table)
+    assert table.array["interval"][-1] == last[0] + 1
+
+    table.array = np.zeros(0, dtype = listing.STAT_TABLE_DTYPE)
+    assert table.table == []
+
+
+def test_read_lines_equals_read_line(write_listing):
+    lisfile = write_listing("case.lis")
+    # the rows of every table, after their heading and up to their ending
+    lines = []
+    in_rows = False
+    with open(lisfile) as file:
+        for line in file:
+            if listing.is_table_ending(line):
+                in_rows = False
+            elif in_rows:
+                lines.append(line)
+            elif line.startswith("    number"):
+                in_rows = True
+    assert len(lines) > 24
+    array = listing.stat_table_read_lines(lines)
+    assert array.tolist() == [tuple(listing.stat_table_read_line(line)) for line in lines]
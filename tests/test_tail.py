@@ -0,0 +1,86 @@
+import math
+import os
+import re
+
+import listing
+
+
+def _append(path, data):
+    with open(path, "ab") as file:
+        file.write(data)
+
+
+def test_partial_lines_are_parsed_once_complete(tmp_path, write_listing):
+    source = write_listing("source.lis")
+    with open(source, "rb") as file:
+        data = file.read()
+    path = str(tmp_path / "case.lis")
+    open(path, "wb").close()
+    tail = listing.LisTail(path)
+
+    # the first shot line, written in pieces
+    shot = re.search(b"(?im)^      simulation .*$", data)
+    _append(path, data[:shot.start() + 20])
+    shots, sw_times = tail.poll()
+    assert shots == []
+    _append(path, data[shot.start() + 20:shot.end()])
+    assert tail.poll() == ([], [])
+    _append(path, data[shot.end():shot.end() + 1])
+    shots, new_times = tail.poll()
+    assert shots == listing.get_shots_information(source)[:1]
+    assert new_times == []
+
+    # the rest in chunks splitting lines and blocks anywhere
+    for start in range(shot.end() + 1, len(data), 97):
+        _append(path, data[start:start + 97])
+        new_shots, new_times = tail.poll()
+        shots += new_shots
+        sw_times += new_times
+    assert tail.finished
+    assert shots == listing.get_shots_information(source)
+    times = listing.ThreePhaseSwitchingTimes(source)
+    assert [row[1:] for row in sw_times] == \
+        [list(phases) for phases in zip(times.sw_a, times.sw_b, times.sw_c)]
+
+
+def test_shorter_file_is_read_again(tmp_path, write_listing):
+    path = write_listing("case.lis")
+    tail = listing.LisTail(path)
+    shots, _ = tail.poll()
+    assert len(shots) > 0 and tail.poll() == ([], [])
+
+    write_listing("case.lis", shots = 4)
+    assert tail.poll()[0] == listing.get_shots_information(path)
+
+
+def test_switching_times_of_fewer_switches(tmp_path, write_listing):
+    source = write_listing("source.lis", switches = 2)
+    with open(source, "rb") as file:
+        data = file.read()
+    path = str(tmp_path / "case.lis")
+    open(path, "wb").close()
+    tail = listing.LisTail(path)
+
+    # the times line of the first simulation, written in pieces
+    header = re.search(b"(?m)^ +Random switching times .*\n", data)
+    line_end = data.index(b"\n", header.end()) + 1
+    sw_times = []
+    for cut in (header.end() - 10, header.end() + 40, line_end - 1, line_end):
+        _append(path, data[os.path.getsize(path):cut])
+        sw_times += tail.poll()[1]
+        assert len(sw_times) == (cut == line_end)
+
+    simulation, sw_a, sw_b, sw_c = sw_times[0]
+    assert simulation == 1
+    assert [sw_a, sw_b] == [float(time) for time in data[header.end():line_end].split()[1::2]]
+    assert math.isnan(sw_c)
+
+
+def test_rewritten_file_is_read_again(tmp_path, write_listing):
+    path = write_listing("case.lis", shots = 4)
+    tail = listing.LisTail(path)
+    tail.poll()
+
+    # a longer run of another case over the same file
+    write_listing("case.lis", shots = 6, seed = 2)
+    assert tail.poll()[0] == listing.get_shots_information(path)
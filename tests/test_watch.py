@@ -0,0 +1,88 @@
+import json
+import os
+
+import listing_batch
+import listing_watch
+from conftest import copy_case, needs_fork
+from test_batch import _crash_on
+
+
+def _watch(tmp_path, polls = 20, **kwargs):
+    """Polls a Watcher of tmp_path until its files are published."""
+    published = []
+    watcher = listing_watch.Watcher(
+        str(tmp_path), listing_watch.JSONLinesSink(str(tmp_path / "results.jsonl")),
+        workers = 2, interval = 0.0, settle = 0.0,
+        state_file = str(tmp_path / "state.json"), callback = published.append, **kwargs)
+    try:
+        for i in range(polls):
+            watcher.poll(timeout = 1.0)
+    finally:
+        watcher.close()
+    return watcher, dict((os.path.basename(result.lisfile), result) for result in published)
+
+
+def _state(tmp_path):
+    with open(str(tmp_path / "state.json")) as file:
+        return sorted(os.path.basename(path) for path in json.load(file))
+
+
+def test_failed_files_are_not_kept_in_state(tmp_path, write_listing):
+    write_listing("f0.lis")
+    os.mkdir(str(tmp_path / "f1.lis"))
+
+    watcher, published = _watch(tmp_path)
+
+    assert published["f0.lis"].ok and not published["f1.lis"].ok
+    assert _state(tmp_path) == ["f0.lis"]
+    # not retried while unchanged
+    assert watcher.stats.done == 2
+
+
+@needs_fork
+def test_worker_crash_fails_only_its_file(tmp_path, write_listing, monkeypatch):
+    for i in range(5):
+        write_listing("f%d.lis" % i, seed = i)
+    monkeypatch.setattr(listing_batch, "extract_file", _crash_on("f2.lis"))
+
+    watcher, published = _watch(tmp_path)
+
+    assert sorted(published) == ["f%d.lis" % i for i in range(5)]
+    failed = [name for name, result in published.items() if not result.ok]
+    assert failed == ["f2.lis"]
+    assert "Worker process died" in published["f2.lis"].error
+    assert _state(tmp_path) == ["f0.lis", "f1.lis", "f3.lis", "f4.lis"]
+
+
+def test_complete_files_do_not_wait_to_settle(tmp_path, write_listing):
+    lisfile = write_listing("f0.lis")
+    copy_case(lisfile, str(tmp_path / "f1.lis"), os.path.getsize(lisfile) // 2)
+    paths = [os.path.abspath(str(tmp_path / name)) for name in ("f0.lis", "f1.lis")]
+
+    sink = listing_watch.JSONLinesSink(str(tmp_path / "results.jsonl"))
+    watcher = listing_watch.Watcher(str(tmp_path), sink, settle = 3600.0)
+    watcher.scan()
+    # the listing being written waits
+    assert [item[0] for item in watcher.queue] == paths[:1]
+    watcher.scan()
+    assert [item[0] for item in watcher.queue] == paths[:1]
+
+    # unless unchanged for the settle time, as a run stopped short
+    watcher.settle = 0.0
+    watcher.scan()
+    assert [item[0] for item in watcher.queue] == paths
+    watcher.close()
+
+
+def test_published_records(tmp_path, write_listing):
+    lisfile = write_listing("f0.lis")
+    watcher, published = _watch(tmp_path)
+    result = published["f0.lis"]
+
+    with open(str(tmp_path / "results.jsonl")) as file:
+        records = [json.loads(line) for line in file]
+    assert len(records) == 1 and records[0]["lisfile"] == result.lisfile
+    assert records[0]["simulation_datetime"] == result.simulation_datetime.isoformat()
+    expected = listing_batch.json_merged(listing_batch.merge_results([result]))
+    assert dict((name, records[0][name]) for name in expected) == \
+        json.loads(json.dumps(expected))